@@ -0,0 +1,130 @@
+import random
+import bisect
+import heapq
+import math
+from collections import OrderedDict
+
+BRIDGE_COST_DISTANCE = 30
+ZOBRIST_SEED = 0x5EED
+
+
+class BoardHasher:
+    # Zobrist hash of everything suggest_moves looks at:
+    # owners, evolution levels and the bridge set are xor-ed in incrementally from the
+    # Game hooks, points are bucketed by the bridge costs each cell can pay for
+    def __init__(self, seed=ZOBRIST_SEED):
+        self._rng = random.Random(seed)
+        self._keys = {}
+
+        self.cells = None
+        self.cell_count = 0
+        self.cell_index = {}
+        self.cost_thresholds = []
+        self.structure_hash = 0
+
+    def _key(self, *feature):
+        key = self._keys.get(feature)
+        if key is None:
+            key = self._keys[feature] = self._rng.getrandbits(64)
+        return key
+
+    def sync(self, game):
+        if game.cells is self.cells and len(game.cells) == self.cell_count:
+            return False
+
+        self.rebuild(game)
+        return True
+
+    def rebuild(self, game):
+        self.cells = game.cells
+        self.cell_count = len(game.cells)
+        self.cell_index = {cell: i for i, cell in enumerate(game.cells)}
+
+        # a cell's points only matter relative to the bridge costs it could pay
+        self.cost_thresholds = []
+        for cell in game.cells:
+            costs = {max(1, int(math.sqrt((cell.x - other.x) ** 2 + (cell.y - other.y) ** 2) / BRIDGE_COST_DISTANCE))
+                     for other in game.cells if other is not cell}
+            self.cost_thresholds.append(sorted(costs))
+
+        self.structure_hash = 0
+        for i, cell in enumerate(game.cells):
+            self.structure_hash ^= self._key('owner', i, cell.cell_type.value)
+            self.structure_hash ^= self._key('evolution', i, cell.evolution.value)
+
+        for bridge in game.bridges:
+            self.bridge_toggled(bridge.source_cell, bridge.target_cell)
+
+    def owner_changed(self, cell, old_type, new_type):
+        i = self.cell_index.get(cell)
+        if i is not None and old_type != new_type:
+            self.structure_hash ^= self._key('owner', i, old_type.value) ^ self._key('owner', i, new_type.value)
+
+    def evolution_changed(self, cell, old_level, new_level):
+        i = self.cell_index.get(cell)
+        if i is not None and old_level != new_level:
+            self.structure_hash ^= self._key('evolution', i, old_level) ^ self._key('evolution', i, new_level)
+
+    def bridge_toggled(self, source_cell, target_cell):
+        source = self.cell_index.get(source_cell)
+        target = self.cell_index.get(target_cell)
+        if source is not None and target is not None:
+            self.structure_hash ^= self._key('bridge', source, target)
+
+    def points_hash(self, game):
+        h = 0
+        for i, cell in enumerate(game.cells):
+            h ^= self._key('points', i, bisect.bisect_right(self.cost_thresholds[i], cell.points))
+        return h
+
+    def board_key(self, game, for_player):
+        # the two weakest enemies decide the multiplier attack targets, so they are part of the key
+        enemy_value = 2 if for_player else 1
+        enemies = [i for i, cell in enumerate(game.cells) if cell.cell_type.value == enemy_value]
+        weakest = tuple(heapq.nsmallest(2, enemies, key=lambda i: game.cells[i].points))
+
+        return self.structure_hash ^ self.points_hash(game), for_player, weakest
+
+
+class DecisionCache:
+    # LRU transposition table of suggest_moves results keyed by BoardHasher.board_key
+    def __init__(self, max_size=512, seed=ZOBRIST_SEED):
+        self.hasher = BoardHasher(seed)
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, game, for_player):
+        if self.hasher.sync(game):
+            # new board (level load, saved game, playback), old entries point at dead cells
+            self.entries.clear()
+        return self.hasher.board_key(game, for_player)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def owner_changed(self, cell, old_type, new_type):
+        self.hasher.owner_changed(cell, old_type, new_type)
+
+    def evolution_changed(self, cell, old_level, new_level):
+        self.hasher.evolution_changed(cell, old_level, new_level)
+
+    def bridge_changed(self, source_cell, target_cell):
+        self.hasher.bridge_toggled(source_cell, target_cell)
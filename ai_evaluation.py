@@ -0,0 +1,416 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+
+from ai_scoring import BoardMatrices, OWNER_EMPTY, OWNER_PLAYER, OWNER_ENEMY
+from level_store import LevelStore, LEVELS_DIR
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+WEIGHTS_FILE = "ai_weights.json"
+HISTORY_DIR = "saved_games/json"
+
+# every feature is "mine minus enemy", so a position seen from the other side is just -features
+FEATURE_NAMES = [
+    "material",        # points / 100
+    "cells",           # owned cells
+    "evolution",       # sum of evolution levels
+    "multiplier",      # sum of attack multipliers
+    "free_slots",      # bridges that can still be built
+    "support",         # bridges between own cells
+    "attack",          # bridges into enemy cells
+    "attack_power",    # attack multiplier behind those bridges
+    "expansion",       # bridges into empty cells
+    "threatened",      # enemy cells with an incoming attack bridge
+    "bridge_cost",     # distance cost paid for bridges / 10
+]
+
+# used until weights are fitted with `python ai_evaluation.py fit`
+DEFAULT_WEIGHTS = {
+    "material": 1.0,
+    "cells": 0.6,
+    "evolution": 0.2,
+    "multiplier": 0.3,
+    "free_slots": 0.05,
+    "support": 0.15,
+    "attack": 0.4,
+    "attack_power": 0.2,
+    "expansion": 0.5,
+    "threatened": 0.3,
+    "bridge_cost": -0.1,
+}
+
+GROWTH_INTERVAL = 3.0  # s, same as POINT_GROWTH_INTERVAL
+
+
+def board_features(owner, points, evolution, multiplier, slots, bridge_src, bridge_tgt, bridge_cost,
+                   mine=OWNER_PLAYER):
+    enemy = OWNER_ENEMY if mine == OWNER_PLAYER else OWNER_PLAYER
+    side = (owner == mine).astype(np.float64) - (owner == enemy)
+
+    src_owner = owner[bridge_src]
+    tgt_owner = owner[bridge_tgt]
+    bridge_side = side[bridge_src]
+    attacking = (tgt_owner != OWNER_EMPTY) & (src_owner != tgt_owner) & (src_owner != OWNER_EMPTY)
+
+    attacked = np.zeros(len(owner), dtype=bool)
+    attacked[bridge_tgt[attacking]] = True
+
+    return np.array([
+        side @ points / 100,
+        side.sum(),
+        side @ evolution,
+        side @ multiplier,
+        side @ slots,
+        bridge_side @ (src_owner == tgt_owner),
+        bridge_side @ attacking,
+        bridge_side @ (attacking * multiplier[bridge_src]),
+        bridge_side @ (tgt_owner == OWNER_EMPTY),
+        -side @ attacked,
+        bridge_side @ bridge_cost / 10,
+    ])
+
+
+def game_features(game, for_player=True):
+    board = BoardMatrices(game.cells, game.bridges)
+    evolution = np.fromiter((c.evolution.value for c in game.cells), dtype=np.float64, count=len(game.cells))
+    return board_features(board.owner, board.points, evolution, board.multiplier, board.slots,
+                          board.bridge_src, board.bridge_tgt, board.cost[board.bridge_src, board.bridge_tgt],
+                          OWNER_PLAYER if for_player else OWNER_ENEMY)
+
+
+class EvaluationModel:
+    def __init__(self, weights=None):
+        weights = weights or DEFAULT_WEIGHTS
+        self.weights = np.array([weights.get(name, 0.0) for name in FEATURE_NAMES])
+
+    @classmethod
+    def load(cls, path=WEIGHTS_FILE):
+        with open(path, "r") as f:
+            return cls(json.load(f)["weights"])
+
+    @classmethod
+    def load_if_exists(cls, path=WEIGHTS_FILE):
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls.load(path)
+        except Exception as e:
+            logger.error(f"Error loading AI weights from {path}: {e}")
+            return None
+
+    def save(self, path=WEIGHTS_FILE, **info):
+        with open(path, "w") as f:
+            json.dump({"weights": dict(zip(FEATURE_NAMES, self.weights.tolist())), **info}, f, indent=2)
+
+    def evaluate(self, features):
+        # works for a single position or a (positions, features) batch
+        return features @ self.weights
+
+    def score_moves(self, game, for_player=True, top_k=3):
+        # one-ply lookahead: value of the board after each possible bridge, computed as a feature delta
+        if not game.cells:
+            return []
+
+        board = BoardMatrices(game.cells, game.bridges)
+        mine = OWNER_PLAYER if for_player else OWNER_ENEMY
+
+        can = board.can & (board.owner == mine)[:, None]
+        source, target = np.nonzero(can)
+        if not len(source):
+            return []
+
+        target_owner = board.owner[target]
+        is_attack = (target_owner != OWNER_EMPTY) & (target_owner != mine)
+        cost = board.cost[source, target]
+
+        attacked = np.zeros(len(board.owner), dtype=bool)
+        bridge_attack = (board.owner[board.bridge_src] != board.owner[board.bridge_tgt]) & \
+                        (board.owner[board.bridge_tgt] != OWNER_EMPTY)
+        attacked[board.bridge_tgt[bridge_attack]] = True
+
+        delta = np.zeros((len(source), len(FEATURE_NAMES)))
+        delta[:, FEATURE_NAMES.index("material")] = -cost / 100
+        delta[:, FEATURE_NAMES.index("free_slots")] = -1
+        delta[:, FEATURE_NAMES.index("support")] = target_owner == mine
+        delta[:, FEATURE_NAMES.index("attack")] = is_attack
+        delta[:, FEATURE_NAMES.index("attack_power")] = is_attack * board.multiplier[source]
+        delta[:, FEATURE_NAMES.index("expansion")] = target_owner == OWNER_EMPTY
+        delta[:, FEATURE_NAMES.index("threatened")] = is_attack & ~attacked[target]
+        delta[:, FEATURE_NAMES.index("bridge_cost")] = cost / 10
+
+        value = self.evaluate(delta)
+        best = np.argsort(-value, kind='stable')[:top_k]
+        best = best[value[best] > 0]  # a bridge that makes the position worse is not a move
+
+        suggestions = []
+        for i in best:
+            if is_attack[i]:
+                move_type, description = 'attack', "Attack enemy cell"
+            elif target_owner[i] == OWNER_EMPTY:
+                move_type, description = 'capture', "Capture empty cell"
+            else:
+                move_type, description = 'support', "Support your cell"
+
+            suggestions.append({
+                'type': move_type,
+                'source': board.cells[source[i]],
+                'target': board.cells[target[i]],
+                'score': round(float(value[i]) * 100),
+                'description': f"{description} (evaluation {value[i]:+.2f})"
+            })
+
+        return suggestions
+
+    def fit(self, features, labels, l2=1.0):
+        # ridge regression of the game result on position features
+        x = np.asarray(features, dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64)
+        self.weights = np.linalg.solve(x.T @ x + l2 * np.eye(x.shape[1]), x.T @ y)
+        return self
+
+    def agent(self, epsilon=0.0, rng=None):
+        # move chooser for self_play.SelfPlayInputs, epsilon adds exploration for self-play
+        rng = rng or random.Random()
+
+        def choose(game, for_player):
+            suggestions = self.score_moves(game, for_player, top_k=5)
+            if suggestions and rng.random() < epsilon:
+                return [rng.choice(suggestions)]
+            return suggestions[:1]
+
+        return choose
+
+
+# -- feature extraction from GameRecorder histories --
+
+SHAPE_MULTIPLIERS = {"CIRCLE": 1, "TRIANGLE": 2, "RECTANGLE": 3}
+OWNER_VALUES = {"EMPTY": OWNER_EMPTY, "PLAYER": OWNER_PLAYER, "ENEMY": OWNER_ENEMY}
+BRIDGE_COST_DISTANCE = 30
+
+
+def result_label(result):
+    if result in ("Player Wins", "Blue Wins!"):
+        return 1.0
+    if result in ("Enemy Wins", "Red Wins!"):
+        return -1.0
+    return 0.0
+
+
+def history_positions(history):
+    # replays the recorded events on a bare board and yields player-perspective features after each
+    # one; KEYFRAME, GAME_SAVE and GAME_END carry the whole board, points between them are estimated
+    # from bridge costs and the 3 s growth tick
+    events = history.get("events", [])
+    start = next((e for e in events if e["eventType"] == "GAME_START"), None)
+    if not start or not start["data"].get("cells"):
+        return
+
+    cells = start["data"]["cells"]
+    index = {cell["id"]: i for i, cell in enumerate(cells)}
+    n = len(cells)
+
+    owner = np.array([OWNER_VALUES.get(cell["type"], OWNER_EMPTY) for cell in cells], dtype=np.int8)
+    points = np.array([float(cell.get("points", 0)) for cell in cells])
+    evolution = np.array([float(cell.get("evolution", 1)) for cell in cells])
+    multiplier = np.array([SHAPE_MULTIPLIERS.get(cell.get("shape"), 1) for cell in cells], dtype=np.float64)
+    xs = np.array([float(cell["x"]) for cell in cells])
+    ys = np.array([float(cell["y"]) for cell in cells])
+    cost = np.maximum(1, (np.sqrt((xs[:, None] - xs[None, :]) ** 2 +
+                                  (ys[:, None] - ys[None, :]) ** 2) / BRIDGE_COST_DISTANCE).astype(np.int64))
+
+    bridges = {}
+    last_time = start.get("timestamp", 0)
+
+    for event in events:
+        event_type = event["eventType"]
+        data = event["data"]
+        timestamp = float(event.get("timestamp", last_time))
+
+        points += (owner != OWNER_EMPTY) * (timestamp - last_time) / GROWTH_INTERVAL
+        last_time = timestamp
+
+        if event_type == "BRIDGE_CREATED":
+            source, target = index.get(data.get("sourceId")), index.get(data.get("targetId"))
+            if source is not None and target is not None:
+                bridges[(source, target)] = True
+                points[source] -= data.get("cost", cost[source, target])
+        elif event_type == "BRIDGE_REMOVED":
+            bridges.pop((index.get(data.get("sourceId")), index.get(data.get("targetId"))), None)
+        elif event_type == "CELL_CAPTURED":
+            cell = index.get(data.get("cellId"))
+            if cell is not None:
+                owner[cell] = OWNER_VALUES.get(data.get("newType"), owner[cell])
+                points[cell] = float(data.get("points", points[cell]))
+                bridges = {edge: True for edge in bridges if edge[0] != cell}
+        elif event_type == "CELL_EVOLVED":
+            cell = index.get(data.get("cellId"))
+            if cell is not None and data.get("newLevel"):
+                evolution[cell] = float(data["newLevel"])
+        elif event_type in ("KEYFRAME", "GAME_SAVE", "GAME_END") and data.get("cells"):
+            for cell_data in data["cells"]:
+                cell = index.get(cell_data.get("id"))
+                if cell is not None:
+                    owner[cell] = OWNER_VALUES.get(cell_data.get("type"), owner[cell])
+                    points[cell] = float(cell_data.get("points", points[cell]))
+                    evolution[cell] = float(cell_data.get("evolution", evolution[cell]))
+            if "bridges" in data:
+                bridges = {}
+                for bridge in data["bridges"]:
+                    source, target = index.get(bridge["source_cell_id"]), index.get(bridge["target_cell_id"])
+                    if source is not None and target is not None:
+                        bridges[(source, target)] = True
+
+        bridge_src = np.fromiter((edge[0] for edge in bridges), dtype=np.int64, count=len(bridges))
+        bridge_tgt = np.fromiter((edge[1] for edge in bridges), dtype=np.int64, count=len(bridges))
+        slots = evolution - np.bincount(bridge_src, minlength=n)
+
+        yield board_features(owner, np.maximum(points, 0), evolution, multiplier, slots,
+                             bridge_src, bridge_tgt, cost[bridge_src, bridge_tgt])
+
+
+def load_histories(directory=HISTORY_DIR):
+    if not os.path.isdir(directory):
+        return
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename), "r") as f:
+                yield json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading history {filename}: {e}")
+
+
+def extract_dataset(histories):
+    # stacks positions from both perspectives, labelled with the final result (+1 win, -1 loss, 0 draw)
+    rows = []
+    labels = []
+    games = 0
+
+    for history in histories:
+        label = result_label(history.get("metadata", {}).get("result"))
+        positions = list(history_positions(history))
+        if not positions:
+            continue
+
+        games += 1
+        positions = np.array(positions)
+        rows.append(positions)
+        rows.append(-positions)
+        labels.append(np.full(len(positions), label))
+        labels.append(np.full(len(positions), -label))
+
+    if not rows:
+        return np.zeros((0, len(FEATURE_NAMES))), np.zeros(0), 0
+
+    return np.vstack(rows), np.concatenate(labels), games
+
+
+def self_play_histories(levels, games_per_level, model=None, epsilon=0.2, seed=0):
+    # levels: {name: level data} as read from the level files; played by the game's own rules on a
+    # headless Game and recorded like any other game
+    from self_play import get_self_play
+    from level_cache import compile_level
+
+    model = model or EvaluationModel()
+    rng = random.Random(seed)
+    self_play = get_self_play()
+
+    for level_name, level_data in sorted(levels.items()):
+        compiled = compile_level(level_data)
+        for i in range(games_per_level):
+            game = self_play.play(compiled, rng.getrandbits(32), model.agent(epsilon, rng), model.agent(epsilon, rng),
+                                  max_time=300.0, record=True, level_name=level_name)
+            yield game.history
+
+
+def benchmark(positions=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    model = EvaluationModel()
+
+    batch = rng.normal(size=(positions, len(FEATURE_NAMES)))
+    start = time.perf_counter()
+    model.evaluate(batch)
+    batch_time = time.perf_counter() - start
+
+    # feature extraction from a random 40-cell board, the expensive part of evaluating a position
+    n = 40
+    owner = rng.integers(0, 3, n).astype(np.int8)
+    points = rng.integers(0, 60, n).astype(np.float64)
+    evolution = rng.integers(1, 4, n).astype(np.float64)
+    multiplier = rng.integers(1, 4, n).astype(np.float64)
+    bridge_src = rng.integers(0, n, 60)
+    bridge_tgt = rng.integers(0, n, 60)
+    bridge_cost = rng.integers(1, 20, 60).astype(np.float64)
+    slots = evolution - np.bincount(bridge_src, minlength=n)
+
+    repeats = 5000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.evaluate(board_features(owner, points, evolution, multiplier, slots, bridge_src, bridge_tgt,
+                                      bridge_cost))
+    single_time = (time.perf_counter() - start) / repeats
+
+    print(f"batched evaluation:         {positions / batch_time:,.0f} positions/s")
+    print(f"features + evaluation (40): {1 / single_time:,.0f} positions/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit or benchmark the AI evaluation weights")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = subparsers.add_parser("fit", help="fit weights from recorded games and self-play")
+    fit_parser.add_argument("--games", default=HISTORY_DIR, help="directory with GameRecorder JSON histories")
+    fit_parser.add_argument("--self-play", type=int, default=0, help="self-play games per level")
+    fit_parser.add_argument("--level-dir", default=LEVELS_DIR)
+    fit_parser.add_argument("--l2", type=float, default=1.0)
+    fit_parser.add_argument("--seed", type=int, default=0)
+    fit_parser.add_argument("--out", default=WEIGHTS_FILE)
+
+    bench_parser = subparsers.add_parser("bench", help="measure evaluation throughput")
+    bench_parser.add_argument("--positions", type=int, default=100000)
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark(args.positions)
+        return 0
+
+    histories = list(load_histories(args.games))
+    logger.info(f"Loaded {len(histories)} recorded games from {args.games}")
+
+    if args.self_play:
+        store = LevelStore(args.level_dir)
+        levels = {name: store.get(name) for name in store.names()}
+        histories.extend(self_play_histories(levels, args.self_play, seed=args.seed))
+
+    start = time.perf_counter()
+    features, labels, games = extract_dataset(histories)
+    logger.info(f"Extracted {len(features)} positions from {games} games in {time.perf_counter() - start:.2f}s")
+
+    if not games:
+        logger.error("No games to fit on")
+        return 1
+
+    model = EvaluationModel().fit(features, labels, args.l2)
+    decisive = labels != 0
+    accuracy = np.mean(np.sign(model.evaluate(features[decisive])) == labels[decisive]) if decisive.any() else 0.0
+    model.save(args.out, games=games, positions=int(len(features)), l2=args.l2)
+
+    for name, weight in zip(FEATURE_NAMES, model.weights):
+        print(f"{name:>14}: {weight:+.4f}")
+    print(f"sign accuracy: {accuracy:.3f} on {len(features)} positions, saved to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import time
+import random
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+# cell_type.value of the enums used in main.py / game_playback.py
+OWNER_EMPTY = 0
+OWNER_PLAYER = 1
+OWNER_ENEMY = 2
+
+BRIDGE_COST_DISTANCE = 30
+
+RULE_COUNTER_ATTACK = 0
+RULE_CAPTURE = 1
+RULE_MULTIPLIER_ATTACK = 2
+RULE_SUPPORT = 3
+
+
+class BoardMatrices:
+    # numpy view of the board used by the move scorer:
+    # per cell - owner, points, multiplier, free bridge slots
+    # per pair - distance, bridge cost, existing edge, can-create mask
+    def __init__(self, cells, bridges):
+        self.cells = cells
+        self.index = {cell: i for i, cell in enumerate(cells)}
+
+        n = len(cells)
+        self.owner = np.fromiter((c.cell_type.value for c in cells), dtype=np.int8, count=n)
+        self.points = np.fromiter((c.points for c in cells), dtype=np.int64, count=n)
+        self.multiplier = np.fromiter((c.get_attack_multiplier() for c in cells), dtype=np.int64, count=n)
+        self.slots = np.fromiter((c.evolution.value - len(c.outgoing_bridges) for c in cells),
+                                 dtype=np.int64, count=n)
+
+        xs = np.fromiter((c.x for c in cells), dtype=np.float64, count=n)
+        ys = np.fromiter((c.y for c in cells), dtype=np.float64, count=n)
+        dx = xs[:, None] - xs[None, :]
+        dy = ys[:, None] - ys[None, :]
+        # same operations as Game.calculate_distance so int(distance / 30) matches exactly
+        self.distance = np.sqrt(dx * dx + dy * dy)
+        self.cost = np.maximum(1, (self.distance / BRIDGE_COST_DISTANCE).astype(np.int64))
+
+        self.bridge_src = np.fromiter((self.index[b.source_cell] for b in bridges), dtype=np.int64,
+                                      count=len(bridges))
+        self.bridge_tgt = np.fromiter((self.index[b.target_cell] for b in bridges), dtype=np.int64,
+                                      count=len(bridges))
+
+        self.edge = np.zeros((n, n), dtype=bool)
+        self.edge[self.bridge_src, self.bridge_tgt] = True
+
+        # equivalent of can_create_bridge() for every source/target pair
+        self.can = ~self.edge & (self.slots > 0)[:, None] & (self.points[:, None] >= self.cost)
+
+
+def score_moves(game, for_player=True, top_k=3):
+    if not game.cells:
+        return []
+
+    board = BoardMatrices(game.cells, game.bridges)
+
+    mine_value = OWNER_PLAYER if for_player else OWNER_ENEMY
+    enemy_value = OWNER_ENEMY if for_player else OWNER_PLAYER
+
+    my_cells = np.flatnonzero(board.owner == mine_value)
+    enemy_cells = np.flatnonzero(board.owner == enemy_value)
+    empty_cells = np.flatnonzero(board.owner == OWNER_EMPTY)
+
+    # every candidate is (score, rule, k1, k2, k3, source, target); the k's reproduce the
+    # insertion order of the original loops so ties are broken exactly like suggest_moves
+    parts = []
+
+    def add(score, rule, k1, k2, k3, source, target):
+        if len(source):
+            parts.append((np.broadcast_to(score, source.shape), np.full(source.shape, rule),
+                          k1, k2, k3, source, target))
+
+    attack = (board.owner[board.bridge_src] == enemy_value) & (board.owner[board.bridge_tgt] == mine_value)
+    attack_src = board.bridge_src[attack]
+    attack_tgt = board.bridge_tgt[attack]
+
+    if len(attack_tgt) and len(my_cells):
+        # 1./2. counter-attack every enemy attacking one of my attacked cells
+        pair_a, pair_b = np.nonzero(attack_tgt[:, None] == attack_tgt[None, :])
+        valid = (my_cells[None, :] != attack_tgt[pair_a][:, None]) & \
+                board.can[my_cells[None, :], attack_src[pair_b][:, None]]
+        p, k = np.nonzero(valid)
+        add(100, RULE_COUNTER_ATTACK, pair_a[p], k, pair_b[p], my_cells[k], attack_src[pair_b[p]])
+
+    free = my_cells[board.slots[my_cells] > 0]
+    free_rows = np.flatnonzero(board.slots[my_cells] > 0)
+
+    if len(free) and len(empty_cells):
+        # 3. capture the 3 closest empty cells
+        order = np.argsort(board.distance[np.ix_(free, empty_cells)], axis=1, kind='stable')[:, :3]
+        picked = empty_cells[order]
+        valid = board.can[free[:, None], picked]
+        r, rank = np.nonzero(valid)
+        add(80, RULE_CAPTURE, free_rows[r], rank, np.zeros_like(r), free[r], picked[r, rank])
+
+    strong = free[board.multiplier[free] > 1]
+    strong_rows = free_rows[board.multiplier[free] > 1]
+
+    if len(strong) and len(enemy_cells):
+        # 4. attack the 2 weakest enemies with multiplier cells
+        weak = enemy_cells[np.argsort(board.points[enemy_cells], kind='stable')[:2]]
+        valid = board.can[strong[:, None], weak[None, :]]
+        r, rank = np.nonzero(valid)
+        add(70 + board.multiplier[strong[r]] * 10, RULE_MULTIPLIER_ATTACK, strong_rows[r], rank,
+            np.zeros_like(r), strong[r], weak[rank])
+
+    if len(attack_tgt) and len(my_cells):
+        # 5. support my cells under attack
+        valid = (my_cells[None, :] != attack_tgt[:, None]) & board.can[my_cells[None, :], attack_tgt[:, None]]
+        a, k = np.nonzero(valid)
+        add(90, RULE_SUPPORT, a, k, np.zeros_like(a), my_cells[k], attack_tgt[a])
+
+    if not parts:
+        return []
+
+    score, rule, k1, k2, k3, source, target = (np.concatenate(column) for column in zip(*parts))
+    best = np.lexsort((k3, k2, k1, rule, -score))[:top_k]
+
+    return [_make_suggestion(board, int(rule[i]), int(score[i]), int(source[i]), int(target[i]))
+            for i in best]
+
+
+def _make_suggestion(board, rule, score, source, target):
+    if rule == RULE_COUNTER_ATTACK:
+        move_type, description = 'attack', "Counter-attack enemy cell that's attacking you"
+    elif rule == RULE_CAPTURE:
+        move_type, description = 'capture', "Capture empty cell"
+    elif rule == RULE_MULTIPLIER_ATTACK:
+        move_type = 'attack'
+        description = f"Attack enemy cell with {int(board.multiplier[source])}x multiplier"
+    else:
+        move_type, description = 'support', "Support your cell under attack"
+
+    return {
+        'type': move_type,
+        'source': board.cells[source],
+        'target': board.cells[target],
+        'score': score,
+        'description': description
+    }
+
+
+def _build_benchmark_board(main, num_cells, seed=0):
+    # random board with roughly 1/3 player, 1/3 enemy, 1/3 empty cells and a bridge per owned cell
+    rng = random.Random(seed)
+    game = type("BenchmarkGame", (), {})()
+    game.calculate_distance = lambda a, b: main.Game.calculate_distance(game, a, b)
+    game.count_outgoing_bridges = lambda cell: len(cell.outgoing_bridges)
+    game.cells = []
+    game.bridges = []
+
+    for _ in range(num_cells):
+        cell = main.Cell(rng.randint(0, 4000), rng.randint(0, 3000),
+                         rng.choice(list(main.CellType)), rng.choice(list(main.CellShape)),
+                         rng.choice(list(main.EvolutionLevel)))
+        cell.points = rng.randint(0, 60)
+        game.cells.append(cell)
+
+    for cell in game.cells:
+        if cell.cell_type != main.CellType.EMPTY and rng.random() < 0.7:
+            target = rng.choice(game.cells)
+            if target is not cell:
+                bridge = main.Bridge(cell, target)
+                game.bridges.append(bridge)
+                cell.outgoing_bridges.append(bridge)
+                target.incoming_bridges.append(bridge)
+
+    return game
+
+
+def assert_matches_loop(main, game, where):
+    for for_player in (True, False):
+        expected = [(s['source'], s['target'], s['score']) for s in main.suggest_moves_loop(game, for_player)]
+        actual = [(s['source'], s['target'], s['score']) for s in score_moves(game, for_player)]
+        assert actual == expected, \
+            f"{where}: {'player' if for_player else 'enemy'} suggestions differ from the loop version"
+
+
+def check_levels(store, max_time=120.0, seed=0):
+    # self-play on every level, both scorers compared before each move, so the boards include
+    # bridges, attacks and captures and not only the starting layout
+    import main
+    from level_cache import compile_level
+    from self_play import get_self_play, rules_agent
+
+    def checked_agent(game, for_player):
+        assert_matches_loop(main, game, f"{game.current_level} tick {game.tick}")
+        return rules_agent(game, for_player)
+
+    for name in store.names():
+        get_self_play().play(compile_level(store.get(name)), seed, checked_agent, checked_agent,
+                             max_time=max_time, level_name=name)
+    return len(store)
+
+
+def run_benchmark(num_cells=500, repeats=20):
+    import main
+    from level_store import get_level_store
+
+    levels = check_levels(get_level_store())
+    print(f"suggestions match the loop version on {levels} levels")
+
+    game = _build_benchmark_board(main, num_cells)
+    assert_matches_loop(main, game, f"random {num_cells}-cell board")
+    print(f"suggestions match the loop version on a random {num_cells}-cell board")
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        main.suggest_moves_loop(game, True)
+    loop_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        score_moves(game, True)
+    vector_time = (time.perf_counter() - start) / repeats
+
+    print(f"{num_cells} cells, {len(game.bridges)} bridges")
+    print(f"loop:       {loop_time * 1000:.2f} ms")
+    print(f"vectorized: {vector_time * 1000:.2f} ms ({loop_time / vector_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
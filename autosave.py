@@ -0,0 +1,137 @@
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+FPS = 60
+AUTOSAVE_INTERVAL = 30.0  # s of play between autosaves, 0 turns the timer off
+AUTOSAVE_INPUTS = 50  # player and AI actions between autosaves, 0 turns the count off
+FRAME_BUDGET_MS = 1000 / FPS
+FRAME_HISTORY = 600  # frames the timer keeps, 10 s at 60 FPS
+
+
+class AutosaveScheduler:
+    # decides when the game saves a checkpoint on its own: after interval seconds of game time or
+    # after inputs actions, whichever comes first; set from settings.json
+    def __init__(self, interval=AUTOSAVE_INTERVAL, inputs=AUTOSAVE_INPUTS):
+        self.interval_ticks = int(interval * FPS)
+        self.inputs = inputs
+        self.last_tick = 0
+        self.last_inputs = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get("autosave_interval", AUTOSAVE_INTERVAL),
+                   settings.get("autosave_inputs", AUTOSAVE_INPUTS))
+
+    @property
+    def enabled(self):
+        return self.interval_ticks > 0 or self.inputs > 0
+
+    def reset(self, tick, inputs):
+        self.last_tick = tick
+        self.last_inputs = inputs
+
+    def due(self, tick, inputs):
+        if self.interval_ticks and tick - self.last_tick >= self.interval_ticks:
+            return True
+        return bool(self.inputs) and inputs - self.last_inputs >= self.inputs
+
+
+class FrameTimer:
+    # wall time of the last frames of the game loop; frames can be tagged (e.g. "autosave") to
+    # compare them with the rest
+    def __init__(self, size=FRAME_HISTORY, budget_ms=FRAME_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.frames = deque(maxlen=size)  # (ms, tag)
+        self.last = None
+        self.tag = None
+
+    def mark(self, tag):
+        self.tag = tag
+
+    def frame(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if self.last is not None:
+            self.frames.append(((now - self.last) * 1000, self.tag))
+        self.last = now
+        self.tag = None
+
+    def pause(self):
+        # menus and dialogs block the loop, the next frame starts a new measurement
+        self.last = None
+        self.tag = None
+
+    def stats(self, tag=None):
+        times = sorted(ms for ms, frame_tag in self.frames if tag is None or frame_tag == tag)
+        if not times:
+            return None
+        return {
+            "frames": len(times),
+            "mean": sum(times) / len(times),
+            "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+            "max": times[-1],
+            "over_budget": sum(1 for ms in times if ms > self.budget_ms)
+        }
+
+    def summary(self, tag=None):
+        stats = self.stats(tag)
+        if stats is None:
+            return f"{tag or 'all'}: no frames"
+        return (f"{tag or 'all'}: {stats['frames']} frames, mean {stats['mean']:.2f} ms, "
+                f"p95 {stats['p95']:.2f} ms, max {stats['max']:.2f} ms, "
+                f"{stats['over_budget']} over {self.budget_ms:.1f} ms")
+
+
+def run_benchmark(seconds=60, interval=1.0, level="level1"):
+    # plays a level headless at full speed with an autosave every interval seconds and compares the
+    # frames that started an autosave with the others
+    import os
+    import tempfile
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import main as game_module
+    from game_recorder import GameRecorder
+    from save_index import SaveIndex
+
+    game = game_module.Game(show_menu=False)
+    game.current_level = level
+    game_module.load_level(game, level)
+    game.reset_clock(1)
+    game.game_started = True
+    game.autosave = AutosaveScheduler(interval, 0)
+    game.frame_timer = FrameTimer(int(seconds * FPS))
+    background = game.draw_background_gradient()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # the saves and their index go to a scratch directory, not saved_games; the working
+        # directory stays put for the threads the game has already started
+        save_index = SaveIndex(os.path.join(scratch, "index.sqlite"))
+        game.game_recorder = GameRecorder(game, scratch, save_index)
+        timer = game.frame_timer
+        main_thread_ms = []
+        for _ in range(int(seconds * FPS)):
+            game.step()
+            start = time.perf_counter()
+            if game.maybe_autosave():
+                main_thread_ms.append((time.perf_counter() - start) * 1000)
+            game.draw_board(background)
+            game.update_persistence_status()
+            timer.frame()
+        game.persistence.flush()
+        failed = [result.summary() for result in game.persistence.poll() if not result.ok]
+        save_index.connection.close()
+
+    print(f"{len(main_thread_ms)} autosaves of {len(game.cells)} cells")
+    for summary in failed:
+        print(summary)
+    if main_thread_ms:
+        print(f"autosave on the main thread: mean {sum(main_thread_ms) / len(main_thread_ms):.3f} ms, "
+              f"max {max(main_thread_ms):.3f} ms")
+    print(timer.summary())
+    print(timer.summary("autosave"))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_benchmark()
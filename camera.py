@@ -0,0 +1,183 @@
+import time
+import random
+import logging
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+MAX_ZOOM = 2.0
+ZOOM_STEP = 1.25  # per mouse wheel notch or +/- key
+PAN_SPEED = 12  # screen px per frame while an arrow key is held
+DETAIL_ZOOM = 0.5  # further out cells are plain discs, balls have no trails and bridges no particles
+WORLD_MARGIN = 40  # past the outermost cell, half the smallest level tile
+
+
+class Camera:
+    # maps world coordinates, where cells, bridges and balls live, to the screen: the world point
+    # at the top left of the view and a zoom. A world no bigger than the screen at zoom 1 is shown
+    # unchanged, so levels that fit the screen look as they always did
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.width = width
+        self.height = height
+        self.world_width = width
+        self.world_height = height
+        self.x = 0
+        self.y = 0
+        self.zoom = 1.0
+        self.view = (0, 0, width, height)  # world rect in view: left, top, right, bottom
+
+    @property
+    def min_zoom(self):
+        # far enough out to see the whole world, a small world is not blown up to fill the screen
+        return min(1.0, self.width / self.world_width, self.height / self.world_height)
+
+    def set_world(self, width, height):
+        self.world_width = max(1, width)
+        self.world_height = max(1, height)
+        self.zoom = 1.0
+        self.x = 0
+        self.y = 0
+        self.clamp()
+
+    def clamp(self):
+        self.zoom = max(self.min_zoom, min(MAX_ZOOM, self.zoom))
+        view_width = self.width / self.zoom
+        view_height = self.height / self.zoom
+        # a world smaller than the view is centred in it, a larger one cannot be scrolled past its edge
+        if view_width >= self.world_width:
+            self.x = (self.world_width - view_width) / 2
+        else:
+            self.x = max(0, min(self.world_width - view_width, self.x))
+        if view_height >= self.world_height:
+            self.y = (self.world_height - view_height) / 2
+        else:
+            self.y = max(0, min(self.world_height - view_height, self.y))
+        self.view = (self.x, self.y, self.x + view_width, self.y + view_height)
+
+    def to_screen(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def to_world(self, pos):
+        return pos[0] / self.zoom + self.x, pos[1] / self.zoom + self.y
+
+    def visible(self, x, y, margin=0):
+        # margin in world units around the point, e.g. a cell's radius
+        left, top, right, bottom = self.view
+        return left - margin <= x <= right + margin and top - margin <= y <= bottom + margin
+
+    def segment_visible(self, x1, y1, x2, y2, margin=0):
+        # by the segment's bounding box, may keep a long diagonal that only passes a corner
+        left, top, right, bottom = self.view
+        return (min(x1, x2) - margin <= right and max(x1, x2) + margin >= left and
+                min(y1, y2) - margin <= bottom and max(y1, y2) + margin >= top)
+
+    def pan(self, dx, dy):
+        # by screen pixels
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, pos):
+        # the world point under pos stays under it
+        world_x, world_y = self.to_world(pos)
+        self.zoom *= factor
+        self.clamp()
+        self.x = world_x - pos[0] / self.zoom
+        self.y = world_y - pos[1] / self.zoom
+        self.clamp()
+
+    def look_at(self, x, y):
+        self.x = x - self.width / self.zoom / 2
+        self.y = y - self.height / self.zoom / 2
+        self.clamp()
+
+    def fit(self):
+        self.zoom = self.min_zoom
+        self.clamp()
+
+
+def world_size(positions, margin=WORLD_MARGIN):
+    # for boards only known by their cells (saves and replays): the screen, or as far as the cells go
+    width, height = SCREEN_WIDTH, SCREEN_HEIGHT
+    for x, y in positions:
+        width = max(width, x + margin)
+        height = max(height, y + margin)
+    return width, height
+
+
+def generate_level(columns=200, rows=200, cells=1500, seed=0):
+    # a level file of columns x rows tiles with cells spread at random, a quarter of them owned
+    rng = random.Random(seed)
+    tiles = [(x, y) for y in range(1, rows - 1) for x in range(1, columns - 1)]
+    placed = set(rng.sample(tiles, cells))
+    chars = {}
+    description = {"u": [], "e": [], "o": []}
+    for i, tile in enumerate(sorted(placed, key=lambda tile: (tile[1], tile[0]))):
+        char = "u" if i % 8 == 0 else "e" if i % 8 == 1 else "o"
+        chars[tile] = char
+        description[char].append({"color": {"u": "blue", "e": "red"}.get(char, "no"),
+                                  "kind": rng.choice("ctr"), "evolution": 3, "points": 50})
+
+    game_map = []
+    for y in range(rows):
+        if y in (0, rows - 1):
+            game_map.append("#" * columns)
+        else:
+            game_map.append("#" + "".join(chars.get((x, y), " ") for x in range(1, columns - 1)) + "#")
+    return {"map": game_map, "description": description}
+
+
+def run_benchmark(ticks=600, cells=1500):
+    # a generated 200x200 level with bridges between owned neighbours, so thousands of balls are on
+    # the board; simulated and drawn headless at zoom 1 over a corner and with the whole map in view
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import main as game_module
+    from level_cache import compile_level
+
+    game = game_module.Game(show_menu=False)
+    game.ai_enabled = False
+    start = time.perf_counter()
+    compiled = compile_level(generate_level(cells=cells))
+    game_module.build_level(game, compiled)
+    load_time = time.perf_counter() - start
+
+    owned = [cell for cell in game.cells if cell.cell_type != game_module.CellType.EMPTY]
+    for cell in owned:
+        nearest = sorted((other for other in game.cells if other is not cell),
+                         key=lambda other: (other.x - cell.x) ** 2 + (other.y - cell.y) ** 2)[:3]
+        for target in nearest:
+            game.create_bridge(cell, target)
+    game.reset_clock(1)
+    background = game.draw_background_gradient()
+
+    views = (("zoom 1", lambda: game.camera.set_world(game.camera.world_width, game.camera.world_height)),
+             ("whole map", game.camera.fit))
+    results = []
+    for name, set_view in views:
+        set_view()
+        step_ms = []
+        draw_ms = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            game.step()
+            step_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            game.draw_board(background)
+            draw_ms.append((time.perf_counter() - start) * 1000)
+        results.append((name, step_ms, draw_ms, len(game.balls)))
+
+    world_width, world_height = compiled["world"]
+    print(f"{len(game.cells)} cells, {len(game.bridges)} bridges on a {world_width}x{world_height} world, "
+          f"built in {load_time * 1000:.0f} ms")
+    for name, step_ms, draw_ms, balls in results:
+        for label, times in (("step", step_ms), ("draw", draw_ms)):
+            times.sort()
+            print(f"{name}, {balls} balls, {label}: mean {sum(times) / len(times):.2f} ms, "
+                  f"p95 {times[int(len(times) * 0.95)]:.2f} ms, max {times[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_benchmark()
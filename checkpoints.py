@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+CHECKPOINT_DIR = "saved_games/checkpoints"
+CHECKPOINT_EXTENSION = ".ndjson"
+# a log is rewritten down to its newest save once it holds about this many, so it never grows
+# with the length of the game
+COMPACT_EVERY = 8
+TAIL_READ_SIZE = 64 * 1024  # bytes read from the end at a time, a board is a few KB
+
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+
+def checkpoint_path(key, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, f"{key}{CHECKPOINT_EXTENSION}")
+
+
+def checkpoint_key(path):
+    return os.path.basename(path)[:-len(CHECKPOINT_EXTENSION)]
+
+
+def append_checkpoint(path, game_id, save_event):
+    # one line per save: {"gameId": ..., "save": <GAME_SAVE event>}; only the board is written,
+    # the events before it stay in the recording's stream
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    line = (_encode({"gameId": game_id, "save": save_event}) + "\n").encode("utf-8")
+    with open(path, "a+b") as f:
+        _drop_torn_tail(f)
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+
+    if size > COMPACT_EVERY * len(line):
+        compact_checkpoints(path, line)
+    return path
+
+
+def _drop_torn_tail(f):
+    # a crash mid-append leaves a line without its newline; cut it off so the next record does not
+    # run on from it
+    end = f.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        read_size = min(TAIL_READ_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        chunk = f.read(read_size)
+        newline = chunk.rfind(b"\n")
+        if newline != -1:
+            position += newline + 1
+            break
+    if position != end:
+        logger.warning(f"Dropping a torn checkpoint record of {end - position} bytes")
+        f.truncate(position)
+    f.seek(position)
+
+
+def compact_checkpoints(path, line=None):
+    # the newest save is all a continue reads
+    if line is None:
+        line = _read_last_line(path)
+        if line is None:
+            return False
+
+    with atomic_open(path, "wb") as f:
+        f.write(line)
+    return True
+
+
+def remove_checkpoints(path):
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
+
+
+def _read_last_line(path):
+    # newest complete record, read backwards from the end; a torn line from a crash mid-append is skipped
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        buffer = b""
+        position = end
+        while position > 0:
+            read_size = min(TAIL_READ_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+
+            lines = buffer.split(b"\n")
+            # the first piece may be cut off unless the start of the file was reached
+            complete = lines if position == 0 else lines[1:]
+            for line in reversed(complete):
+                if not line.strip():
+                    continue
+                try:
+                    json.loads(line)
+                except ValueError:
+                    continue
+                return line + b"\n"
+    return None
+
+
+def read_last_checkpoint(path):
+    # the GAME_SAVE event of the newest record, None if the log holds no complete one
+    line = _read_last_line(path)
+    if line is None:
+        return None
+    return json.loads(line)["save"]
@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import time
+import logging
+from collections import deque
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+STREAM_DIR = "saved_games/streams"
+FLUSH_INTERVAL = 0.5  # s, hand buffered lines to the OS
+FSYNC_INTERVAL = 2.0  # s, force them to disk
+TAIL_SIZE = 256  # events kept in memory
+FLUSH_EVENTS = 1024  # events waiting to be encoded before append() flushes on its own
+
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+
+class EventStreamWriter:
+    # append-only newline-delimited JSON log of a recording
+    # a line is either {"metadata": {...}} (the last one wins) or an event dict; append() only
+    # queues a copy of the event, the queue is encoded and written on the next flush, by the worker
+    # (a PersistenceWorker) when there is one, in order with the save jobs that read the stream
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL, tail_size=TAIL_SIZE,
+                 worker=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8", buffering=64 * 1024)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.worker = worker
+        self.tail = deque(maxlen=tail_size)
+        self.pending = []
+        self.count = 0
+        self.closed = False
+
+        now = time.monotonic()
+        self.last_flush = now
+        self.last_fsync = now
+        self.unsynced = False
+
+    def _run(self, task):
+        if self.worker is not None:
+            self.worker.call(task)
+        else:
+            task()
+
+    def write_metadata(self, metadata):
+        self._write_pending()
+        text = _encode({"metadata": metadata}) + "\n"
+        self._run(lambda: self._write(text))
+
+    def append(self, event):
+        # the recording hot path; the event and its data are copied so later changes to them are
+        # not written, the values inside (a keyframe's cell list) are built fresh for every event
+        event = {**event, "data": {**event["data"]}}
+        pending = self.pending
+        pending.append(event)
+        self.tail.append(event)
+        self.count += 1
+        if len(pending) >= FLUSH_EVENTS:
+            self._write_pending()
+
+    def _write_pending(self):
+        if self.pending:
+            events = self.pending
+            self.pending = []
+            self._run(lambda: self._write("".join([_encode(event) + "\n" for event in events])))
+
+    def _write(self, text):
+        self.file.write(text)
+        self.unsynced = True
+
+    def maybe_flush(self, now=None):
+        # called once per tick by the recorder, hands the events to the OS every flush_interval
+        now = now if now is not None else time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.flush(now)
+
+    def flush(self, now=None, sync=False):
+        if self.closed:
+            return
+
+        self.last_flush = now if now is not None else time.monotonic()
+        self._write_pending()
+        self._run(lambda: self._flush_file(sync))
+
+    def _flush_file(self, sync):
+        if self.file.closed:
+            return
+
+        now = time.monotonic()
+        self.file.flush()
+        if self.unsynced and (sync or now - self.last_fsync >= self.fsync_interval):
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+            self.unsynced = False
+
+    def wait(self):
+        # until everything appended so far is in the file, for readers outside the worker
+        if self.worker is not None and not self.worker.on_thread():
+            self.worker.flush()
+
+    def close(self):
+        if not self.closed:
+            self.flush(sync=True)
+            self.closed = True
+            self._run(self.file.close)
+
+    def discard(self):
+        self.close()
+        self._run(self._remove)
+
+    def _remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def iter_event_stream(path):
+    # yields ("metadata", dict) and ("event", dict); a torn last line from a crash is skipped
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping damaged line in {path}")
+                continue
+
+            if "metadata" in record and "eventType" not in record:
+                yield "metadata", record["metadata"]
+            else:
+                yield "event", record
+
+
+def read_event_stream(path):
+    metadata = {}
+    events = []
+    for kind, record in iter_event_stream(path):
+        if kind == "metadata":
+            metadata = record
+        else:
+            events.append(record)
+
+    return {
+        "metadata": metadata,
+        "events": events
+    }
+
+
+def stream_metadata(path):
+    metadata = {}
+    for kind, record in iter_event_stream(path):
+        if kind == "metadata":
+            metadata = record
+    return metadata
+
+
+def iter_stream_events(path):
+    for kind, record in iter_event_stream(path):
+        if kind == "event":
+            yield record
+
+
+def write_json_history(path, metadata, events):
+    # same bytes as json.dump({"metadata": ..., "events": [...]}, f, indent=2),
+    # written one event at a time so the whole history never sits in memory; a game with
+    # saves ends with "lastSave", where in the file the last GAME_SAVE event is
+    last_save = None
+    with atomic_open(path, "w") as f:
+        f.write('{\n  "metadata": ')
+        f.write(json.dumps(metadata, indent=2).replace("\n", "\n  "))
+        f.write(',\n  "events": [')
+
+        first = True
+        for event in events:
+            f.write("\n    " if first else ",\n    ")
+            text = json.dumps(event, indent=2).replace("\n", "\n    ")
+            if event["eventType"] == "GAME_SAVE":
+                last_save = (f.tell(), len(text.encode()))
+            f.write(text)
+            first = False
+
+        f.write("]" if first else "\n  ]")
+        if last_save is not None:
+            f.write(f',\n  "lastSave": {{"offset": {last_save[0]}, "length": {last_save[1]}}}')
+        f.write("\n}")
+
+
+FOOTER_SIZE = 128  # bytes at the end of a JSON history that hold "lastSave"
+LAST_SAVE_FOOTER = re.compile(rb'"lastSave": \{"offset": (\d+), "length": (\d+)\}\s*\}\s*$')
+
+
+def read_json_last_save(path):
+    # the last GAME_SAVE event without parsing the rest of the file; None for files
+    # written before the footer existed
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - FOOTER_SIZE))
+        match = LAST_SAVE_FOOTER.search(f.read())
+        if match is None:
+            return None
+
+        offset, length = int(match.group(1)), int(match.group(2))
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+
+RECORD_BUDGET_US = 1  # per event on the game thread, append and flush together
+FLUSH_BATCH = 500
+
+
+def run_benchmark(num_events=100000):
+    import tempfile
+    from persistence import PersistenceWorker
+
+    def make_event(i):
+        return {
+            "timestamp": i * 0.016,
+            "eventType": "BRIDGE_CREATED",
+            "data": {"sourceId": i % 20, "targetId": (i + 7) % 20, "direction": "ONE_WAY", "cost": 4}
+        }
+
+    def record(writer):
+        # a flush after every FLUSH_BATCH events, far more than a game records in the half second
+        # between two; returns the CPU time the game thread spends per event and the time per event
+        # until the file is complete
+        on_thread = 0
+        start = time.perf_counter()
+        for first in range(0, num_events, FLUSH_BATCH):
+            cpu_start = time.thread_time()
+            for event in events[first:first + FLUSH_BATCH]:
+                writer.append(event)
+            writer.flush()
+            on_thread += time.thread_time() - cpu_start
+            # the game thread sleeps until its next frame while the worker writes
+            writer.wait()
+        writer.close()
+        writer.wait()
+        return on_thread / num_events, (time.perf_counter() - start) / num_events
+
+    with tempfile.TemporaryDirectory() as directory:
+        events = [make_event(i) for i in range(num_events)]
+        start = time.perf_counter()
+        in_list = []
+        for event in events:
+            in_list.append(event)
+        list_time = (time.perf_counter() - start) / num_events
+
+        metadata = {"gameId": "benchmark", "result": None}
+        inline = EventStreamWriter(os.path.join(directory, "inline.ndjson"))
+        inline.write_metadata(metadata)
+        inline_time, _ = record(inline)
+
+        worker = PersistenceWorker()
+        writer = EventStreamWriter(os.path.join(directory, "benchmark.ndjson"), worker=worker)
+        writer.write_metadata(metadata)
+        stream_time, total_time = record(writer)
+        worker.shutdown()
+
+        expected = os.path.join(directory, "expected.json")
+        with open(expected, "w") as f:
+            json.dump({"metadata": metadata, "events": events}, f, indent=2)
+
+        actual = os.path.join(directory, "actual.json")
+        write_json_history(actual, stream_metadata(writer.path), iter_stream_events(writer.path))
+
+        with open(expected, "rb") as f1, open(actual, "rb") as f2:
+            same = f1.read() == f2.read()
+
+        overhead = (stream_time - list_time) * 1e6
+        within = "within" if overhead <= RECORD_BUDGET_US else "OVER"
+        print(f"{num_events} events, stream size {os.path.getsize(writer.path) / 1024:.0f} KB")
+        print(f"list append:          {list_time * 1e6:.2f} us/event")
+        print(f"append + flush:       {stream_time * 1e6:.2f} us/event on the game thread "
+              f"(+{overhead:.2f} us, {within} the {RECORD_BUDGET_US} us budget)")
+        print(f"until written:        {total_time * 1e6:.2f} us/event, encoded and written by the worker")
+        print(f"without a worker:     {inline_time * 1e6:.2f} us/event on the game thread")
+        print(f"save_to_json output rebuilt from stream is identical: {same}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,17 +1,12 @@
-import os
 import time
-import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
+import bisect
 import json
-import datetime
 import logging
 from enum import Enum
-
-try:
-    import pymongo
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
+from event_stream import read_event_stream
+from replay_format import load_binary_history
+from xml_history import read_xml_history
+from replay_simulation import ReplaySimulator
 
 logging.basicConfig(
     level=logging.INFO,
@@ -48,6 +43,9 @@ class GamePlayback:
         self.event_index = 0
         self.last_update_time = 0
         self.cell_id_map = {}
+        self.keyframe_times = []
+        self.keyframe_indices = []
+        self.simulator = None
 
         self.Cell = cell_class
         self.CellType = cell_type_class
@@ -56,131 +54,92 @@ class GamePlayback:
 
     def load_json_history(self, filename):
         try:
+            if filename.endswith(".ndjson"):
+                # raw event stream of an unfinished or crashed game
+                self.history = read_event_stream(filename)
+                return True
+
             with open(filename, "r") as f:
                 self.history = json.load(f)
             return True
         except Exception as e:
-            print(f"Error loading JSON history: {e}")
+            logger.error(f"Error loading JSON history {filename}: {e}")
             return False
 
-    def load_xml_history(self, filename):
+    def load_binary_history(self, filename):
         try:
-            tree = ET.parse(filename)
-            root = tree.getroot()
-
-            metadata = {}
-            metadata_elem = root.find("Metadata")
-            for child in metadata_elem:
-                if child.tag in ["turnBased", "aiEnabled"]:
-                    metadata[child.tag] = child.text.lower() == "true"
-                elif child.tag == "duration":
-                    metadata[child.tag] = float(child.text)
-                else:
-                    metadata[child.tag] = child.text
-
-            events = []
-            events_elem = root.find("Events")
-            for event_elem in events_elem.findall("Event"):
-                event = {
-                    "timestamp": float(event_elem.get("timestamp")),
-                    "eventType": event_elem.get("type"),
-                    "data": {}
-                }
-
-                for child in event_elem:
-                    if len(child) > 0:
-                        items = []
-                        for item_elem in child:
-                            if len(item_elem) > 0:
-                                item_dict = {}
-                                for attr in item_elem:
-                                    if attr.tag in ["id", "x", "y", "evolution", "points"]:
-                                        item_dict[attr.tag] = int(attr.text)
-                                    else:
-                                        item_dict[attr.tag] = attr.text
-                                items.append(item_dict)
-                            else:
-                                items.append(item_elem.text)
-                        event["data"][child.tag] = items
-                    else:
-                        event["data"][child.tag] = child.text
-
-                events.append(event)
-
-            self.history = {
-                "metadata": metadata,
-                "events": events
-            }
+            self.history = load_binary_history(filename)
             return True
-
         except Exception as e:
-            print(f"Error loading XML history: {e}")
-            return False
-
-    def load_mongodb_history(self, game_id):
-        try:
-            import pymongo
-            from bson import ObjectId
-            from mongodb_config import DEFAULT_CONNECTION_STRING, DATABASE_NAME, COLLECTION_NAME
-        except ImportError:
-            logger.error("MongoDB support not available. Install pymongo package.")
+            logger.error(f"Error loading binary history {filename}: {e}")
             return False
 
+    def load_xml_history(self, filename):
         try:
-            client = pymongo.MongoClient(DEFAULT_CONNECTION_STRING)
-            db = client[DATABASE_NAME]
-            collection = db[COLLECTION_NAME]
-
-            try:
-                if len(game_id) == 24:
-                    object_id = ObjectId(game_id)
-                    game_history = collection.find_one({"_id": object_id})
-                else:
-                    game_history = collection.find_one({"metadata.gameId": game_id})
-            except:
-                game_history = collection.find_one({"metadata.gameId": game_id})
-
-            if game_history:
-                if "_id" in game_history:
-                    game_history["_id"] = str(game_history["_id"])
-                self.history = game_history
-                return True
-            else:
-                logger.error(f"Game with ID {game_id} not found in MongoDB")
-                return False
+            self.history = read_xml_history(filename)
+            return True
 
         except Exception as e:
-            logger.error(f"MongoDB error: {e}")
+            logger.error(f"Error loading XML history {filename}: {e}")
             return False
 
+    def load_mongodb_history(self, game_id):
+        from mongodb_config import get_connection, find_game, find_legacy_history, iter_game_events
 
-    def start_playback(self, filename, format_type="json"):
-        self.playback_active = True
-        self.game_playback = GamePlayback(
-            self,
-            cell_class=Cell,
-            cell_type_class=CellType,
-            cell_shape_class=CellShape,
-            evolution_level_class=EvolutionLevel
-        )
-
-        success = False
-        if format_type.lower() == "json":
-            success = self.game_playback.load_json_history(filename)
-        elif format_type.lower() == "xml":
-            success = self.game_playback.load_xml_history(filename)
-        elif format_type.lower() == "mongodb":
-            success = self.game_playback.load_mongodb_history(filename)
-
-        if success:
-            self.game_playback.start_playback()
-            self.playback_controls_visible = True
-            self.game_started = True
+        def find(database):
+            game = find_game(database, game_id, {"lastSave": 0})
+            if game is None:
+                return find_legacy_history(database, game_id)
+
+            return {
+                "_id": game["_id"],
+                "metadata": game["metadata"],
+                "events": list(iter_game_events(database, game["gameId"]))
+            }
+
+        game_history = get_connection().run(find)
+        if game_history:
+            if "_id" in game_history:
+                game_history["_id"] = str(game_history["_id"])
+            self.history = game_history
             return True
-        else:
-            self.playback_active = False
-            self.game_playback = None
-            return False
+
+        logger.error(f"Game with ID {game_id} not found in MongoDB")
+        return False
+
+
+    def start_playback(self):
+        self._index_keyframes()
+        self.event_index = 0
+        self.current_time = 0
+        self._apply_initial_state()
+
+        # recordings with a seed and inputs are played by running the game again, balls included;
+        # older ones by patching the recorded events onto the board
+        self.simulator = None
+        if ReplaySimulator.supports(self.history):
+            self.simulator = ReplaySimulator(self.game, self.history)
+            self.simulator.seek(self._tick_at(0))
+        self.resume()
+
+    def _tick_at(self, playback_time):
+        return self.simulator.keyframe_ticks[0] + int(playback_time * self.simulator.tick_rate)
+
+    def _index_keyframes(self):
+        # (timestamp, event index) of every full-state event, GAME_START first; seek bisects this
+        self.keyframe_times = []
+        self.keyframe_indices = []
+        for i, event in enumerate(self.history["events"]):
+            if event["eventType"] in ("GAME_START", "KEYFRAME"):
+                self.keyframe_times.append(event["timestamp"])
+                self.keyframe_indices.append(i)
+
+    @property
+    def duration(self):
+        # in-progress saves have no duration in their metadata
+        events = self.history["events"] if self.history else []
+        last = events[-1]["timestamp"] if events else 0
+        return max(self.history["metadata"].get("duration") or 0, last) if self.history else 0
 
     def _apply_initial_state(self):
         if not self.history or self.event_index >= len(self.history["events"]):
@@ -211,7 +170,8 @@ class GamePlayback:
                         cell_data.get("y", 0),
                         cell_type,
                         shape,
-                        evolution
+                        evolution,
+                        len(self.game.cells)
                     )
                     cell.points = cell_data.get("points", 0)
 
@@ -236,7 +196,27 @@ class GamePlayback:
         if not self.history:
             return
 
-        self._apply_initial_state()
+        target_time = max(0, min(target_time, self.duration))
+        if self.simulator is not None:
+            self.simulator.seek(self._tick_at(target_time))
+            self.current_time = target_time
+            self.last_update_time = time.time()
+            return
+
+        if not self.keyframe_times:
+            self._index_keyframes()
+
+        # restore the nearest keyframe at or before the target and replay only the events after it;
+        # seeking forward without passing a keyframe just continues from the current state
+        k = bisect.bisect_right(self.keyframe_times, target_time) - 1
+        keyframe_index = self.keyframe_indices[k] if k >= 0 else -1
+        if not (self.current_time <= target_time and self.event_index > keyframe_index):
+            if k <= 0:
+                self.event_index = 0
+                self._apply_initial_state()
+            else:
+                self._apply_keyframe(self.history["events"][keyframe_index])
+                self.event_index = keyframe_index + 1
 
         while (self.event_index < len(self.history["events"]) and
                self.history["events"][self.event_index]["timestamp"] <= target_time):
@@ -244,6 +224,10 @@ class GamePlayback:
             self.event_index += 1
 
         self.current_time = target_time
+        self.last_update_time = time.time()
+
+    def _apply_keyframe(self, event):
+        self.cell_id_map = self.game.restore_state(event["data"])
 
     def update(self):
         if not self.is_playing or not self.history:
@@ -255,6 +239,12 @@ class GamePlayback:
 
         self.current_time += dt
 
+        if self.simulator is not None:
+            self.simulator.advance_to(self._tick_at(self.current_time))
+            if self.simulator.finished:
+                self.is_playing = False
+            return
+
         while (self.event_index < len(self.history["events"]) and
                self.history["events"][self.event_index]["timestamp"] <= self.current_time):
             self._apply_event(self.history["events"][self.event_index])
@@ -298,7 +288,7 @@ class GamePlayback:
 
             if cell_id in self.cell_id_map and new_type_name:
                 cell = self.cell_id_map[cell_id]
-                cell.cell_type = getattr(CellType, new_type_name)
+                cell.cell_type = getattr(self.CellType, new_type_name)
                 cell.points = data.get("points", 20)
 
         elif event_type == "CELL_EVOLVED":
@@ -307,7 +297,10 @@ class GamePlayback:
 
             if cell_id in self.cell_id_map and new_level:
                 cell = self.cell_id_map[cell_id]
-                cell.evolution = EvolutionLevel(new_level)
+                cell.evolution = self.EvolutionLevel(new_level)
+
+        elif event_type == "KEYFRAME":
+            self._apply_keyframe(event)
 
         elif event_type == "TURN_SWITCH":
             self.game.current_player_turn = data.get("isPlayerTurn", True)
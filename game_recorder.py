@@ -1,17 +1,16 @@
 import os
-import pygame
 import time
-import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
-import json
 import logging
+import itertools
+import uuid
 import datetime
 from enum import Enum
-try:
-    import pymongo
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
+from event_stream import EventStreamWriter, STREAM_DIR, iter_event_stream, iter_stream_events, write_json_history
+from replay_format import save_binary_history, REPLAY_EXTENSION
+from xml_history import write_xml_history
+from save_index import get_save_index, parse_game_id, parse_game_level
+from checkpoints import CHECKPOINT_DIR, checkpoint_path, append_checkpoint, remove_checkpoints
+from mongodb_config import MONGODB_AVAILABLE
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,6 +36,11 @@ EMPTY_COLOR = (50, 50, 50)  # Dark Gray
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
+KEYFRAME_INTERVAL = 5.0  # s of recording between full-state keyframes, bounds the work of a playback seek
+KEYFRAME_TICKS = int(KEYFRAME_INTERVAL * FPS)
+CHECKSUM_TICKS = FPS  # ticks between state checksums a replay is verified against
+SAVE_DIR = os.path.dirname(STREAM_DIR)  # streams, checkpoints and the exported histories, one folder each
+
 class GameType(Enum):
     SINGLE_PLAYER=0
     LOCAL_MULTI=1
@@ -69,9 +73,19 @@ def generate_game_id(level_name=None, completed=False):
     else:
         return f"{level_name}_{timestamp}_{completion_status}"
 
+
+def completed_game_id(game_id):
+    # the same game at game over, only the status at the end changes
+    if game_id and game_id.endswith("_in_progress"):
+        return game_id[:-len("_in_progress")] + "_completed"
+    return game_id
+
 class GameRecorder:
-    def __init__(self, game):
+    def __init__(self, game, directory=SAVE_DIR, save_index=None):
+        # directory and save_index default to the game's own, a benchmark passes scratch ones
         self.game = game
+        self.directory = directory
+        self.save_index = save_index
 
         self.game_type = game.game_type
         if game.game_type==GameType.ONLINE: #check is it correct, to make option to send data about game during the game
@@ -80,20 +94,31 @@ class GameRecorder:
 
         self.recording = False
         self.events = []
-        self.cell_id_map = {}
+        self.stream = None
         self.start_time = 0
+        self.start_tick = 0
+        self.checksum_interval = CHECKSUM_TICKS  # 0 records no checksums
         self.game_id = None
+        self.checkpoint_key = None  # name of the checkpoint log the next save appends to
         self.metadata = {}
 
     def start_recording(self):
+        if self.stream is not None:
+            self.stream.close()
+
         self.recording = True
-        self.events = []
-        self.cell_id_map = {}
         self.start_time = time.time()
-        self.game_id = generate_game_id()
-
-        for i, cell in enumerate(self.game.cells):
-            self.cell_id_map[cell] = i
+        self.start_tick = self.game.tick
+        # kept for the whole recording, autosaves and saves all go out under it
+        self.game_id = generate_game_id(self.game.current_level)
+
+        # game ids only have one second resolution, the suffix keeps a pending save's stream from being reused
+        # encoded and written on the game's persistence worker, the game thread only queues events
+        self.stream = EventStreamWriter(os.path.join(self.stream_dir, f"{self.game_id}_{uuid.uuid4().hex[:8]}.ndjson"),
+                                        worker=getattr(self.game, "persistence", None))
+        # only the last events stay in memory, the full history is in the stream
+        self.events = self.stream.tail
+        self.checkpoint_key = os.path.splitext(os.path.basename(self.stream.path))[0]
 
         self.metadata = {
             "gameId": self.game_id,
@@ -104,147 +129,364 @@ class GameRecorder:
             "aiEnabled": self.game.ai_enabled,
             "aiDifficulty": self.game.ai_difficulty,
             "result": None,
-            "duration": 0
+            "duration": 0,
+            "seed": self.game.seed,
+            "tickRate": FPS
         }
+        self.stream.write_metadata(self.metadata)
 
         self.record_event("GAME_START", {
             "cells": [self._serialize_cell(cell) for cell in self.game.cells]
         })
+        # the state a replay starts re-simulating from
+        self.record_keyframe()
+
+    @property
+    def stream_dir(self):
+        return os.path.join(self.directory, os.path.basename(STREAM_DIR))
+
+    @property
+    def checkpoint_dir(self):
+        return os.path.join(self.directory, os.path.basename(CHECKPOINT_DIR))
 
     def stop_recording(self, result):
         if not self.recording:
             return
 
-        self.recording = False
-        self.metadata["result"] = result
-        self.metadata["duration"] = time.time() - self.start_time
-
         self.record_event("GAME_END", {
             "result": result,
             "score": self.game.points,
             "time": self.game.time_taken,
             "cells": [self._serialize_cell(cell) for cell in self.game.cells]
         })
+        self.recording = False
+        # the finished game is saved under its completed id, not over the in-progress saves
+        self.metadata["gameId"] = self.game_id
+        self.metadata["result"] = result
+        self.metadata["duration"] = (self.game.tick - self.start_tick) / FPS
+        self.stream.write_metadata(self.metadata)
+        self.stream.close()
+
+    def close_recording(self):
+        # a recording that ends without a result: the game was saved and left, or replaced by another
+        if not self.recording:
+            return
+
+        self.recording = False
+        self.metadata["duration"] = (self.game.tick - self.start_tick) / FPS
+        self.stream.write_metadata(self.metadata)
+        self.stream.close()
+
+    def orphan_streams(self):
+        # streams of earlier runs that were never exported (the game crashed or was killed),
+        # not the one being recorded to
+        try:
+            names = sorted(os.listdir(self.stream_dir))
+        except OSError:
+            return []
+
+        current = self.stream.path if self.stream is not None else None
+        paths = [os.path.join(self.stream_dir, name) for name in names if name.endswith(".ndjson")]
+        return [path for path in paths if path != current]
+
+    def export_stream_job(self, path):
+        # job for the persistence worker: an orphaned stream exported like any other history, then removed
+        def export():
+            snapshot = RecordingSnapshot.from_stream(path, self.directory, self.save_index)
+            if not snapshot.event_count:
+                snapshot.discard_stream()
+                return path
+
+            filename = snapshot.save_to_json()
+            for save in (snapshot.save_to_xml, snapshot.save_to_binary):
+                try:
+                    save()
+                except Exception as e:
+                    logger.error(f"Could not export {path}: {e}")
+            if MONGODB_AVAILABLE:
+                snapshot.save_to_mongodb()
+            if filename is not None:
+                snapshot.discard_stream()
+            return filename
+        return export
 
     def record_event(self, event_type, data):
         if not self.recording:
             return
 
-        timestamp = time.time() - self.start_time
-        self.events.append({
+        # game time, not wall time, so the events line up with a re-simulation
+        timestamp = (self.game.tick - self.start_tick) / FPS
+        self.stream.append({
             "timestamp": timestamp,
             "eventType": event_type,
             "data": data
         })
 
+    def save_event(self, data):
+        # GAME_SAVE event for the checkpoint log; autosaves are not part of the history
+        return {
+            "timestamp": (self.game.tick - self.start_tick) / FPS,
+            "eventType": "GAME_SAVE",
+            "data": data
+        }
+
+    def record_save(self, data):
+        # also returned when nothing is being recorded, e.g. after continuing a save
+        event = self.save_event(data)
+        if self.recording:
+            self.stream.append(event)
+        return event
+
+    def record_keyframe(self):
+        if self.recording:
+            self.record_event("KEYFRAME", self.game.serialize_state())
+
+    def record_input(self, tick, action, source=None, target=None, refund=None):
+        # player and AI actions, what a replay feeds back into Game.step()
+        if not self.recording:
+            return
+
+        data = {"tick": tick, "action": action}
+        for key, cell in (("sourceId", source), ("targetId", target), ("refundId", refund)):
+            if cell is not None:
+                data[key] = cell.id
+        self.record_event("INPUT", data)
+
+    def record_checksum(self):
+        if self.recording and self.checksum_interval and self.game.tick % self.checksum_interval == 0:
+            self.record_event("CHECKSUM", {"tick": self.game.tick, "checksum": self.game.state_checksum()})
+
+    def flush_stream(self):
+        # once per tick; every half second the recorded events go to the worker to be encoded and written
+        if self.recording:
+            self.stream.maybe_flush()
+
+    def snapshot(self):
+        # frozen view of the history recorded so far, safe to save from another thread
+        # while the game keeps recording
+        summary = self._summary()
+        if self.stream is None:
+            return RecordingSnapshot(self.game_id, dict(self.metadata), None, 0, False, summary,
+                                     self.directory, self.save_index)
+
+        self.stream.flush()
+        return RecordingSnapshot(self.game_id, dict(self.metadata), self.stream.path, self.stream.count,
+                                 not self.recording, summary, self.directory, self.save_index)
+
+    def checkpoint(self, save_event):
+        # one log per game, named after the recording's stream, so its saves append to the same file
+        if self.game_id is None:
+            # a continued game that is not being recorded
+            self.game_id = generate_game_id(self.game.current_level)
+        key = self.checkpoint_key or self.game_id
+        return SaveCheckpoint(self.game_id, self.game.current_level, key, save_event, self._summary(),
+                              checkpoint_path(key, self.checkpoint_dir), self.save_index)
+
+    def _summary(self):
+        # what the save index shows without opening the save
+        return {
+            "points": self.game.points,
+            "time_taken": self.game.time_taken,
+            "board": [[cell.x, cell.y, cell.cell_type.name] for cell in self.game.cells]
+        }
+
+    def discard_saves(self, connection_string=None):
+        # a finished game is no longer offered to continue: its checkpoints and every history saved
+        # while it was in progress go; returns the job for the persistence worker, so it runs after
+        # any save still being written. Call it before the game id is changed to the completed one
+        key = self.checkpoint_key or self.game_id
+        path = checkpoint_path(key, self.checkpoint_dir)
+        game_id = self.game_id
+        save_index = self.save_index
+
+        def discard():
+            from mongodb_config import get_connection, delete_checkpoint
+
+            index = save_index or get_save_index()
+            remove_checkpoints(path)
+            index.remove("checkpoint", path)
+            if game_id is not None and parse_game_id(game_id)[1] == "in_progress":
+                for entry in index.find(game_id=game_id):
+                    if entry["format"] != "mongodb":
+                        try:
+                            os.remove(entry["path"])
+                        except OSError:
+                            pass
+                    index.remove(entry["format"], entry["path"])
+            if MONGODB_AVAILABLE:
+                connection = get_connection(connection_string)
+                connection.run(lambda database: delete_checkpoint(database, key))
+                if game_id is not None and parse_game_id(game_id)[1] == "in_progress":
+                    connection.delete_history(game_id)
+            return path
+        return discard
+
+    def written_snapshot(self):
+        # for saving right away on this thread, once the stream's queued writes are done
+        snapshot = self.snapshot()
+        if self.stream is not None:
+            self.stream.wait()
+        return snapshot
+
+    def save_to_json(self):
+        return self.written_snapshot().save_to_json()
+
+    def save_to_binary(self):
+        return self.written_snapshot().save_to_binary()
+
+    def save_to_xml(self):
+        return self.written_snapshot().save_to_xml()
+
+    def save_to_mongodb(self, connection_string=None):
+        return self.written_snapshot().save_to_mongodb(connection_string)
+
+    def _serialize_cell(self, cell):
+        return {
+            "id": cell.id,
+            "x": cell.x,
+            "y": cell.y,
+            "type": cell.cell_type.name,
+            "shape": cell.shape.name,
+            "evolution": cell.evolution.value,
+            "points": cell.points
+        }
+
+
+class RecordingSnapshot:
+    def __init__(self, game_id, metadata, stream_path, event_count, finished, summary=None, directory=SAVE_DIR,
+                 save_index=None):
+        self.game_id = game_id
+        self.metadata = metadata
+        self.stream_path = stream_path
+        self.event_count = event_count
+        # the recorder will not append to a finished stream, so it can be removed once saved
+        self.finished = finished
+        self.summary = summary or {}
+        self.directory = directory
+        self.save_index = save_index
+
+    @classmethod
+    def from_stream(cls, path, directory=SAVE_DIR, save_index=None):
+        # a finished recording read back from its stream, e.g. one left behind by a crash
+        metadata = {}
+        event_count = 0
+        for kind, record in iter_event_stream(path):
+            if kind == "metadata":
+                metadata = record
+            else:
+                event_count += 1
+
+        # <game id>_<suffix>.ndjson, for a stream cut short before its metadata was written
+        game_id = metadata.get("gameId") or os.path.basename(path)[:-len(".ndjson")].rsplit("_", 1)[0]
+        metadata.setdefault("gameId", game_id)
+        return cls(game_id, metadata, path, event_count, True, None, directory, save_index)
+
+    def iter_events(self):
+        if self.stream_path is None:
+            return iter(())
+        return itertools.islice(iter_stream_events(self.stream_path), self.event_count)
+
+    def discard_stream(self):
+        if self.finished and self.stream_path is not None:
+            try:
+                os.remove(self.stream_path)
+            except OSError:
+                pass
+
+    def _index(self, save_format, path):
+        level = self.metadata.get("level") or parse_game_level(self.game_id)
+        size = os.path.getsize(path) if save_format != "mongodb" else None
+        try:
+            (self.save_index or get_save_index()).add(self.game_id, level, save_format, path, size, self.metadata.get("result"),
+                                 self.summary.get("points"), self.summary.get("time_taken"),
+                                 self.summary.get("board"))
+        except Exception as e:
+            logger.error(f"Could not update save index: {e}")
+
     def save_to_json(self):
-        if not self.events:
+        if not self.event_count:
+            return None
+
+        directory = os.path.join(self.directory, "json")
+        os.makedirs(directory, exist_ok=True)
+
+        filename = os.path.join(directory, f"{self.game_id}.json")
+        write_json_history(filename, self.metadata, self.iter_events())
+        self._index("json", filename)
+
+        return filename
+
+    def save_to_binary(self):
+        if not self.event_count:
             return None
 
-        os.makedirs("saved_games/json", exist_ok=True)
+        directory = os.path.join(self.directory, "binary")
+        os.makedirs(directory, exist_ok=True)
 
         game_history = {
             "metadata": self.metadata,
-            "events": self.events
+            "events": list(self.iter_events())
         }
 
-        filename = f"saved_games/json/{self.game_id}.json"
-        with open(filename, "w") as f:
-            json.dump(game_history, f, indent=2)
+        filename = os.path.join(directory, f"{self.game_id}{REPLAY_EXTENSION}")
+        save_binary_history(filename, game_history)
+        self._index("binary", filename)
 
         return filename
 
     def save_to_xml(self):
-        if not self.events:
+        if not self.event_count:
             return None
 
-        os.makedirs("saved_games/xml", exist_ok=True)
-
-        root = ET.Element("GameHistory")
-
-        metadata_elem = ET.SubElement(root, "Metadata")
-        for key, value in self.metadata.items():
-            meta_item = ET.SubElement(metadata_elem, key)
-            meta_item.text = str(value)
-
-        events_elem = ET.SubElement(root, "Events")
-        for event in self.events:
-            event_elem = ET.SubElement(events_elem, "Event")
-            event_elem.set("timestamp", str(event["timestamp"]))
-            event_elem.set("type", event["eventType"])
-
-            for key, value in event["data"].items():
-                if isinstance(value, list):
-                    list_elem = ET.SubElement(event_elem, key)
-                    for item in value:
-                        if isinstance(item, dict):
-                            item_elem = ET.SubElement(list_elem, "Item")
-                            for k, v in item.items():
-                                item_attr = ET.SubElement(item_elem, k)
-                                item_attr.text = str(v)
-                        else:
-                            item_elem = ET.SubElement(list_elem, "Item")
-                            item_elem.text = str(item)
-                else:
-                    data_elem = ET.SubElement(event_elem, key)
-                    data_elem.text = str(value)
-
-        xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
-
-        filename = f"saved_games/xml/{self.game_id}.xml"
-        with open(filename, "w") as f:
-            f.write(xml_str)
+        directory = os.path.join(self.directory, "xml")
+        os.makedirs(directory, exist_ok=True)
+
+        filename = os.path.join(directory, f"{self.game_id}.xml")
+        write_xml_history(filename, self.metadata, self.iter_events())
+        self._index("xml", filename)
 
         return filename
 
     def save_to_mongodb(self, connection_string=None):
-        try:
-            import pymongo
-            from mongodb_config import DEFAULT_CONNECTION_STRING, DATABASE_NAME, COLLECTION_NAME
-        except ImportError:
-            logger.error("MongoDB support not available. Install pymongo package.")
-            return None
+        from mongodb_config import get_connection
 
-        if not self.events:
+        if not self.event_count:
             logger.error("No events to save")
             return None
 
-        try:
-            conn_str = connection_string or DEFAULT_CONNECTION_STRING
-            client = pymongo.MongoClient(conn_str, serverSelectionTimeoutMS=5000)
-
-            client.server_info()
-
-            db = client[DATABASE_NAME]
-            collection = db[COLLECTION_NAME]
-
-            game_history = {
-                "metadata": self.metadata,
-                "events": self.events,
-                "timestamp": datetime.datetime.now()
-            }
-
-            result = collection.insert_one(game_history)
-            logger.info(f"Game history saved to MongoDB with ID: {result.inserted_id}")
-            return str(result.inserted_id)
-
-        except pymongo.errors.ServerSelectionTimeoutError:
-            logger.error("Could not connect to MongoDB server. Is it running?")
+        inserted_id = get_connection(connection_string).insert_history(self.metadata, self.iter_events())
+        if inserted_id is None:
             return None
+
+        logger.info(f"Game history saved to MongoDB with ID: {inserted_id}")
+        self._index("mongodb", str(inserted_id))
+        return str(inserted_id)
+
+
+class SaveCheckpoint:
+    # one GAME_SAVE, saved without the history before it: a line appended to the recording's
+    # checkpoint log and an upsert in MongoDB
+    def __init__(self, game_id, level, key, save_event, summary=None, path=None, save_index=None):
+        self.game_id = game_id
+        self.level = level
+        self.key = key
+        self.save_event = save_event
+        self.summary = summary or {}
+        self.path = path or checkpoint_path(key)
+        self.save_index = save_index
+
+    def save_to_file(self):
+        path = append_checkpoint(self.path, self.game_id, self.save_event)
+        try:
+            (self.save_index or get_save_index()).add(self.game_id, self.level, "checkpoint", path, os.path.getsize(path), None,
+                                 self.summary.get("points"), self.summary.get("time_taken"),
+                                 self.summary.get("board"))
         except Exception as e:
-            logger.error(f"MongoDB error: {e}")
-            return None
+            logger.error(f"Could not update save index: {e}")
+        return path
 
-    def _serialize_cell(self, cell):
-        if cell not in self.cell_id_map:
-            self.cell_id_map[cell] = len(self.cell_id_map)
+    def save_to_mongodb(self, connection_string=None):
+        from mongodb_config import get_connection, save_checkpoint
 
-        return {
-            "id": self.cell_id_map[cell],
-            "x": cell.x,
-            "y": cell.y,
-            "type": cell.cell_type.name,
-            "shape": cell.shape.name,
-            "evolution": cell.evolution.value,
-            "points": cell.points
-        }
+        return get_connection(connection_string).run(
+            lambda database: save_checkpoint(database, self.key, self.game_id, self.level, self.save_event))
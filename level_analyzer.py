@@ -0,0 +1,171 @@
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import statistics
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+
+from self_play import get_self_play, rules_agent, AI_COOLDOWNS
+from level_cache import compile_level
+from ai_evaluation import EvaluationModel, WEIGHTS_FILE
+from level_store import LevelStore, LEVELS_DIR
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+GAMES_PER_TASK = 50
+
+
+def make_agent(kind, epsilon, rng):
+    if kind == "rules":
+        return rules_agent
+
+    model = EvaluationModel.load_if_exists(WEIGHTS_FILE) or EvaluationModel()
+    return model.agent(epsilon, rng)
+
+
+def run_games(task):
+    level_name, level_data, seeds, options = task
+    rng = random.Random(seeds[0])
+    player_agent = make_agent(options["player_agent"], options["epsilon"], rng)
+    enemy_agent = make_agent(options["enemy_agent"], options["epsilon"], rng)
+
+    # every game of the task on the worker's headless Game, the level compiled once
+    self_play = get_self_play()
+    compiled = compile_level(level_data)
+    results = []
+    for seed in seeds:
+        game = self_play.play(compiled, seed, player_agent, enemy_agent, options["player_ai"], options["enemy_ai"],
+                              options["max_time"], level_name=level_name)
+        results.append((level_name, game.result, game.duration, game.points))
+    return results
+
+
+def suggest_thresholds(win_scores, win_times):
+    if not win_scores:
+        return None
+
+    return {
+        "two_stars": int(np.percentile(win_scores, 50)),
+        "three_stars": int(np.percentile(win_scores, 80)),
+        "time_limit": int(np.percentile(win_times, 90))
+    }
+
+
+def summarize(level_name, results):
+    # stars as the game awards them, with its thresholds and time penalty
+    from main import calculate_stars
+
+    games = len(results)
+    wins = [r for r in results if r[1] == "Player Wins"]
+    losses = [r for r in results if r[1] == "Enemy Wins"]
+    win_scores = [r[3] for r in wins]
+    win_times = [r[2] for r in wins]
+
+    summary = {
+        "level": level_name,
+        "games": games,
+        "win_rate": len(wins) / games if games else 0,
+        "loss_rate": len(losses) / games if games else 0,
+        "draw_rate": (games - len(wins) - len(losses)) / games if games else 0,
+        "median_win_time": statistics.median(win_times) if win_times else None,
+        "median_game_time": statistics.median(r[2] for r in results) if results else None,
+        "score_percentiles": {str(p): float(np.percentile(win_scores, p)) for p in (10, 25, 50, 75, 90)}
+        if win_scores else {},
+        "current_stars": {
+            "three": sum(1 for r in wins if calculate_stars(r[3], r[2]) == 3) / games,
+            "two_or_more": sum(1 for r in wins if calculate_stars(r[3], r[2]) >= 2) / games,
+        } if games else {},
+        "suggested_thresholds": suggest_thresholds(win_scores, win_times)
+    }
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{summary['level']}: {summary['games']} games")
+    print(f"  win {summary['win_rate']:.1%}  loss {summary['loss_rate']:.1%}  draw {summary['draw_rate']:.1%}")
+
+    if summary["median_win_time"] is not None:
+        print(f"  median completion time: {summary['median_win_time']:.1f}s")
+    if summary["score_percentiles"]:
+        percentiles = "  ".join(f"p{p}={v:.0f}" for p, v in summary["score_percentiles"].items())
+        print(f"  winning scores: {percentiles}")
+        print(f"  reaching 2/3 stars with current thresholds: "
+              f"{summary['current_stars']['two_or_more']:.1%} / {summary['current_stars']['three']:.1%}")
+
+    thresholds = summary["suggested_thresholds"]
+    if thresholds:
+        print(f"  suggested stars: 2 at {thresholds['two_stars']}, 3 at {thresholds['three_stars']}, "
+              f"time penalty after {thresholds['time_limit']}s")
+    else:
+        print("  no wins - level looks unwinnable for this player AI")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless AI-vs-AI games on every level and report balance")
+    parser.add_argument("--level-dir", default=LEVELS_DIR)
+    parser.add_argument("--levels", nargs="*", help="level names, all levels by default")
+    parser.add_argument("--games", type=int, default=1000, help="games per level")
+    parser.add_argument("--workers", type=int, default=cpu_count())
+    parser.add_argument("--player-agent", choices=["eval", "rules"], default="eval")
+    parser.add_argument("--enemy-agent", choices=["eval", "rules"], default="rules")
+    parser.add_argument("--player-ai", choices=list(AI_COOLDOWNS), default="Medium")
+    parser.add_argument("--enemy-ai", choices=list(AI_COOLDOWNS), default="Medium")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="chance of a random top-5 move for eval agents")
+    parser.add_argument("--max-time", type=float, default=300.0, help="game seconds before a draw is declared")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    store = LevelStore(args.level_dir)
+    names = args.levels or store.names()
+    levels = {name: store.get(name) for name in names}
+    missing = [name for name in names if levels[name] is None]
+    if missing:
+        logger.error(f"Unknown levels: {', '.join(missing)}")
+        return 1
+
+    options = {
+        "player_agent": args.player_agent,
+        "enemy_agent": args.enemy_agent,
+        "player_ai": args.player_ai,
+        "enemy_ai": args.enemy_ai,
+        "epsilon": args.epsilon,
+        "max_time": args.max_time
+    }
+
+    rng = random.Random(args.seed)
+    tasks = []
+    for name in names:
+        seeds = [rng.getrandbits(32) for _ in range(args.games)]
+        for i in range(0, len(seeds), GAMES_PER_TASK):
+            tasks.append((name, levels[name], seeds[i:i + GAMES_PER_TASK], options))
+
+    start = time.perf_counter()
+    results = {name: [] for name in names}
+    with Pool(args.workers) as pool:
+        for batch in pool.imap_unordered(run_games, tasks):
+            for result in batch:
+                results[result[0]].append(result)
+
+    elapsed = time.perf_counter() - start
+    summaries = [summarize(name, results[name]) for name in names]
+    for summary in summaries:
+        print_summary(summary)
+
+    total_games = sum(len(r) for r in results.values())
+    print(f"\n{total_games} games in {elapsed:.1f}s with {args.workers} workers")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"options": options, "levels": summaries}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+CACHE_DIR = "saved_games/level_cache"
+# part of every key, bump it when the compiled layout changes so old cache files are not read
+COMPILED_VERSION = 2
+CACHED_LEVELS = 64
+# tiles are never smaller than those of a 10x10 level, a level with more of them is larger than the screen
+MIN_TILE_WIDTH = 80
+MIN_TILE_HEIGHT = 60
+# past this many cells the distance table gets too big (it grows with the square), distances are computed
+# when needed instead
+DISTANCE_TABLE_CELLS = 400
+
+COLORS = {"blue": "PLAYER", "red": "ENEMY"}  # anything else is an empty cell
+KINDS = {"c": "CIRCLE", "t": "TRIANGLE"}  # anything else is a rectangle
+EVOLUTIONS = (1, 2, 3)
+
+
+class LevelSchemaError(ValueError):
+    pass
+
+
+def level_hash(level_data):
+    # content hash of a level file's contents; the name is not part of it, so renaming a level keeps
+    # its compiled form
+    canonical = json.dumps(level_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(f"{COMPILED_VERSION}:{canonical}".encode("utf-8")).hexdigest()
+
+
+def validate_level(level_data):
+    if not isinstance(level_data, dict):
+        raise LevelSchemaError("level is not an object")
+
+    game_map = level_data.get("map")
+    if not isinstance(game_map, list) or not game_map or not all(isinstance(row, str) for row in game_map):
+        raise LevelSchemaError("map must be a non-empty list of strings")
+    if not game_map[0]:
+        raise LevelSchemaError("map rows must not be empty")
+
+    description = level_data.get("description", {})
+    if not isinstance(description, dict):
+        raise LevelSchemaError("description must be an object")
+
+    for cell_char, entries in description.items():
+        if len(cell_char) != 1 or not isinstance(entries, list):
+            raise LevelSchemaError(f"description of '{cell_char}' must be a list under a single character")
+        for i, cell_info in enumerate(entries):
+            if not isinstance(cell_info, dict):
+                raise LevelSchemaError(f"'{cell_char}' cell {i} is not an object")
+            for key in ("color", "kind", "evolution", "points"):
+                if key not in cell_info:
+                    raise LevelSchemaError(f"'{cell_char}' cell {i} has no {key}")
+            if cell_info["evolution"] not in EVOLUTIONS:
+                raise LevelSchemaError(f"'{cell_char}' cell {i} has evolution {cell_info['evolution']}")
+            if not isinstance(cell_info["points"], (int, float)) or isinstance(cell_info["points"], bool):
+                raise LevelSchemaError(f"'{cell_char}' cell {i} has points {cell_info['points']!r}")
+
+
+def compile_level(level_data):
+    # the ASCII map and its description turned into what load_level needs: the size of the world,
+    # one row per cell [x, y, type, shape, evolution, points] in map order, and the distance
+    # between every two cells, computed exactly as Game.calculate_distance does
+    validate_level(level_data)
+    game_map = level_data["map"]
+    description = level_data.get("description", {})
+
+    grid_width = max(MIN_TILE_WIDTH, SCREEN_WIDTH // len(game_map[0]))
+    grid_height = max(MIN_TILE_HEIGHT, SCREEN_HEIGHT // len(game_map))
+
+    cells = []
+    warnings = []
+    type_counters = {cell_char: 0 for cell_char in description}
+    for y, row in enumerate(game_map):
+        for x, cell_char in enumerate(row):
+            if cell_char == '#' or cell_char == ' ' or cell_char not in description:
+                continue
+
+            if type_counters[cell_char] >= len(description[cell_char]):
+                warnings.append(f"Too many cells of type {cell_char} in map")
+                continue
+
+            cell_info = description[cell_char][type_counters[cell_char]]
+            type_counters[cell_char] += 1
+            cells.append([
+                x * grid_width + grid_width // 2,
+                y * grid_height + grid_height // 2,
+                COLORS.get(cell_info["color"], "EMPTY"),
+                KINDS.get(cell_info["kind"], "RECTANGLE"),
+                cell_info["evolution"],
+                cell_info["points"]
+            ])
+
+    for cell_char, counter in type_counters.items():
+        if counter != len(description[cell_char]):
+            warnings.append(f"Not all cells of type {cell_char} were placed. "
+                            f"Used {counter}/{len(description[cell_char])}")
+
+    return {
+        "version": COMPILED_VERSION,
+        "world": [grid_width * len(game_map[0]), grid_height * len(game_map)],
+        "cells": cells,
+        "distances": distance_table([(x, y) for x, y, *_ in cells]) if len(cells) <= DISTANCE_TABLE_CELLS else None,
+        "warnings": warnings
+    }
+
+
+def distance_table(positions):
+    return [[math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2) for x2, y2 in positions] for x1, y1 in positions]
+
+
+class LevelCache:
+    # compiled levels by content hash, in memory and as JSON files next to the saves, so a level is
+    # only parsed again once its file changes
+    def __init__(self, directory=CACHE_DIR, size=CACHED_LEVELS):
+        self.directory = directory
+        self.size = size
+        self.levels = {}  # hash -> compiled level, oldest first
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, compiled):
+        with self.lock:
+            self.levels.pop(key, None)
+            self.levels[key] = compiled
+            while len(self.levels) > self.size:
+                self.levels.pop(next(iter(self.levels)))
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                compiled = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(compiled, dict) or compiled.get("version") != COMPILED_VERSION:
+            return None
+        return compiled
+
+    def _write(self, key, compiled):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_open(self._path(key), "w", encoding="utf-8") as f:
+                json.dump(compiled, f, separators=(',', ':'))
+        except OSError as e:
+            # only slower next time
+            logger.warning(f"Could not write level cache: {e}")
+
+    def get(self, level_data):
+        key = level_hash(level_data)
+        with self.lock:
+            compiled = self.levels.get(key)
+        if compiled is not None:
+            return compiled
+
+        compiled = self._read(key)
+        if compiled is None:
+            compiled = compile_level(level_data)
+            self._write(key, compiled)
+        self._remember(key, compiled)
+        return compiled
+
+    def warm(self, names, load):
+        # reads (load(name)) and compiles the given levels on a background thread, so even the first
+        # start of one of them is a cache hit
+        def run():
+            for name in list(names):
+                try:
+                    level_data = load(name)
+                    if level_data is not None:
+                        self.get(level_data)
+                except Exception as e:
+                    logger.error(f"Could not compile level {name}: {e}")
+
+        thread = threading.Thread(target=run, name="LevelCache", daemon=True)
+        thread.start()
+        return thread
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_level_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LevelCache()
+        return _default_cache
+
+
+def run_benchmark(repeats=200):
+    import tempfile
+    from level_store import get_level_store
+
+    store = get_level_store()
+    levels = {name: store.get(name) for name in store.names()}
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for level_data in levels.values():
+            compile_level(level_data)
+    parse_time = (time.perf_counter() - start) / (repeats * len(levels))
+
+    with tempfile.TemporaryDirectory() as directory:
+        cold = LevelCache(directory)
+        start = time.perf_counter()
+        for level_data in levels.values():
+            cold.get(level_data)
+        cold_time = (time.perf_counter() - start) / len(levels)
+
+        disk = LevelCache(directory)
+        start = time.perf_counter()
+        for level_data in levels.values():
+            disk.get(level_data)
+        disk_time = (time.perf_counter() - start) / len(levels)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for level_data in levels.values():
+                disk.get(level_data)
+        memory_time = (time.perf_counter() - start) / (repeats * len(levels))
+
+    print(f"{len(levels)} levels")
+    print(f"parse and compile: {parse_time * 1000:.3f} ms per level")
+    print(f"first start, compiled and written: {cold_time * 1000:.3f} ms")
+    print(f"from the disk cache: {disk_time * 1000:.3f} ms")
+    print(f"from memory (hash of the entry): {memory_time * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
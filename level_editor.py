@@ -4,17 +4,23 @@ import json
 import os
 import math
 from enum import Enum
+from level_store import get_level_store, get_level_catalogue, valid_level_name
 
 pygame.init()
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-GRID_SIZE = 10
+GRID_SIZE = 10  # of a new map, [ and ] change it
+MIN_GRID_SIZE = 5
+MAX_GRID_SIZE = 200
 CELL_SIZE = 40
 GRID_WIDTH = SCREEN_WIDTH // CELL_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // CELL_SIZE
 SIDEBAR_WIDTH = 200
 EDITOR_WIDTH = SCREEN_WIDTH - SIDEBAR_WIDTH
+VIEW_COLUMNS = EDITOR_WIDTH // CELL_SIZE  # squares in view, the arrow keys scroll larger maps
+VIEW_ROWS = SCREEN_HEIGHT // CELL_SIZE
+MAX_CELLS_PER_TYPE = 5  # on a 10x10 map, larger maps allow as many per free square
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -46,7 +52,10 @@ class LevelEditor:
         pygame.display.set_caption("War of Cells Level Editor")
         self.clock = pygame.time.Clock()
 
+        self.grid_size = GRID_SIZE
         self.grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+        self.view_x = 0
+        self.view_y = 0
         self.selected_cell_type = CellType.PLAYER
         self.selected_shape = CellShape.CIRCLE
         self.cell_points = 10
@@ -56,11 +65,11 @@ class LevelEditor:
             CellType.ENEMY: 0,
             CellType.OPEN: 0
         }
-        self.max_cells_per_type = 5
+        self.max_cells_per_type = MAX_CELLS_PER_TYPE
 
-        self.game_data = self.load_game_data()
-        self.levels = self.game_data.get("levels", {})
-        self.current_level_index = len(self.levels) + 1
+        self.level_store = get_level_store()
+        self.catalogue = get_level_catalogue()
+        self.levels = self.catalogue.order()
 
         self.show_save_dialog = False
         self.show_level_select = False
@@ -69,7 +78,7 @@ class LevelEditor:
         self.message = ""
         self.message_timer = 0
 
-        self.level_name_input = f"level{self.current_level_index}"
+        self.level_name_input = self.new_level_name()
         self.input_active = False
 
         self.selected_level_to_edit = None
@@ -209,26 +218,6 @@ class LevelEditor:
             "color": YELLOW
         })
 
-    def load_game_data(self):
-        try:
-            if os.path.exists("game_data.json"):
-                with open("game_data.json", "r") as file:
-                    return json.load(file)
-            else:
-                return {"levels": {}, "summary": {"total_levels": 0, "levels": {}}}
-        except Exception as e:
-            print(f"Error loading game data: {e}")
-            return {"levels": {}, "summary": {"total_levels": 0, "levels": {}}}
-
-    def save_game_data(self):
-        try:
-            with open("game_data.json", "w") as file:
-                json.dump(self.game_data, file, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving game data: {e}")
-            return False
-
     def return_to_menu(self):
         if self.main_game:
             self.main_game.show_menu()
@@ -246,10 +235,17 @@ class LevelEditor:
     def adjust_points(self, delta):
         self.cell_points = max(1, self.cell_points + delta)
 
+    def new_level_name(self):
+        # first free "level<N>" after the levels there are; any other valid name can be typed
+        number = len(self.levels) + 1
+        while f"level{number}" in self.levels:
+            number += 1
+        return f"level{number}"
+
     def toggle_save_dialog(self):
         self.show_save_dialog = not self.show_save_dialog
         if self.show_save_dialog:
-            self.level_name_input = f"level{self.current_level_index}"
+            self.level_name_input = self.new_level_name()
             self.input_active = True
 
     def toggle_level_select(self):
@@ -268,7 +264,7 @@ class LevelEditor:
         self.show_level_edit = False
 
     def clear_grid(self):
-        self.grid = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+        self.grid = [[None for _ in range(self.grid_size)] for _ in range(self.grid_size)]
         self.cells_count = {
             CellType.PLAYER: 0,
             CellType.ENEMY: 0,
@@ -276,6 +272,28 @@ class LevelEditor:
         }
         self.show_message("Grid cleared")
 
+    def set_grid_size(self, size):
+        # cells that end up outside the map or on its border are dropped
+        size = max(MIN_GRID_SIZE, min(MAX_GRID_SIZE, size))
+        grid = [[None for _ in range(size)] for _ in range(size)]
+        self.cells_count = {cell_type: 0 for cell_type in self.cells_count}
+        for y in range(1, min(size, self.grid_size) - 1):
+            for x in range(1, min(size, self.grid_size) - 1):
+                cell = self.grid[y][x]
+                if y < size - 1 and x < size - 1 and cell is not None:
+                    grid[y][x] = cell
+                    self.cells_count[cell["type"]] += 1
+
+        self.grid_size = size
+        self.grid = grid
+        free_squares = (size - 2) ** 2
+        self.max_cells_per_type = max(MAX_CELLS_PER_TYPE, free_squares * MAX_CELLS_PER_TYPE // (GRID_SIZE - 2) ** 2)
+        self.scroll_view(0, 0)
+
+    def scroll_view(self, dx, dy):
+        self.view_x = max(0, min(self.grid_size - VIEW_COLUMNS, self.view_x + dx))
+        self.view_y = max(0, min(self.grid_size - VIEW_ROWS, self.view_y + dy))
+
     def show_message(self, text, duration=2000):
         self.message = text
         self.message_timer = duration
@@ -284,10 +302,10 @@ class LevelEditor:
         return self.cells_count[cell_type] < self.max_cells_per_type
 
     def place_cell(self, grid_x, grid_y):
-        if not (0 <= grid_x < GRID_SIZE and 0 <= grid_y < GRID_SIZE):
+        if not (0 <= grid_x < self.grid_size and 0 <= grid_y < self.grid_size):
             return
 
-        if grid_x == 0 or grid_x == GRID_SIZE - 1 or grid_y == 0 or grid_y == GRID_SIZE - 1:
+        if grid_x == 0 or grid_x == self.grid_size - 1 or grid_y == 0 or grid_y == self.grid_size - 1:
             self.show_message("Cannot place cells on border")
             return
 
@@ -328,10 +346,10 @@ class LevelEditor:
 
     def create_level_map(self):
         map_data = []
-        for y in range(GRID_SIZE):
+        for y in range(self.grid_size):
             row = ""
-            for x in range(GRID_SIZE):
-                if x == 0 or x == GRID_SIZE - 1 or y == 0 or y == GRID_SIZE - 1:
+            for x in range(self.grid_size):
+                if x == 0 or x == self.grid_size - 1 or y == 0 or y == self.grid_size - 1:
                     row += "#"
                 elif self.grid[y][x] is None:
                     row += " "
@@ -347,8 +365,8 @@ class LevelEditor:
     def create_level_description(self):
         description = {"e": [], "u": [], "o": []}
 
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
+        for y in range(self.grid_size):
+            for x in range(self.grid_size):
                 if self.grid[y][x] is not None:
                     cell = self.grid[y][x]
 
@@ -381,8 +399,8 @@ class LevelEditor:
         return description
 
     def save_level(self):
-        if not self.level_name_input.startswith("level"):
-            self.show_message("Level name must start with 'level'")
+        if not valid_level_name(self.level_name_input):
+            self.show_message("Level name may only use letters, digits, '-' and '_'")
             return
 
         if self.cells_count[CellType.PLAYER] == 0:
@@ -398,48 +416,35 @@ class LevelEditor:
             "description": self.create_level_description()
         }
 
-        self.game_data["levels"][self.level_name_input] = level_data
-
-        if self.level_name_input not in self.game_data["summary"]["levels"]:
-            self.game_data["summary"]["levels"][self.level_name_input] = {
-                "stars": 0,
-                "time": "00:00",
-                "score": 0
-            }
-
-        self.game_data["summary"]["total_levels"] = len(self.game_data["levels"])
-
-        if self.save_game_data():
+        # only this level's file is written, a level without stats shows no stars yet; a new level
+        # goes to the end of the catalogue
+        if self.save_level_file(self.level_name_input, level_data):
             self.show_message(f"Level {self.level_name_input} saved successfully")
             self.show_save_dialog = False
-            self.levels = self.game_data["levels"]
-
-            level_numbers = []
-            for level in self.levels:
-                if level.startswith("level"):
-                    try:
-                        level_numbers.append(int(level[5:]))
-                    except ValueError:
-                        pass
-
-            if level_numbers:
-                self.current_level_index = max(level_numbers) + 1
-            else:
-                self.current_level_index = 1
+            self.levels = self.catalogue.order()
         else:
             self.show_message("Error saving level")
 
+    def save_level_file(self, level_name, level_data):
+        try:
+            self.level_store.save(level_name, level_data)
+            return True
+        except Exception as e:
+            print(f"Error saving level: {e}")
+            return False
+
     def load_level(self, level_name):
-        if level_name not in self.game_data["levels"]:
+        level_data = self.level_store.get(level_name)
+        if level_data is None:
             self.show_message(f"Level {level_name} not found")
             return
 
-        self.clear_grid()
-
-        level_data = self.game_data["levels"][level_name]
         map_data = level_data["map"]
         description = level_data["description"]
 
+        self.set_grid_size(max(len(map_data), max(len(row) for row in map_data)))
+        self.clear_grid()
+
         cell_data = {}
         for key, cells in description.items():
             for i, cell in enumerate(cells):
@@ -468,7 +473,7 @@ class LevelEditor:
 
         for y, row in enumerate(map_data):
             for x, char in enumerate(row):
-                if char in ["u", "e", "o"]:
+                if char in ["u", "e", "o"] and x < self.grid_size and y < self.grid_size:
                     cell_key = f"{char}{cell_counts[char]}"
                     if cell_key in cell_data:
                         self.grid[y][x] = cell_data[cell_key]
@@ -479,52 +484,30 @@ class LevelEditor:
         self.level_name_input = level_name
 
     def reorder_levels(self, level_name, target_index):
-        if level_name not in self.game_data["levels"] or target_index < 1:
+        if level_name not in self.levels or target_index < 1:
             return
 
-        level_names = sorted([name for name in self.game_data["levels"].keys() if name.startswith("level")],
-                             key=lambda x: int(x[5:]) if x[5:].isdigit() else float('inf'))
-
-        if level_name not in level_names:
-            return
-
-        current_index = level_names.index(level_name)
-        level_names.pop(current_index)
-
-        target_index = min(target_index - 1, len(level_names))
-        level_names.insert(target_index, level_name)
-
-        new_levels = {}
-        new_summary_levels = {}
-
-        for i, name in enumerate(level_names):
-            new_level_name = f"level{i + 1}"
-
-            new_levels[new_level_name] = self.game_data["levels"][name]
-
-            if name in self.game_data["summary"]["levels"]:
-                new_summary_levels[new_level_name] = self.game_data["summary"]["levels"][name]
-            else:
-                new_summary_levels[new_level_name] = {"stars": 0, "time": "00:00", "score": 0}
-
-        self.game_data["levels"] = new_levels
-        self.game_data["summary"]["levels"] = new_summary_levels
-        self.game_data["summary"]["total_levels"] = len(new_levels)
-
-        if self.save_game_data():
+        try:
+            # only the catalogue is rewritten, level files and their stats keep their names
+            self.catalogue.move(level_name, target_index - 1)
             self.show_message("Levels reordered successfully")
-            self.levels = self.game_data["levels"]
-        else:
+        except Exception as e:
+            print(f"Error reordering levels: {e}")
             self.show_message("Error reordering levels")
+        self.levels = self.catalogue.order()
 
     def draw_grid(self):
         self.screen.fill(BLACK)
+        font = pygame.font.SysFont(None, 20)
 
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        # only the squares in view, whatever the size of the map
+        for y in range(self.view_y, min(self.grid_size, self.view_y + VIEW_ROWS)):
+            for x in range(self.view_x, min(self.grid_size, self.view_x + VIEW_COLUMNS)):
+                left = (x - self.view_x) * CELL_SIZE
+                top = (y - self.view_y) * CELL_SIZE
+                rect = pygame.Rect(left, top, CELL_SIZE, CELL_SIZE)
 
-                if x == 0 or x == GRID_SIZE - 1 or y == 0 or y == GRID_SIZE - 1:
+                if x == 0 or x == self.grid_size - 1 or y == 0 or y == self.grid_size - 1:
                     pygame.draw.rect(self.screen, DARK_GRAY, rect)
                     continue
 
@@ -533,7 +516,7 @@ class LevelEditor:
 
                 if self.grid[y][x] is not None:
                     cell = self.grid[y][x]
-                    cell_rect = pygame.Rect(x * CELL_SIZE + 2, y * CELL_SIZE + 2, CELL_SIZE - 4, CELL_SIZE - 4)
+                    cell_rect = pygame.Rect(left + 2, top + 2, CELL_SIZE - 4, CELL_SIZE - 4)
 
                     if cell["type"] == CellType.PLAYER:
                         color = BLUE
@@ -544,14 +527,14 @@ class LevelEditor:
 
                     if cell["shape"] == CellShape.CIRCLE:
                         pygame.draw.circle(self.screen, color,
-                                           (x * CELL_SIZE + CELL_SIZE // 2,
-                                            y * CELL_SIZE + CELL_SIZE // 2),
+                                           (left + CELL_SIZE // 2,
+                                            top + CELL_SIZE // 2),
                                            CELL_SIZE // 2 - 4)
                     elif cell["shape"] == CellShape.TRIANGLE:
                         points = [
-                            (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + 4),
-                            (x * CELL_SIZE + 4, y * CELL_SIZE + CELL_SIZE - 4),
-                            (x * CELL_SIZE + CELL_SIZE - 4, y * CELL_SIZE + CELL_SIZE - 4)
+                            (left + CELL_SIZE // 2, top + 4),
+                            (left + 4, top + CELL_SIZE - 4),
+                            (left + CELL_SIZE - 4, top + CELL_SIZE - 4)
                         ]
                         pygame.draw.polygon(self.screen, color, points)
                     else:
@@ -560,17 +543,15 @@ class LevelEditor:
                     # Replace the existing code that draws cell info with this:
                     if cell["type"] == CellType.OPEN:
                         # For open cells, show 0/{points}
-                        font = pygame.font.SysFont(None, 20)
                         capture_text = f"0/{cell['points']}"
 
                         text_surface = font.render(capture_text, True, WHITE)
-                        text_rect = text_surface.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                                  y * CELL_SIZE + CELL_SIZE // 2))
+                        text_rect = text_surface.get_rect(center=(left + CELL_SIZE // 2,
+                                                                  top + CELL_SIZE // 2))
 
                         self.screen.blit(text_surface, text_rect)
                     else:
                         # For player/enemy cells
-                        font = pygame.font.SysFont(None, 20)
                         points_text = str(cell["points"])
 
                         # Calculate evolution based on points
@@ -585,10 +566,10 @@ class LevelEditor:
                         pts_surface = font.render(points_text, True, WHITE)
                         evo_surface = font.render(evolution_text, True, WHITE)
 
-                        pts_rect = pts_surface.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                                y * CELL_SIZE + CELL_SIZE // 2 - 5))
-                        evo_rect = evo_surface.get_rect(center=(x * CELL_SIZE + CELL_SIZE // 2,
-                                                                y * CELL_SIZE + CELL_SIZE // 2 + 10))
+                        pts_rect = pts_surface.get_rect(center=(left + CELL_SIZE // 2,
+                                                                top + CELL_SIZE // 2 - 5))
+                        evo_rect = evo_surface.get_rect(center=(left + CELL_SIZE // 2,
+                                                                top + CELL_SIZE // 2 + 10))
 
                         self.screen.blit(pts_surface, pts_rect)
                         self.screen.blit(evo_surface, evo_rect)
@@ -728,8 +709,7 @@ class LevelEditor:
         level_rects = []
         font = pygame.font.SysFont(None, 24)
 
-        level_names = sorted([name for name in self.levels.keys()],
-                             key=lambda x: int(x[5:]) if x[5:].isdigit() else float('inf'))
+        level_names = self.levels
 
         list_y = dialog_y + 60
         for level_name in level_names:
@@ -789,8 +769,7 @@ class LevelEditor:
         position_rects = []
         font = pygame.font.SysFont(None, 24)
 
-        level_names = sorted([name for name in self.levels.keys()],
-                             key=lambda x: int(x[5:]) if x[5:].isdigit() else float('inf'))
+        level_names = self.levels
 
         list_y = dialog_y + 80
         for i, level_name in enumerate(level_names):
@@ -926,10 +905,10 @@ class LevelEditor:
                                     button["action"]()
                                     break
                             else:
-                                grid_x = mouse_pos[0] // CELL_SIZE
-                                grid_y = mouse_pos[1] // CELL_SIZE
+                                grid_x = mouse_pos[0] // CELL_SIZE + self.view_x
+                                grid_y = mouse_pos[1] // CELL_SIZE + self.view_y
 
-                                if grid_x < GRID_SIZE and grid_y < GRID_SIZE:
+                                if mouse_pos[0] < EDITOR_WIDTH and grid_x < self.grid_size and grid_y < self.grid_size:
                                     self.place_cell(grid_x, grid_y)
 
                 elif event.type == pygame.KEYDOWN:
@@ -942,6 +921,12 @@ class LevelEditor:
                             self.show_save_dialog = False
                         else:
                             self.level_name_input += event.unicode
+                    elif event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+                        self.scroll_view((event.key == pygame.K_RIGHT) - (event.key == pygame.K_LEFT),
+                                         (event.key == pygame.K_DOWN) - (event.key == pygame.K_UP))
+                    elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+                        self.set_grid_size(self.grid_size + (5 if event.key == pygame.K_RIGHTBRACKET else -5))
+                        self.show_message(f"Map size {self.grid_size}x{self.grid_size}")
 
             self.draw_grid()
             self.draw_sidebar()
@@ -0,0 +1,255 @@
+import math
+import time
+import logging
+from collections import OrderedDict
+
+import pygame
+
+from level_store import EMPTY_STATS, DEFAULT_PACK, get_level_catalogue, get_level_stats
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+TILE_WIDTH = 150
+TILE_HEIGHT = 180
+TILES_PER_ROW = 3
+SPACING = 30
+ROW_HEIGHT = TILE_HEIGHT + SPACING
+STAR_SIZE = 25
+SCROLL_STEP = ROW_HEIGHT // 3  # px per mouse wheel notch
+CACHED_TILES = 128  # a few screens worth
+
+UNLOCKED_COLOR = (60, 80, 120)
+LOCKED_COLOR = (60, 60, 60)
+BORDER_COLOR = (200, 200, 255)
+STAR_COLOR = (255, 255, 0)
+NO_STAR_COLOR = (70, 70, 70)
+TEXT_COLOR = (255, 255, 255)
+INFO_COLOR = (200, 200, 200)
+SCROLLBAR_COLOR = (100, 100, 160)
+
+
+def star_polygon(size):
+    points = []
+    for i in range(5):
+        angle = math.pi * 2 * i / 5 - math.pi / 2
+        points.append((size / 2 + math.cos(angle) * size / 2, size / 2 + math.sin(angle) * size / 2))
+        angle += math.pi / 5
+        points.append((size / 2 + math.cos(angle) * size / 4, size / 2 + math.sin(angle) * size / 4))
+    return points
+
+
+class LevelGrid:
+    # level tiles of the menu in a scrolling viewport, one pack at a time; only the rows in view are
+    # drawn, and each tile is rendered once into a surface that is kept until its stats change
+    def __init__(self, viewport, catalogue=None, stats=None):
+        self.viewport = pygame.Rect(viewport)
+        self.catalogue = catalogue or get_level_catalogue()
+        self.stats_store = stats or get_level_stats()
+        self.start_x = self.viewport.x + (self.viewport.width - (TILES_PER_ROW * TILE_WIDTH +
+                                                                 (TILES_PER_ROW - 1) * SPACING)) // 2
+
+        self.font = pygame.font.SysFont('Arial', 22, bold=True)
+        self.small_font = pygame.font.SysFont('Arial', 14)
+        self.star_points = star_polygon(STAR_SIZE)
+        self.lock_img = pygame.Surface((50, 50), pygame.SRCALPHA)
+        pygame.draw.rect(self.lock_img, (150, 150, 150), (15, 20, 20, 20))
+        pygame.draw.rect(self.lock_img, (150, 150, 150), (10, 10, 30, 15))
+        pygame.draw.circle(self.lock_img, (100, 100, 100), (25, 20), 8)
+
+        self.tiles = OrderedDict()  # (name, number, unlocked, stats) -> surface
+        self.headers = {}  # pack index -> surface
+        self.pack = 0
+        self.scroll = 0
+        self.refresh()
+
+    def refresh(self):
+        # after a game or the editor: levels, their order and the stats may have changed; tiles
+        # that still look the same are kept
+        self.packs = self.catalogue.packs() or [(DEFAULT_PACK, [])]
+        self.stats = self.stats_store.all()
+        self.headers.clear()
+        self.pack = min(self.pack, len(self.packs) - 1)
+        self.scroll_by(0)
+
+    @property
+    def levels(self):
+        return self.packs[self.pack][1]
+
+    @property
+    def max_scroll(self):
+        rows = -(-len(self.levels) // TILES_PER_ROW)
+        return max(0, rows * ROW_HEIGHT - SPACING - self.viewport.height)
+
+    def scroll_by(self, pixels):
+        self.scroll = max(0, min(self.max_scroll, self.scroll + pixels))
+
+    def scroll_to(self, name):
+        if name in self.levels:
+            self.scroll = 0
+            self.scroll_by(self.levels.index(name) // TILES_PER_ROW * ROW_HEIGHT)
+
+    def select_pack(self, step):
+        self.pack = (self.pack + step) % len(self.packs)
+        self.scroll = 0
+
+    def unlocked(self, name):
+        return self.catalogue.unlocked(name, self.stats)
+
+    def visible(self):
+        # indices of the levels in rows that reach into the viewport
+        first_row = self.scroll // ROW_HEIGHT
+        last_row = (self.scroll + self.viewport.height) // ROW_HEIGHT
+        return range(first_row * TILES_PER_ROW, min(len(self.levels), (last_row + 1) * TILES_PER_ROW))
+
+    def tile_position(self, index):
+        row, col = divmod(index, TILES_PER_ROW)
+        return (self.start_x + col * (TILE_WIDTH + SPACING),
+                self.viewport.y + row * ROW_HEIGHT - self.scroll)
+
+    def level_at(self, pos):
+        # the tile under pos, by arithmetic rather than testing every tile
+        if not self.viewport.collidepoint(pos):
+            return None
+        x = pos[0] - self.start_x
+        y = pos[1] - self.viewport.y + self.scroll
+        col, tile_x = divmod(x, TILE_WIDTH + SPACING)
+        row, tile_y = divmod(y, ROW_HEIGHT)
+        if x < 0 or col >= TILES_PER_ROW or tile_x > TILE_WIDTH or tile_y > TILE_HEIGHT:
+            return None
+        index = int(row) * TILES_PER_ROW + int(col)
+        return self.levels[index] if index < len(self.levels) else None
+
+    def tile(self, name):
+        number = self.catalogue.position(name) + 1
+        unlocked = self.unlocked(name)
+        level_info = self.stats.get(name, EMPTY_STATS)
+        key = (name, number, unlocked, level_info["stars"], level_info["time"], level_info["score"])
+        surface = self.tiles.get(key)
+        if surface is not None:
+            self.tiles.move_to_end(key)
+            return surface
+
+        surface = pygame.Surface((TILE_WIDTH, TILE_HEIGHT))
+        surface.fill(UNLOCKED_COLOR if unlocked else LOCKED_COLOR)
+        pygame.draw.rect(surface, BORDER_COLOR, (0, 0, TILE_WIDTH, TILE_HEIGHT), 2)
+
+        level_surface = self.font.render(f"Level {number}", True, TEXT_COLOR)
+        surface.blit(level_surface, level_surface.get_rect(center=(TILE_WIDTH / 2, 25)))
+
+        if unlocked:
+            for s in range(3):
+                star_x = TILE_WIDTH / 2 - (STAR_SIZE * 3) / 2 + s * STAR_SIZE
+                pygame.draw.polygon(surface, STAR_COLOR if s < level_info["stars"] else NO_STAR_COLOR,
+                                    [(p[0] + star_x, p[1] + 55) for p in self.star_points])
+
+            time_surface = self.small_font.render(f"Time: {level_info['time']}", True, INFO_COLOR)
+            surface.blit(time_surface, time_surface.get_rect(center=(TILE_WIDTH / 2, 90)))
+            score_surface = self.small_font.render(f"Score: {level_info['score']}", True, INFO_COLOR)
+            surface.blit(score_surface, score_surface.get_rect(center=(TILE_WIDTH / 2, 110)))
+        else:
+            surface.blit(self.lock_img, (TILE_WIDTH / 2 - 25, 60))
+
+        self.tiles[key] = surface
+        while len(self.tiles) > CACHED_TILES:
+            self.tiles.popitem(last=False)
+        return surface
+
+    def header(self):
+        # "< pack (2/4) >" above the grid, only when there is more than one pack
+        if len(self.packs) < 2:
+            return None
+        if self.pack not in self.headers:
+            pack_name, levels = self.packs[self.pack]
+            self.headers[self.pack] = self.small_font.render(
+                f"<  {pack_name} ({self.pack + 1}/{len(self.packs)}, {len(levels)} levels)  >", True, INFO_COLOR)
+        return self.headers[self.pack]
+
+    def draw(self, screen):
+        header = self.header()
+        if header is not None:
+            screen.blit(header, header.get_rect(center=(self.viewport.centerx, self.viewport.y - 12)))
+
+        screen.set_clip(self.viewport)
+        for index in self.visible():
+            screen.blit(self.tile(self.levels[index]), self.tile_position(index))
+        screen.set_clip(None)
+
+        if self.max_scroll:
+            height = self.viewport.height
+            bar_height = max(20, height * height // (height + self.max_scroll))
+            bar_y = self.viewport.y + (height - bar_height) * self.scroll // self.max_scroll
+            pygame.draw.rect(screen, SCROLLBAR_COLOR, (self.viewport.right - 6, bar_y, 4, bar_height))
+
+    def handle_event(self, event):
+        # scrolling and pack keys; returns True when the event was used
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
+            self.scroll_by(-SCROLL_STEP if event.button == 4 else SCROLL_STEP)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_UP, pygame.K_DOWN):
+            self.scroll_by(-ROW_HEIGHT if event.key == pygame.K_UP else ROW_HEIGHT)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+            self.scroll_by(-self.viewport.height if event.key == pygame.K_PAGEUP else self.viewport.height)
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_HOME, pygame.K_END):
+            self.scroll = 0 if event.key == pygame.K_HOME else self.max_scroll
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self.select_pack(-1 if event.key == pygame.K_LEFT else 1)
+        elif (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and len(self.packs) > 1 and
+              self.viewport.y - 24 <= event.pos[1] < self.viewport.y):
+            self.select_pack(-1 if event.pos[0] < self.viewport.centerx else 1)
+        else:
+            return False
+        return True
+
+
+def run_benchmark(num_levels=1000, packs=10, frames=600):
+    # a catalogue of num_levels copies of level1 in a scratch directory, scrolled from top to bottom
+    # one frame at a time
+    import os
+    import json
+    import tempfile
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from level_store import LevelStore, LevelCatalogue, LevelStats, get_level_store
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    level_data = get_level_store().get("level1")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LevelStore(os.path.join(directory, "levels"))
+        for i in range(num_levels):
+            store.save(f"level{i + 1}", level_data)
+        per_pack = num_levels // packs
+        names = [f"level{i + 1}" for i in range(num_levels)]
+        with open(os.path.join(store.directory, "catalogue.json"), "w") as f:
+            json.dump({"packs": [{"name": f"Pack {p + 1}", "levels": names[p * per_pack:(p + 1) * per_pack]}
+                                 for p in range(packs)]}, f)
+        stats = LevelStats(os.path.join(directory, "stats.sqlite"))
+        for i in range(num_levels * 2 // 3):
+            stats.record(f"level{i + 1}", i % 3 + 1, "01:00", 1000 + i)
+
+        start = time.perf_counter()
+        catalogue = LevelCatalogue(store)
+        grid = LevelGrid(pygame.Rect(0, 170, 800, 390), catalogue, stats)
+        open_time = time.perf_counter() - start
+
+        whole = LevelGrid(pygame.Rect(0, 170, 800, 390), LevelCatalogue(LevelStore(store.directory),
+                                                                         os.path.join(directory, "none.json")),
+                          stats)
+        frame_times = []
+        for grid_under_test in (grid, whole):
+            for frame in range(frames):
+                start = time.perf_counter()
+                screen.fill((20, 20, 40))
+                grid_under_test.scroll = grid_under_test.max_scroll * frame // (frames - 1)
+                grid_under_test.draw(screen)
+                grid_under_test.level_at((400, 300))
+                frame_times.append((time.perf_counter() - start) * 1000)
+
+    for name, times in (("one pack", frame_times[:frames]), (f"all {num_levels} in one pack", frame_times[frames:])):
+        times.sort()
+        print(f"{name}: mean {sum(times) / len(times):.3f} ms, p95 {times[int(len(times) * 0.95)]:.3f} ms, "
+              f"max {times[-1]:.3f} ms per frame")
+    print(f"catalogue of {num_levels} levels and stats read in {open_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,319 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+LEVELS_DIR = "levels"
+LEVEL_EXTENSION = ".json"
+CATALOGUE_NAME = "catalogue.json"  # in the levels directory, not a level
+DEFAULT_PACK = "Levels"
+STATS_FILE = "saved_games/level_stats.sqlite"
+SETTINGS_FILE = "settings.json"
+# levels, stats and settings in one file, as written before the split; imported once
+LEGACY_GAME_DATA = "game_data.json"
+EMPTY_STATS = {"stars": 0, "time": "00:00", "score": 0}
+
+
+def natural_key(name):
+    # "level10" after "level9"
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def valid_level_name(name):
+    # the name is also the file name
+    return bool(re.fullmatch(r"[A-Za-z0-9_-]+", name))
+
+
+class LevelStore:
+    # one JSON file per level, levels/<name>.json holding its "map" and "description"; listing only
+    # reads the directory, a level's file is opened when it is played or edited
+    def __init__(self, directory=LEVELS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        # bumped when a level is added, lets the catalogue tell its order is stale
+        self.version = 0
+        self._names = None
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}{LEVEL_EXTENSION}")
+
+    def names(self):
+        with self.lock:
+            if self._names is None:
+                try:
+                    entries = os.listdir(self.directory)
+                except OSError:
+                    entries = []
+                self._names = sorted(entry[:-len(LEVEL_EXTENSION)] for entry in entries
+                                     if entry.endswith(LEVEL_EXTENSION) and entry != CATALOGUE_NAME)
+            return list(self._names)
+
+    def __contains__(self, name):
+        return name in self.names()
+
+    def __len__(self):
+        return len(self.names())
+
+    def get(self, name):
+        try:
+            with open(self.path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, name, level_data):
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_open(self.path(name), "w", encoding="utf-8") as f:
+            json.dump(level_data, f, indent=4)
+        with self.lock:
+            self._names = None
+            self.version += 1
+
+
+class LevelCatalogue:
+    # the order levels are played in, grouped into packs; levels/catalogue.json holds
+    # {"packs": [{"name": ..., "levels": [...]}, ...]}, level files it does not list are added to
+    # the last pack in natural order, listed levels without a file are left out
+    def __init__(self, store, path=None):
+        self.store = store
+        self.path = path or os.path.join(store.directory, CATALOGUE_NAME)
+        self.lock = threading.Lock()
+        self.version = None  # store version the order below was built from
+        self._packs = []
+        self._order = []
+        self._positions = {}
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                packs = json.load(f).get("packs", [])
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Invalid level catalogue {self.path}: {e}")
+            return []
+        return [(pack.get("name", DEFAULT_PACK), list(pack.get("levels", []))) for pack in packs]
+
+    def _build(self, packs):
+        names = set(self.store.names())
+        listed = set()
+        built = []
+        for pack_name, levels in packs:
+            levels = [name for name in levels if name in names and name not in listed]
+            listed.update(levels)
+            built.append((pack_name, levels))
+
+        unlisted = sorted(names - listed, key=natural_key)
+        if unlisted:
+            if not built:
+                built.append((DEFAULT_PACK, []))
+            built[-1][1].extend(unlisted)
+
+        self._packs = [(pack_name, levels) for pack_name, levels in built if levels]
+        self._order = [name for _, levels in self._packs for name in levels]
+        self._positions = {name: i for i, name in enumerate(self._order)}
+
+    def _current(self):
+        # the catalogue file is read again only after a level was added
+        with self.lock:
+            if self.version != self.store.version:
+                self.version = self.store.version
+                self._build(self._read())
+
+    def packs(self):
+        self._current()
+        return [(pack_name, list(levels)) for pack_name, levels in self._packs]
+
+    def order(self):
+        self._current()
+        return list(self._order)
+
+    def __len__(self):
+        self._current()
+        return len(self._order)
+
+    def position(self, name):
+        self._current()
+        return self._positions.get(name)
+
+    def next_level(self, name):
+        position = self.position(name)
+        if position is None or position + 1 >= len(self._order):
+            return None
+        return self._order[position + 1]
+
+    def previous_level(self, name):
+        position = self.position(name)
+        if not position:
+            return None
+        return self._order[position - 1]
+
+    def unlocked(self, name, stats):
+        # the first level, and every level after one won with at least a star; stats: {level: stats}
+        # as from LevelStats.all()
+        position = self.position(name)
+        if position is None:
+            return False
+        previous = self.previous_level(name)
+        return previous is None or stats.get(previous, EMPTY_STATS)["stars"] > 0
+
+    def move(self, name, position):
+        # to position (from 0) of the whole order, into the pack that holds that position
+        self._current()
+        with self.lock:
+            if name not in self._positions:
+                return False
+            packs = [(pack_name, [level for level in levels if level != name])
+                     for pack_name, levels in self._packs]
+            position = max(0, min(position, len(self._order) - 1))
+            for pack_name, levels in packs:
+                if position <= len(levels):
+                    levels.insert(position, name)
+                    break
+                position -= len(levels)
+
+            self._write(packs)
+            self._build(packs)
+        return True
+
+    def _write(self, packs):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with atomic_open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"packs": [{"name": pack_name, "levels": levels} for pack_name, levels in packs]}, f,
+                      indent=4)
+
+
+class LevelStats:
+    # stars, time and score of each level's last win in SQLite; a win replaces one row, however many
+    # levels there are
+    def __init__(self, path=STATS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.lock, self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS level_stats (
+                    level TEXT PRIMARY KEY,
+                    stars INTEGER NOT NULL,
+                    time TEXT NOT NULL,
+                    score NUMERIC NOT NULL
+                )""")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY)")
+
+    def get(self, level):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT stars, time, score FROM level_stats WHERE level = ?", (level,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def all(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT * FROM level_stats").fetchall()
+        return {row["level"]: {"stars": row["stars"], "time": row["time"], "score": row["score"]} for row in rows}
+
+    def record(self, level, stars, time, score):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO level_stats (level, stars, time, score) VALUES (?, ?, ?, ?)",
+                (level, stars, time, score))
+
+    def imported(self, path):
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM imports WHERE path = ?", (os.path.abspath(path),)).fetchone() is not None
+
+    def import_stats(self, levels, path):
+        # stats already in the table are newer than the file's
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO level_stats (level, stars, time, score) VALUES (?, ?, ?, ?)",
+                [(level, info.get("stars", 0), info.get("time", "00:00"), info.get("score", 0))
+                 for level, info in levels.items()])
+            self.connection.execute("INSERT OR IGNORE INTO imports (path) VALUES (?)", (os.path.abspath(path),))
+
+
+def import_game_data(store, stats, path=LEGACY_GAME_DATA, settings_path=SETTINGS_FILE):
+    # a game_data.json from before the split: levels that have no file yet are written out, its summary
+    # goes into the stats table and its settings to settings.json; the file itself is left alone
+    if not os.path.exists(path) or stats.imported(path):
+        return False
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            game_data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not import {path}: {e}")
+        return False
+
+    known = set(store.names())
+    levels = game_data.get("levels", {})
+    for name, level_data in levels.items():
+        if name not in known:
+            store.save(name, level_data)
+
+    if "settings" in game_data and not os.path.exists(settings_path):
+        with atomic_open(settings_path, "w", encoding="utf-8") as f:
+            json.dump(game_data["settings"], f, indent=4)
+
+    stats.import_stats(game_data.get("summary", {}).get("levels", {}), path)
+    logger.info(f"Imported {len(levels)} levels from {path}")
+    return True
+
+
+def load_settings(path=SETTINGS_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.error(f"Invalid settings file {path}: {e}")
+        return {}
+
+
+_default_store = None
+_default_catalogue = None
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def get_level_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = LevelStore()
+        return _default_store
+
+
+def get_level_catalogue():
+    global _default_catalogue
+    store = get_level_store()
+    with _default_lock:
+        if _default_catalogue is None:
+            _default_catalogue = LevelCatalogue(store)
+        return _default_catalogue
+
+
+def get_level_stats():
+    global _default_stats
+    store = get_level_store()
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = LevelStats()
+            try:
+                import_game_data(store, _default_stats)
+            except OSError as e:
+                logger.error(f"Could not import game data: {e}")
+        return _default_stats
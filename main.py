@@ -7,12 +7,31 @@ from enum import Enum, auto
 from typing import List, Dict, Tuple, Optional
 import logging
 import json
+import time
+import zlib
+import atexit
+import itertools
 from level_editor import *
 from initial_menu_window import *
 from game_recorder import *
 from game_playback import *
-from client import *
-from server import *
+from ai_scoring import *
+from ai_cache import *
+from persistence import *
+from replay_browser import ReplayBrowser
+from replay_simulation import keyframe_seed
+from mongodb_config import get_connection, find_games, find_last_save, find_checkpoint, prepare_in_background
+from checkpoints import COMPACT_EVERY, checkpoint_key, read_last_checkpoint
+from autosave import AutosaveScheduler, FrameTimer
+from level_cache import LevelSchemaError, DISTANCE_TABLE_CELLS, get_level_cache, distance_table
+from level_store import get_level_store, get_level_catalogue, get_level_stats, load_settings
+from level_select import LevelGrid
+from camera import Camera, DETAIL_ZOOM, ZOOM_STEP, PAN_SPEED, world_size
+from event_stream import read_json_last_save
+from xml_history import read_xml_last_save
+from replay_format import read_binary_last_save
+if NUMPY_AVAILABLE:
+    from ai_evaluation import EvaluationModel
 
 pygame.init()
 
@@ -23,9 +42,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger('WarOfCEllsGame')
 
+
+class RateLimitedLogger:
+    # debug channel for per-frame code paths, each key logs at most once per interval
+    def __init__(self, target_logger, interval=5.0):
+        self.logger = target_logger
+        self.interval = interval
+        self.last_logged = {}
+
+    def debug(self, key, message):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        now = time.monotonic()
+        if now - self.last_logged.get(key, float("-inf")) >= self.interval:
+            self.last_logged[key] = now
+            self.logger.debug(message)
+
+
+render_debug = RateLimitedLogger(logger)
+
+_fonts = {}
+
+
+def get_font(size, bold=False):
+    # SysFont looks the font up on every call, cells draw their text every frame
+    key = (size, bold)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont('Arial', size, bold=bold)
+    return _fonts[key]
+
+
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
+TICK_MS = 1000 / FPS  # the rules always advance in steps of one frame at 60 FPS
+MAX_TICKS_PER_FRAME = 5
 BACKGROUND_COLOR = (10, 10, 20)
 
 CELL_RADIUS = 30
@@ -40,6 +92,12 @@ EMPTY_COLOR = (50, 50, 50)  # Dark Gray
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
+PLAYBACK_CONTROLS_HEIGHT = 50
+PLAYBACK_SKIP = 10.0  # s, up/down arrows in replays
+RECOVERY_CANDIDATES = 5  # unfinished saves tried, newest first, before starting the level afresh
+CELL_VIEW_MARGIN = CELL_RADIUS + 30  # glow, support ring and evolution label reach past the cell
+BALL_VIEW_MARGIN = BALL_RADIUS + 20  # the trail behind a ball
+
 
 class CellType(Enum):
     EMPTY = 0
@@ -94,7 +152,10 @@ class GameType(Enum):
 
 class Cell:
     def __init__(self, x: int, y: int, cell_type: CellType, shape: CellShape = CellShape.CIRCLE,
-                 evolution: EvolutionLevel = EvolutionLevel.LEVEL_1):
+                 evolution: EvolutionLevel = EvolutionLevel.LEVEL_1, cell_id: Optional[int] = None):
+        # index of the cell in the level, assigned by load_level; the name saves, replays and
+        # recorded events use for it
+        self.id = cell_id
         self.x = x
         self.y = y
         self.cell_type = cell_type
@@ -105,6 +166,7 @@ class Cell:
         self.points_to_capture = 0
         self.enemy_points_to_capture = 0
         self.last_growth_time = pygame.time.get_ticks()
+        self.distances = None  # distance to every cell of the level by id, from the compiled level
         self.outgoing_bridges = []
         self.incoming_bridges = []
         self.pulse_value = random.random() * math.pi * 2
@@ -135,9 +197,19 @@ class Cell:
         self.rotation = (self.rotation + 0.5) % 360
 
     def draw(self, screen, game):
+        # in world coordinates, through the game's camera
+        scale = game.camera.zoom
+        x, y = game.camera.to_screen(self.x, self.y)
+        radius = CELL_RADIUS * scale
+
+        if scale < DETAIL_ZOOM:
+            # zoomed far out only the owner can be told apart
+            pygame.draw.circle(screen, self.get_color(), (x, y), max(1, radius))
+            return
+
         pulse = (math.sin(self.pulse_value) + 1) / 2
 
-        glow_radius = CELL_RADIUS + 5 + pulse * 3
+        glow_radius = radius + (5 + pulse * 3) * scale
         glow_color = self.get_glow_color()
         glow_alpha = 150 + int(pulse * 60)
 
@@ -146,20 +218,20 @@ class Cell:
         pygame.draw.circle(glow_surface, (*glow_color, glow_alpha),
                            (glow_radius, glow_radius), glow_radius)
 
-        screen.blit(glow_surface, (self.x - glow_radius, self.y - glow_radius))
+        screen.blit(glow_surface, (x - glow_radius, y - glow_radius))
 
         if self.shape == CellShape.CIRCLE:
-            pygame.draw.circle(screen, self.get_color(), (self.x, self.y), CELL_RADIUS)
+            pygame.draw.circle(screen, self.get_color(), (x, y), radius)
 
-            highlight_radius = CELL_RADIUS * 0.7
+            highlight_radius = radius * 0.7
             highlight_color = (min(255, self.get_color()[0] + 50),
                                min(255, self.get_color()[1] + 50),
                                min(255, self.get_color()[2] + 50))
             pygame.draw.circle(screen, highlight_color,
-                               (self.x - CELL_RADIUS * 0.2, self.y - CELL_RADIUS * 0.2),
+                               (x - radius * 0.2, y - radius * 0.2),
                                highlight_radius)
 
-            pygame.draw.circle(screen, BLACK, (self.x, self.y), CELL_RADIUS, 2)
+            pygame.draw.circle(screen, BLACK, (x, y), radius, 2)
 
         elif self.shape == CellShape.TRIANGLE:
             angle_rad = math.radians(self.rotation)
@@ -167,8 +239,8 @@ class Cell:
             points = []
             for i in range(3):
                 angle = angle_rad + i * 2 * math.pi / 3
-                px = self.x + math.sin(angle) * CELL_RADIUS
-                py = self.y + math.cos(angle) * CELL_RADIUS
+                px = x + math.sin(angle) * radius
+                py = y + math.cos(angle) * radius
                 points.append((px, py))
 
             pygame.draw.polygon(screen, self.get_color(), points)
@@ -176,8 +248,8 @@ class Cell:
             inner_points = []
             for i in range(3):
                 angle = angle_rad + i * 2 * math.pi / 3
-                px = self.x + math.sin(angle) * CELL_RADIUS * 0.7
-                py = self.y + math.cos(angle) * CELL_RADIUS * 0.7
+                px = x + math.sin(angle) * radius * 0.7
+                py = y + math.cos(angle) * radius * 0.7
                 inner_points.append((px, py))
 
             highlight_color = (min(255, self.get_color()[0] + 50),
@@ -188,30 +260,30 @@ class Cell:
             pygame.draw.polygon(screen, BLACK, points, 2)
 
         elif self.shape == CellShape.RECTANGLE:
-            rect_surface = pygame.Surface((CELL_RADIUS * 2, CELL_RADIUS * 2), pygame.SRCALPHA)
+            rect_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
             pygame.draw.rect(rect_surface, self.get_color(),
-                             (0, 0, CELL_RADIUS * 2, CELL_RADIUS * 2))
+                             (0, 0, radius * 2, radius * 2))
 
             highlight_color = (min(255, self.get_color()[0] + 50),
                                min(255, self.get_color()[1] + 50),
                                min(255, self.get_color()[2] + 50))
             pygame.draw.rect(rect_surface, highlight_color,
-                             (CELL_RADIUS * 0.4, CELL_RADIUS * 0.4,
-                              CELL_RADIUS * 1.2, CELL_RADIUS * 1.2))
+                             (radius * 0.4, radius * 0.4,
+                              radius * 1.2, radius * 1.2))
 
-            pygame.draw.rect(rect_surface, BLACK, (0, 0, CELL_RADIUS * 2, CELL_RADIUS * 2), 2)
+            pygame.draw.rect(rect_surface, BLACK, (0, 0, radius * 2, radius * 2), 2)
 
             if self.cell_type != CellType.EMPTY:
                 rotated = pygame.transform.rotate(rect_surface, self.rotation / 4)
-                rotated_rect = rotated.get_rect(center=(self.x, self.y))
+                rotated_rect = rotated.get_rect(center=(x, y))
                 screen.blit(rotated, rotated_rect)
             else:
-                rect = pygame.Rect(self.x - CELL_RADIUS, self.y - CELL_RADIUS,
-                                   CELL_RADIUS * 2, CELL_RADIUS * 2)
+                rect = pygame.Rect(x - radius, y - radius,
+                                   radius * 2, radius * 2)
                 pygame.draw.rect(screen, self.get_color(), rect)
                 pygame.draw.rect(screen, BLACK, rect, 2)
 
-        font = pygame.font.SysFont('Arial', 14)
+        font = get_font(max(8, int(14 * scale)))
 
         if self.cell_type == CellType.EMPTY:
             domination_ratio = 0
@@ -220,10 +292,10 @@ class Cell:
             if total_points > 0:
                 domination_ratio = self.points_to_capture / total_points
 
-                base_gradient_radius = CELL_RADIUS + 5
+                base_gradient_radius = radius + 5 * scale
                 for i in range(3):
-                    gradient_radius = base_gradient_radius + i * 3
-                    thickness = 3 - i * 0.5
+                    gradient_radius = base_gradient_radius + i * 3 * scale
+                    thickness = max(1, (3 - i * 0.5) * scale)
 
                     pulse = (math.sin(self.pulse_value + i) + 1) / 4 + 0.9  # 0.9-1.15 range
                     gradient_radius *= pulse
@@ -237,7 +309,7 @@ class Cell:
                             min(255, PLAYER_COLOR[2] + i * 10)
                         )
                         pygame.draw.arc(screen, player_color,
-                                        (self.x - gradient_radius, self.y - gradient_radius,
+                                        (x - gradient_radius, y - gradient_radius,
                                          gradient_radius * 2, gradient_radius * 2),
                                         start_angle, end_angle, int(thickness))
 
@@ -250,7 +322,7 @@ class Cell:
                             ENEMY_COLOR[2]
                         )
                         pygame.draw.arc(screen, enemy_color,
-                                        (self.x - gradient_radius, self.y - gradient_radius,
+                                        (x - gradient_radius, y - gradient_radius,
                                          gradient_radius * 2, gradient_radius * 2),
                                         start_angle, end_angle, int(thickness))
             if game.turn_based_mode:
@@ -259,23 +331,23 @@ class Cell:
 
                 if is_active_player:
                     highlight_pulse = (math.sin(game.current_time * 0.01) + 1) / 2
-                    highlight_radius = CELL_RADIUS + 12 + highlight_pulse * 4
+                    highlight_radius = radius + (12 + highlight_pulse * 4) * scale
                     highlight_color = PLAYER_COLOR if self.cell_type == CellType.PLAYER else ENEMY_COLOR
                     highlight_alpha = 100 + int(highlight_pulse * 100)
 
                     highlight_surface = pygame.Surface((highlight_radius * 2, highlight_radius * 2), pygame.SRCALPHA)
                     pygame.draw.circle(highlight_surface, (*highlight_color, highlight_alpha),
                                        (highlight_radius, highlight_radius), highlight_radius, 2)
-                    screen.blit(highlight_surface, (self.x - highlight_radius, self.y - highlight_radius))
+                    screen.blit(highlight_surface, (x - highlight_radius, y - highlight_radius))
 
             progress_text = f"{self.points_to_capture - self.enemy_points_to_capture}/{self.required_points}"
             text_surface = font.render(progress_text, True, WHITE)
-            text_rect = text_surface.get_rect(center=(self.x, self.y))
+            text_rect = text_surface.get_rect(center=(x, y))
             screen.blit(text_surface, text_rect)
         else:
             points_text = str(self.points)
             text_surface = font.render(points_text, True, WHITE)
-            text_rect = text_surface.get_rect(center=(self.x, self.y))
+            text_rect = text_surface.get_rect(center=(x, y))
             screen.blit(text_surface, text_rect)
 
             evo_text = f"E{self.evolution.value}"
@@ -286,12 +358,12 @@ class Cell:
             else:
                 evo_color = (220, 150, 50)
             evo_surface = font.render(evo_text, True, evo_color)
-            evo_rect = evo_surface.get_rect(center=(self.x, self.y + CELL_RADIUS + 10))
+            evo_rect = evo_surface.get_rect(center=(x, y + radius + 10 * scale))
             screen.blit(evo_surface, evo_rect)
         supporting_cells = game.count_supporting_cells(self)
         if supporting_cells > 0:
             pulse = (math.sin(self.pulse_value * 2) + 1) / 2
-            support_radius = CELL_RADIUS + 8 + pulse * 5
+            support_radius = radius + (8 + pulse * 5) * scale
             support_alpha = 100 + int(pulse * 60)
 
             if self.cell_type == CellType.PLAYER:
@@ -302,14 +374,14 @@ class Cell:
             support_surface = pygame.Surface((support_radius * 2, support_radius * 2), pygame.SRCALPHA)
             pygame.draw.circle(support_surface, support_color,
                                (support_radius, support_radius), support_radius, 3)
-            screen.blit(support_surface, (self.x - support_radius, self.y - support_radius))
+            screen.blit(support_surface, (x - support_radius, y - support_radius))
 
             for i in range(min(3, supporting_cells)):
                 angle = self.pulse_value + (i * math.pi * 2 / 3)
-                icon_x = self.x + math.cos(angle) * (CELL_RADIUS + 15)
-                icon_y = self.y + math.sin(angle) * (CELL_RADIUS + 15)
+                icon_x = x + math.cos(angle) * (radius + 15 * scale)
+                icon_y = y + math.sin(angle) * (radius + 15 * scale)
 
-                icon_size = 5
+                icon_size = 5 * scale
                 pygame.draw.circle(screen, support_color[:3], (int(icon_x), int(icon_y)), icon_size)
 
     def contains_point(self, pos_x, pos_y):
@@ -320,8 +392,6 @@ class Cell:
         if self.cell_type != CellType.EMPTY:
             return False
 
-        original_type = self.cell_type
-
         if is_player:
             self.points_to_capture += points_gained
         else:
@@ -343,16 +413,6 @@ class Cell:
             self.enemy_points_to_capture = 0
             return True
 
-        if original_type == CellType.EMPTY and self.cell_type != CellType.EMPTY:
-            game = self.game
-            if not game.playback_active:
-                game.game_recorder.record_event("CELL_CAPTURED", {
-                    "cellId": game.game_recorder.cell_id_map.get(self, -1),
-                    "newType": self.cell_type.name,
-                    "points": self.points,
-                    "isPlayer": is_player
-                })
-
         return False
 
     def get_attack_multiplier(self):
@@ -367,6 +427,7 @@ class Cell:
 class Ball:
     def __init__(self, source_cell, target_cell, is_player):
         self.source_cell = source_cell
+        self.target_cell = target_cell
 
         self.source_x = source_cell.x
         self.source_y = source_cell.y
@@ -403,28 +464,37 @@ class Ball:
         self.y += self.direction_y * self.speed
         self.age += 1
 
-    def draw(self, screen):
+    def draw(self, screen, camera):
+        scale = camera.zoom
+        x, y = camera.to_screen(self.x, self.y)
+        radius = BALL_RADIUS * scale
+
+        if scale < DETAIL_ZOOM:
+            pygame.draw.circle(screen, self.color, (int(x), int(y)), max(1, int(radius)))
+            return
+
         for i, pos in enumerate(self.trail):
             alpha = int(255 * (i / len(self.trail)) * 0.6)
-            trail_radius = BALL_RADIUS * (i / len(self.trail)) * 0.8
+            trail_radius = radius * (i / len(self.trail)) * 0.8
+            trail_x, trail_y = camera.to_screen(*pos)
 
             trail_surface = pygame.Surface((int(trail_radius * 2), int(trail_radius * 2)), pygame.SRCALPHA)
             pygame.draw.circle(trail_surface, (*self.color, alpha),
                                (int(trail_radius), int(trail_radius)), int(trail_radius))
 
             screen.blit(trail_surface,
-                        (int(pos[0] - trail_radius), int(pos[1] - trail_radius)))
+                        (int(trail_x - trail_radius), int(trail_y - trail_radius)))
 
         pulse = (math.sin(self.age * 0.2) + 1) / 4 + 0.75  # 0.75-1.25 range
 
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)),
-                           int(BALL_RADIUS * pulse))
+        pygame.draw.circle(screen, self.color, (int(x), int(y)),
+                           int(radius * pulse))
 
         highlight_color = (min(255, self.color[0] + 100),
                            min(255, self.color[1] + 100),
                            min(255, self.color[2] + 100))
-        highlight_pos = (int(self.x - BALL_RADIUS * 0.3), int(self.y - BALL_RADIUS * 0.3))
-        highlight_radius = BALL_RADIUS * 0.4 * pulse
+        highlight_pos = (int(x - radius * 0.3), int(y - radius * 0.3))
+        highlight_radius = radius * 0.4 * pulse
         pygame.draw.circle(screen, highlight_color, highlight_pos, int(highlight_radius))
 
     def reached_target(self, target_cell):
@@ -439,6 +509,38 @@ class Ball:
         return distance <= BALL_RADIUS * 2
 
 
+class BallGrid:
+    # balls bucketed by position for the collision test in step(): a ball can only touch balls in
+    # its own bucket or the eight around it, so it is not tested against every ball on the board
+    def __init__(self, balls, size=BALL_RADIUS * 2):
+        self.size = size
+        self.buckets = {}
+        self.keys = {}
+        for ball in balls:
+            key = (int(ball.x // size), int(ball.y // size))
+            self.keys[ball] = key
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = [ball]
+            else:
+                bucket.append(ball)
+
+    def move(self, ball):
+        key = (int(ball.x // self.size), int(ball.y // self.size))
+        old_key = self.keys[ball]
+        if key != old_key:
+            self.buckets[old_key].remove(ball)
+            self.buckets.setdefault(key, []).append(ball)
+            self.keys[ball] = key
+
+    def near(self, ball):
+        bucket_x, bucket_y = self.keys[ball]
+        buckets = self.buckets
+        return [other for x in (bucket_x - 1, bucket_x, bucket_x + 1)
+                for y in (bucket_y - 1, bucket_y, bucket_y + 1)
+                for other in buckets.get((x, y), ())]
+
+
 class Bridge:
     def __init__(self, source_cell, target_cell):
         self.source_cell = source_cell
@@ -498,9 +600,10 @@ class Bridge:
 
         self.particles.append(particle)
 
-    def draw(self, screen):
-        source_x, source_y = self.source_cell.x, self.source_cell.y
-        target_x, target_y = self.target_cell.x, self.target_cell.y
+    def draw(self, screen, camera):
+        scale = camera.zoom
+        source_x, source_y = camera.to_screen(self.source_cell.x, self.source_cell.y)
+        target_x, target_y = camera.to_screen(self.target_cell.x, self.target_cell.y)
 
         dx = target_x - source_x
         dy = target_y - source_y
@@ -511,7 +614,8 @@ class Bridge:
         else:
             perp_x, perp_y = 0, 0
 
-        num_segments = max(10, int(distance / 20))
+        # zoomed far out a bridge is a straight line without particles or arrows
+        num_segments = max(10, int(distance / 20)) if scale >= DETAIL_ZOOM else 1
         points = []
 
         for i in range(num_segments + 1):
@@ -519,7 +623,7 @@ class Bridge:
             pos_x = source_x + dx * t
             pos_y = source_y + dy * t
 
-            wave_amplitude = 2.0
+            wave_amplitude = 2.0 * scale
             wave = math.sin(t * 10 + self.animation_offset) * wave_amplitude
             pos_x += perp_x * wave
             pos_y += perp_y * wave
@@ -543,9 +647,9 @@ class Bridge:
                 else:
                     color = WHITE
 
-                pygame.draw.line(screen, color, points[i], points[i + 1], BRIDGE_WIDTH)
+                pygame.draw.line(screen, color, points[i], points[i + 1], max(1, int(BRIDGE_WIDTH * scale)))
 
-        for particle in self.particles:
+        for particle in self.particles if scale >= DETAIL_ZOOM else ():
             t = particle['progress']
             if not particle['is_forward']:
                 t = 1.0 - t
@@ -553,32 +657,35 @@ class Bridge:
             pos_x = source_x + dx * t
             pos_y = source_y + dy * t
 
-            wave_amplitude = 2.0
+            wave_amplitude = 2.0 * scale
             wave = math.sin(t * 10 + self.animation_offset) * wave_amplitude
             pos_x += perp_x * wave
             pos_y += perp_y * wave
 
-            glow_surface = pygame.Surface((int(particle['size'] * 4), int(particle['size'] * 4)), pygame.SRCALPHA)
+            size = particle['size'] * scale
+            glow_surface = pygame.Surface((int(size * 4), int(size * 4)), pygame.SRCALPHA)
             pygame.draw.circle(glow_surface, (*particle['color'], 150),
-                               (int(particle['size'] * 2), int(particle['size'] * 2)),
-                               int(particle['size'] * 2))
+                               (int(size * 2), int(size * 2)),
+                               int(size * 2))
             screen.blit(glow_surface,
-                        (int(pos_x - particle['size'] * 2), int(pos_y - particle['size'] * 2)))
+                        (int(pos_x - size * 2), int(pos_y - size * 2)))
 
             pygame.draw.circle(screen, particle['color'],
                                (int(pos_x), int(pos_y)),
-                               int(particle['size']))
+                               int(size))
 
+        if scale < DETAIL_ZOOM:
+            return
         if self.direction == BridgeDirection.ONE_WAY:
-            self.draw_arrow(screen, (source_x, source_y), (target_x, target_y), WHITE)
+            self.draw_arrow(screen, (source_x, source_y), (target_x, target_y), WHITE, 8 * scale)
         else:
             midpoint_x = (source_x + target_x) / 2
             midpoint_y = (source_y + target_y) / 2
 
-            self.draw_arrow(screen, (source_x, source_y), (midpoint_x, midpoint_y), WHITE)
-            self.draw_arrow(screen, (target_x, target_y), (midpoint_x, midpoint_y), WHITE)
+            self.draw_arrow(screen, (source_x, source_y), (midpoint_x, midpoint_y), WHITE, 8 * scale)
+            self.draw_arrow(screen, (target_x, target_y), (midpoint_x, midpoint_y), WHITE, 8 * scale)
 
-    def draw_arrow(self, screen, start, end, color):
+    def draw_arrow(self, screen, start, end, color, arrow_head_size=8):
         dx = end[0] - start[0]
         dy = end[1] - start[1]
         distance = math.sqrt(dx ** 2 + dy ** 2)
@@ -594,7 +701,6 @@ class Bridge:
         perpendicular_x = -dy
         perpendicular_y = dx
 
-        arrow_head_size = 8
         point1 = (arrow_pos_x + perpendicular_x * arrow_head_size - dx * arrow_head_size,
                   arrow_pos_y + perpendicular_y * arrow_head_size - dy * arrow_head_size)
         point2 = (arrow_pos_x - perpendicular_x * arrow_head_size - dx * arrow_head_size,
@@ -604,7 +710,7 @@ class Bridge:
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, show_menu=True):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("War of Cells Game")
         self.clock = pygame.time.Clock()
@@ -617,6 +723,9 @@ class Game:
 
         self.selected_cell = None
         self.last_ball_spawn_time = {}
+        # the board is drawn in world coordinates through this, levels can be larger than the screen
+        self.camera = Camera()
+        self.dragging_camera = False
 
         self.control_enemy = False
         self.show_context_menu = False
@@ -639,13 +748,26 @@ class Game:
         self.time_taken = 0
         self.start_time = 0
 
+        # fixed-timestep clock and the random stream of the rules, both part of a replay
+        self.tick = 0
+        self.tick_accumulator = 0
+        self.seed = 0
+        self.rng = random.Random()
+        # replays set this to feed recorded inputs to step() instead of the AI
+        self.input_source = None
+        self.stepping = False
+
         self.ai_enabled = True
         self.ai_difficulty = "Medium"
         self.last_ai_move_time = 0
         self.ai_move_cooldown = 1000
         self.suggestions = []
         self.show_suggestions = False
-        self.last_suggestion_time = 0
+        self.suggestions_dirty = True
+        self.suggestions_key = None
+        self.ai_cache = DecisionCache()
+        # fitted with `python ai_evaluation.py fit`, the hand-written rules are used without it
+        self.evaluation_model = EvaluationModel.load_if_exists() if NUMPY_AVAILABLE else None
 
         self.game_type = GameType.SINGLE_PLAYER
 
@@ -655,12 +777,38 @@ class Game:
         }
 
         self.game_recorder = GameRecorder(self)
+        self.persistence = PersistenceWorker()
+        self.saves_since_export = 0
+        # registered after the worker's own shutdown, so it runs first and the export is waited for
+        atexit.register(self.abandon_recording)
+        if MONGODB_AVAILABLE:
+            prepare_in_background()
+        self.replay_browser = None
+        self.persistence_status = None
+        self.persistence_status_ok = True
+        self.persistence_status_time = 0
         self.game_playback = None
         self.playback_active = False
         self.playback_controls_visible = False
-
-        self.game_data = load_game_data("game_data.json")
-        self.show_first_menu()
+        self.scrubbing = False
+
+        self.levels = get_level_store()
+        self.catalogue = get_level_catalogue()
+        self.level_stats = get_level_stats()
+        self.level_grid = None
+        # only what the menu can start is read and compiled ahead
+        stats = self.level_stats.all()
+        unlocked = [name for name in self.catalogue.order() if self.catalogue.unlocked(name, stats)]
+        get_level_cache().warm(unlocked, self.levels.get)
+        self.autosave = AutosaveScheduler.from_settings(load_settings())
+        self.frame_timer = FrameTimer()
+        self.inputs_applied = 0
+        if show_menu:
+            # histories of earlier runs that crashed before exporting them; headless tools leave them alone
+            for path in self.game_recorder.orphan_streams():
+                self.persistence.submit("Unsaved game history",
+                                        [("export", self.game_recorder.export_stream_job(path))])
+            self.show_first_menu()
 
         #self.show_menu()
 
@@ -698,12 +846,19 @@ class Game:
             self.running = False
 
     def start_game(self):
-        saved_games = check_saved_games_for_level(self.current_level)
-        if saved_games:
-            if self.show_continue_dialog(saved_games[0]):
-                if self.load_saved_game(saved_games[0]):
+        recovered = find_recovery_save(self.current_level)
+        if recovered is not None:
+            saved_game, save_event = recovered
+            if self.show_continue_dialog(saved_game):
+                if saved_game.get("game_id") != self.game_recorder.game_id:
+                    # continuing another game than the one being recorded
+                    self.abandon_recording()
+                if self.load_saved_game(saved_game, save_event):
+                    self.seed = random.randrange(2 ** 31)
+                    self.reseed()
                     self.game_started = True
                     self.game_over_state = False
+                    self.autosave.reset(self.tick, self.inputs_applied)
                     logger.info(f"Continuing saved game for level: {self.current_level}")
                     return
         load_level(self, self.current_level)
@@ -713,6 +868,8 @@ class Game:
         self.points = 0
         self.time_taken = 0
         self.start_time = pygame.time.get_ticks() / 1000  # start time, seconds
+        self.reset_clock(random.randrange(2 ** 31))
+        self.autosave.reset(self.tick, self.inputs_applied)
 
         logger.info(f"Starting game with level: {self.current_level}")
 
@@ -720,13 +877,223 @@ class Game:
             logger.info(f"Connecting to {self.network_config['ip']}:{self.network_config['port']}")
 
         if not self.playback_active:
+            self.abandon_recording()
             self.game_recorder.start_recording()
+            self.saves_since_export = 0
+
+    def abandon_recording(self):
+        # a recording left without a game over (saved and then quit, or replaced by a new game) is
+        # exported as it stands, which also removes its stream
+        if not self.game_recorder.recording:
+            return
+        self.game_recorder.close_recording()
+        self.save_history_async("Game history", self.game_recorder.snapshot())
+
+    def reset_clock(self, seed):
+        self.tick = 0
+        self.tick_accumulator = 0
+        self.last_ai_move_time = 0
+        self.seed = seed
+        self.reseed()
+        for cell in self.cells:
+            cell.last_growth_time = 0
+
+    def reseed(self):
+        self.rng.seed(keyframe_seed(self.seed, self.tick))
+
+    def advance_simulation(self):
+        # runs as many fixed ticks as real time has passed, whatever the frame rate
+        self.tick_accumulator += self.clock.get_time()
+        steps = 0
+        while self.tick_accumulator >= TICK_MS and steps < MAX_TICKS_PER_FRAME:
+            self.step()
+            self.tick_accumulator -= TICK_MS
+            steps += 1
+
+        if steps == MAX_TICKS_PER_FRAME:
+            # after a dialog or a stall, carry on instead of fast-forwarding
+            self.tick_accumulator = 0
+
+    def step(self):
+        # one tick of the rules; only tick-based time and self.rng may be used here so a replay
+        # with the same inputs reproduces the game exactly
+        self.tick += 1
+        self.stepping = True
+        current_time = self.tick * TICK_MS
+
+        if not self.game_over_state:
+            self.time_taken = current_time / 1000
+
+        if self.input_source is not None:
+            for action, source, target, refund in self.input_source.inputs_until(self.tick):
+                self.apply_input(action, source, target, refund)
+        elif self.ai_enabled and not self.control_enemy:
+            if self.turn_based_mode:
+                if not self.current_player_turn and current_time - self.last_ai_move_time >= self.ai_move_cooldown:
+                    execute_ai_move(self, is_suggestion=False)
+                    self.last_ai_move_time = current_time
+            else:
+                if current_time - self.last_ai_move_time >= self.ai_move_cooldown:
+                    execute_ai_move(self, is_suggestion=False)
+                    self.last_ai_move_time = current_time
+
+        if self.turn_based_mode and self.turn_timer_active:
+            self.turn_time_remaining -= TICK_MS / 1000
+
+            if self.turn_time_remaining <= 0 or self.move_made_this_turn:
+                self.switch_turns()
+
+        for cell in self.cells:
+            cell.update(current_time)
+            if cell.cell_type != CellType.EMPTY:
+                self.update_evolution_based_on_points(cell)
+
+        if self.ai_enabled:
+            if self.ai_difficulty == "Easy":
+                self.ai_move_cooldown = 1500
+            elif self.ai_difficulty == "Medium":
+                self.ai_move_cooldown = 1000
+            else:  # Hard
+                self.ai_move_cooldown = 500
+
+            #self.ai.update(current_time)
+
+            #if current_time % 20000 < 50:
+             #   self.ai.adapt_strategy()
+
+        self.spawn_balls(current_time)
+
+        # bridges only animate, draw_board updates the ones in view
+        balls_to_remove = set()
+        ball_grid = BallGrid(self.balls)
+        for ball in self.balls:
+            ball.update()
+            ball_grid.move(ball)
+
+            for other_ball in ball_grid.near(ball):
+                if ball != other_ball and ball.check_collision(other_ball):
+                    balls_to_remove.add(ball)
+                    balls_to_remove.add(other_ball)
+
+                    self.create_collision_effect(ball.x, ball.y)
+
+            target_cell = ball.target_cell
+            if ball.reached_target(target_cell):
+                balls_to_remove.add(ball)
+
+                self.create_impact_effect(target_cell.x, target_cell.y, ball.is_player)
+
+                if target_cell.cell_type == CellType.EMPTY:
+                    captured = target_cell.try_capture(ball.attack_value, ball.is_player)
+                    if captured:
+                        self.on_cell_captured(target_cell, CellType.EMPTY)
+                    if captured and ball.is_player:
+                        self.points += 50
+                elif (target_cell.cell_type == CellType.PLAYER and ball.is_player) or \
+                        (target_cell.cell_type == CellType.ENEMY and not ball.is_player):
+                    target_cell.points += ball.attack_value
+                    if ball.is_player:
+                        self.points += 5
+                else:
+                    damage = ball.attack_value
+
+                    if not getattr(ball, 'is_support_ball', False):
+                        support_multiplier = self.get_support_bonus(ball.source_cell)
+                        damage = int(damage * support_multiplier)
+
+                    old_points = target_cell.points
+                    target_cell.points = max(0, target_cell.points - damage)
+                    points_reduced = old_points - target_cell.points
+
+                    if ball.is_player:
+                        self.points += points_reduced * 10
+
+                    if damage > ball.attack_value and ball.is_player:
+                        self.create_support_effect(target_cell.x, target_cell.y, ball.is_player)
+
+                    if target_cell.points == 0:
+                        self.remove_all_bridges_from_cell(target_cell)
+                        old_type = target_cell.cell_type
+                        target_cell.cell_type = CellType.PLAYER if ball.is_player else CellType.ENEMY
+                        target_cell.points = 10
+                        self.on_cell_captured(target_cell, old_type)
+
+                        if ball.is_player:
+                            self.points += 100
+
+                        logger.info(
+                            f"Cell at ({target_cell.x}, {target_cell.y}) captured: {old_type} -> {target_cell.cell_type}")
+
+                        for _ in range(5):
+                            self.create_impact_effect(target_cell.x, target_cell.y, ball.is_player)
+        if balls_to_remove:
+            self.balls[:] = [ball for ball in self.balls if ball not in balls_to_remove]
+
+        if self.tick % KEYFRAME_TICKS == 0:
+            self.reseed()
+            if not self.playback_active:
+                self.game_recorder.record_keyframe()
+
+        if not self.playback_active:
+            self.game_recorder.record_checksum()
+            self.game_recorder.flush_stream()
+        self.stepping = False
+
+    def apply_input(self, action, source=None, target=None, refund=None):
+        # every player and AI action goes through here, recorded with the tick it takes effect in,
+        # so a replay can feed the same actions back into step(); clicks between two ticks count
+        # for the next one
+        if not self.playback_active:
+            tick = self.tick if self.stepping else self.tick + 1
+            self.game_recorder.record_input(tick, action, source, target, refund)
+            self.inputs_applied += 1
+
+        if action == "create_bridge":
+            return self.create_bridge(source, target)
+        elif action == "remove_bridge":
+            for bridge in self.bridges:
+                if bridge.source_cell == source and bridge.target_cell == target:
+                    self.remove_bridge(bridge)
+                    if refund is not None:
+                        refund.points += getattr(bridge, 'creation_cost', 1)
+                    return True
+            return False
+        elif action == "remove_all_bridges":
+            self.remove_all_bridges_from_cell(source)
+        elif action == "toggle_control":
+            self.control_enemy = not self.control_enemy
+        elif action == "toggle_turn_based":
+            self.toggle_turn_based_mode()
+        elif action == "switch_turns":
+            self.move_made_this_turn = True
+            self.switch_turns()
+        elif action == "move_made":
+            self.move_made_this_turn = True
+        else:
+            logger.warning(f"Unknown input {action}")
+            return False
+        return True
+
+    def state_checksum(self):
+        # everything step() reads or writes; recorded every few ticks to catch replays that drift
+        state = (
+            self.tick,
+            self.points,
+            [(cell.cell_type.value, cell.points, cell.evolution.value, cell.points_to_capture,
+              cell.enemy_points_to_capture, cell.last_growth_time) for cell in self.cells],
+            [(bridge.source_cell.id, bridge.target_cell.id, bridge.direction.value,
+              bridge.has_reverse) for bridge in self.bridges],
+            [(ball.x, ball.y, ball.is_player, ball.attack_value, ball.is_support_ball) for ball in self.balls],
+            self.current_player_turn,
+            self.move_made_this_turn
+        )
+        return zlib.crc32(repr(state).encode())
 
     def initialize_board(self):
-        player_cell = Cell(200, 300, CellType.PLAYER, CellShape.CIRCLE, EvolutionLevel.LEVEL_1)
+        player_cell = Cell(200, 300, CellType.PLAYER, CellShape.CIRCLE, EvolutionLevel.LEVEL_1, 0)
         self.cells.append(player_cell)
 
-        enemy_cell = Cell(600, 300, CellType.ENEMY, CellShape.CIRCLE, EvolutionLevel.LEVEL_1)
+        enemy_cell = Cell(600, 300, CellType.ENEMY, CellShape.CIRCLE, EvolutionLevel.LEVEL_1, 1)
         self.cells.append(enemy_cell)
 
     def switch_turns(self):
@@ -842,13 +1209,10 @@ class Game:
         self.effects.append(effect)
 
     def update_effects(self):
-        effects_to_remove = []
-
         for effect in self.effects:
             effect['age'] += 1
 
             if effect['age'] >= effect['lifetime']:
-                effects_to_remove.append(effect)
                 continue
 
             if effect['type'] == 'collision':
@@ -864,9 +1228,7 @@ class Game:
                 else:
                     effect['size'] = 2.5 - (progress - 0.3) * 3  # shrink to 0
 
-        for effect in effects_to_remove:
-            if effect in self.effects:
-                self.effects.remove(effect)
+        self.effects[:] = [effect for effect in self.effects if effect['age'] < effect['lifetime']]
 
     def update_evolution_based_on_points(self, cell):
         old_evolution = cell.evolution.value
@@ -880,6 +1242,7 @@ class Game:
 
         if new_evolution.value != old_evolution:
             cell.evolution = new_evolution
+            self.on_cell_evolved(cell, old_evolution)
             logger.info(f"Cell at ({cell.x}, {cell.y}) evolved to level {new_evolution.value}")
 
             if cell.cell_type == CellType.PLAYER:
@@ -889,53 +1252,57 @@ class Game:
 
         if new_evolution.value != old_evolution and not self.playback_active:
             self.game_recorder.record_event("CELL_EVOLVED", {
-                "cellId": self.game_recorder.cell_id_map.get(cell, -1),
+                "cellId": cell.id,
                 "oldLevel": old_evolution,
                 "newLevel": new_evolution.value
             })
 
     def next_level(self):
-        if not self.game_data:
-            return False
-
-        if self.current_level.startswith("level"):
-            level_num = int(self.current_level[5:])
-            next_level_name = f"level{level_num + 1}"
-
-            if next_level_name in self.game_data.get("levels", {}):
-                self.current_level = next_level_name
-                return load_level(self, self.current_level)
+        next_level_name = self.catalogue.next_level(self.current_level)
+        if next_level_name is not None:
+            self.current_level = next_level_name
+            return load_level(self, self.current_level)
 
         return False
 
     def draw_effects(self, screen):
+        camera = self.camera
+        scale = camera.zoom
+        if scale < DETAIL_ZOOM:
+            return
         for effect in self.effects:
+            # impact rings grow to 2.5 cell radii, collision particles fly less than 60 px
+            if not camera.visible(effect['x'], effect['y'], CELL_RADIUS * 2.5):
+                continue
+            x, y = camera.to_screen(effect['x'], effect['y'])
+
             if effect['type'] == 'collision':
                 for particle in effect['particles']:
-                    px = effect['x'] + particle['dx'] * effect['age']
-                    py = effect['y'] + particle['dy'] * effect['age']
+                    px = x + particle['dx'] * effect['age'] * scale
+                    py = y + particle['dy'] * effect['age'] * scale
+                    size = particle['size'] * scale
 
                     alpha = int(255 * (1 - effect['age'] / effect['lifetime']))
 
-                    particle_surface = pygame.Surface((int(particle['size'] * 2), int(particle['size'] * 2)),
+                    particle_surface = pygame.Surface((int(size * 2), int(size * 2)),
                                                       pygame.SRCALPHA)
                     pygame.draw.circle(particle_surface, (*particle['color'], alpha),
-                                       (int(particle['size']), int(particle['size'])),
-                                       int(particle['size']))
-                    screen.blit(particle_surface, (int(px - particle['size']), int(py - particle['size'])))
+                                       (int(size), int(size)),
+                                       int(size))
+                    screen.blit(particle_surface, (int(px - size), int(py - size)))
 
             elif effect['type'] == 'impact':
                 alpha = int(255 * (1 - effect['age'] / effect['lifetime']))
-                size = CELL_RADIUS * effect['size']
+                size = CELL_RADIUS * effect['size'] * scale
 
                 ring_surface = pygame.Surface((int(size * 2), int(size * 2)), pygame.SRCALPHA)
                 pygame.draw.circle(ring_surface, (*effect['color'], alpha),
                                    (int(size), int(size)), int(size), max(1, int(size / 10)))
-                screen.blit(ring_surface, (int(effect['x'] - size), int(effect['y'] - size)))
+                screen.blit(ring_surface, (int(x - size), int(y - size)))
 
             elif effect['type'] == 'support':
                 alpha = int(255 * (1 - effect['age'] / effect['lifetime']))
-                size = CELL_RADIUS * 0.3 * (1 + effect['age'] / effect['lifetime'])
+                size = CELL_RADIUS * 0.3 * (1 + effect['age'] / effect['lifetime']) * scale
 
                 plus_surface = pygame.Surface((int(size * 2), int(size * 2)), pygame.SRCALPHA)
 
@@ -945,7 +1312,7 @@ class Game:
                 pygame.draw.rect(plus_surface, (*effect['color'], alpha),
                                  (int(size * 0.8), 0, int(size * 0.4), int(size * 2)))
 
-                screen.blit(plus_surface, (int(effect['x'] - size), int(effect['y'] - size)))
+                screen.blit(plus_surface, (int(x - size), int(y - size)))
 
     def draw_background_gradient(self):
         gradient_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -969,7 +1336,74 @@ class Game:
 
         return gradient_surface
 
+    def draw_board(self, background, bridge_start_cell=None):
+        # what a replay shows, also rendered off-screen by replay_export; everything is simulated,
+        # only what the camera sees is drawn
+        camera = self.camera
+        self.screen.blit(background, (0, 0))
+
+        for bridge in self.bridges:
+            source, target = bridge.source_cell, bridge.target_cell
+            if camera.segment_visible(source.x, source.y, target.x, target.y, CELL_RADIUS):
+                if camera.zoom >= DETAIL_ZOOM:
+                    # particles and wave are not drawn further out
+                    bridge.update()
+                bridge.draw(self.screen, camera)
+
+        if bridge_start_cell is not None:
+            # the bridge being created follows the mouse
+            pygame.draw.line(self.screen, (100, 100, 100),
+                             camera.to_screen(bridge_start_cell.x, bridge_start_cell.y),
+                             pygame.mouse.get_pos(), max(1, int(BRIDGE_WIDTH * camera.zoom)))
+
+        for cell in self.cells:
+            if camera.visible(cell.x, cell.y, CELL_VIEW_MARGIN):
+                cell.draw(self.screen, self)
+
+        for ball in self.balls:
+            if camera.visible(ball.x, ball.y, BALL_VIEW_MARGIN):
+                ball.draw(self.screen, camera)
+
+        self.draw_effects(self.screen)
+        # effects are visual only, they age with the frames drawn rather than the ticks
+        self.update_effects()
+
+    def reset_camera(self, world=None, fit=False):
+        # a new board: zoom 1 over the player's cells, or the whole world with fit; boards from
+        # saves and replays are as large as their cells reach
+        self.camera.set_world(*(world or world_size([(cell.x, cell.y) for cell in self.cells])))
+        own_cells = [cell for cell in self.cells if cell.cell_type == CellType.PLAYER]
+        if fit:
+            self.camera.fit()
+        elif own_cells:
+            self.camera.look_at(sum(cell.x for cell in own_cells) / len(own_cells),
+                                sum(cell.y for cell in own_cells) / len(own_cells))
+
+    def handle_camera_event(self, event):
+        # mouse wheel zooms at the cursor, the middle button drags the view, +/- zoom and 0 shows the
+        # whole level; returns True when the event was used
+        camera = self.camera
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
+            camera.zoom_at(ZOOM_STEP if event.button == 4 else 1 / ZOOM_STEP, event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 2:
+            self.dragging_camera = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+            self.dragging_camera = False
+        elif event.type == pygame.MOUSEMOTION and self.dragging_camera:
+            camera.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            camera.zoom_at(ZOOM_STEP, (camera.width / 2, camera.height / 2))
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            camera.zoom_at(1 / ZOOM_STEP, (camera.width / 2, camera.height / 2))
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_0:
+            camera.fit()
+        else:
+            return False
+        return True
+
     def calculate_distance(self, cell1, cell2):
+        if cell1.distances is not None and cell2.id is not None:
+            return cell1.distances[cell2.id]
         return math.sqrt((cell1.x - cell2.x) ** 2 + (cell1.y - cell2.y) ** 2)
 
     def get_bridge_at_position(self, x, y, threshold=10):
@@ -997,14 +1431,8 @@ class Game:
         return None, False
 
     def count_supporting_cells(self, cell):
-        supporting_cells = 0
-
-        for bridge in self.bridges:
-            if bridge.target_cell == cell:
-                if bridge.source_cell.cell_type == cell.cell_type:
-                    supporting_cells += 1
-
-        return supporting_cells
+        # incoming_bridges rather than every bridge, this runs for each drawn cell and spawned ball
+        return sum(1 for bridge in cell.incoming_bridges if bridge.source_cell.cell_type == cell.cell_type)
 
     def get_support_bonus(self, cell):
         supporting_cells = self.count_supporting_cells(cell)
@@ -1028,6 +1456,38 @@ class Game:
 
         self.effects.append(effect)
 
+    def on_bridge_changed(self, source_cell, target_cell):
+        self.ai_cache.bridge_changed(source_cell, target_cell)
+        self.suggestions_dirty = True
+
+    def on_cell_captured(self, cell, old_type):
+        # every capture in step() comes through here, empty cells and enemy cells alike
+        if not self.playback_active:
+            self.game_recorder.record_event("CELL_CAPTURED", {
+                "cellId": cell.id,
+                "newType": cell.cell_type.name,
+                "points": cell.points,
+                "isPlayer": cell.cell_type == CellType.PLAYER
+            })
+        self.ai_cache.owner_changed(cell, old_type, cell.cell_type)
+        self.suggestions_dirty = True
+
+    def on_cell_evolved(self, cell, old_level):
+        self.ai_cache.evolution_changed(cell, old_level, cell.evolution.value)
+        self.suggestions_dirty = True
+
+    def suggestions_stale(self):
+        if self.suggestions_dirty:
+            return True
+
+        # points crossing a bridge-cost threshold (or a new weakest enemy) change the board key
+        return self.ai_cache.key(self, True) != self.suggestions_key
+
+    def refresh_suggestions(self):
+        self.suggestions = suggest_moves(self, for_player=True)
+        self.suggestions_key = self.ai_cache.key(self, True)
+        self.suggestions_dirty = False
+
     def remove_bridge(self, bridge):
         for other_bridge in self.bridges:
             if other_bridge.source_cell == bridge.target_cell and other_bridge.target_cell == bridge.source_cell:
@@ -1043,11 +1503,12 @@ class Game:
 
         if bridge in self.bridges:
             self.bridges.remove(bridge)
+            self.on_bridge_changed(bridge.source_cell, bridge.target_cell)
 
         if not self.playback_active:
             self.game_recorder.record_event("BRIDGE_REMOVED", {
-                "sourceId": self.game_recorder.cell_id_map.get(bridge.source_cell, -1),
-                "targetId": self.game_recorder.cell_id_map.get(bridge.target_cell, -1)
+                "sourceId": bridge.source_cell.id,
+                "targetId": bridge.target_cell.id
             })
 
     def run(self):
@@ -1060,74 +1521,34 @@ class Game:
         while running:
             if not self.game_started:
                 self.show_menu()
+                self.frame_timer.pause()
                 continue
 
             if self.playback_active and self.game_playback:
-                self.game_playback.update()
-
-                self.screen.blit(background, (0, 0))
-
-                for bridge in self.bridges:
-                    bridge.draw(self.screen)
-
-                for cell in self.cells:
-                    cell.draw(self.screen, self)
-
-                for ball in self.balls:
-                    ball.draw(self.screen)
+                if not self.handle_playback_events():
+                    running = False
+                    continue
 
+                self.game_playback.update()
+                self.draw_board(background)
                 self.draw_playback_controls()
 
             else:
-
-                if not self.game_over_state:
-                    current_time_sec = pygame.time.get_ticks() / 1000
-                    self.time_taken = current_time_sec - self.start_time
-
-                current_time = pygame.time.get_ticks()
-                if self.ai_enabled and not self.control_enemy:
-                    if self.turn_based_mode:
-                        if not self.current_player_turn and current_time - self.last_ai_move_time >= self.ai_move_cooldown:
-                            execute_ai_move(self, is_suggestion=False)
-                            self.last_ai_move_time = current_time
-                    else:
-                        if current_time - self.last_ai_move_time >= self.ai_move_cooldown:
-                            execute_ai_move(self, is_suggestion=False)
-                            self.last_ai_move_time = current_time
-
-
                 if self.show_suggestions:
                     if (self.turn_based_mode and self.current_player_turn) or (not self.control_enemy):
-                        if not self.suggestions or current_time - self.last_suggestion_time >= 5000:
-                            self.suggestions = suggest_moves(self, for_player=True)
-                            self.last_suggestion_time = current_time
-
-                        draw_suggestions(self, self.screen)
+                        if self.suggestions_stale():
+                            self.refresh_suggestions()
 
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         running = False
 
-                    elif self.playback_active and self.game_playback:
-                        if event.type == pygame.KEYDOWN:
-                            if event.key == pygame.K_SPACE:
-                                if self.game_playback.is_playing:
-                                    self.game_playback.pause()
-                                else:
-                                    self.game_playback.resume()
-                            elif event.key == pygame.K_RIGHT:
-                                self.game_playback.set_speed(self.game_playback.playback_speed + 0.25)
-                            elif event.key == pygame.K_LEFT:
-                                self.game_playback.set_speed(self.game_playback.playback_speed - 0.25)
-                            elif event.key == pygame.K_ESCAPE:
-                                self.playback_active = False
-                                self.game_playback = None
-                                self.game_started = False
-                                continue
+                    elif self.handle_camera_event(event):
+                        pass
 
                     elif event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_SPACE and (self.game_type == GameType.LOCAL_MULTI or self.game_type==GameType.ONLINE):
-                            self.control_enemy = not self.control_enemy
+                            self.apply_input("toggle_control")
                             if self.control_enemy:
                                 logger.info("Now controlling enemy (red) cells")
                                 for cell in self.cells:
@@ -1140,7 +1561,7 @@ class Game:
                                         self.create_impact_effect(cell.x, cell.y, True)
 
                         elif event.key == pygame.K_t:
-                            self.toggle_turn_based_mode()
+                            self.apply_input("toggle_turn_based")
 
                         #commented that part, as ai is only available for single player, and makes no sense to other, and if it is single player it automatically playes against ai
                         # elif event.key == pygame.K_a:
@@ -1155,7 +1576,7 @@ class Game:
                             self.show_suggestions = not self.show_suggestions
                             if self.show_suggestions:
                                 logger.info("Move suggestions enabled - generating suggestions")
-                                self.suggestions = suggest_moves(self, for_player=True)
+                                self.refresh_suggestions()
                                 print(f"Generated {len(self.suggestions)} suggestions")
                                 for s in self.suggestions:
                                     print(f"Suggestion: {s.get('description')} ({s.get('type')})")
@@ -1172,7 +1593,8 @@ class Game:
                     elif event.type == pygame.MOUSEBUTTONDOWN:
                         if event.button == 1:  # Left click
                             mouse_pos = pygame.mouse.get_pos()
-                            clicked_cell = self.get_cell_at_position(mouse_pos[0], mouse_pos[1])
+                            world_x, world_y = self.camera.to_world(mouse_pos)
+                            clicked_cell = self.get_cell_at_position(world_x, world_y)
 
                             if clicked_cell:
                                 if not creating_bridge:
@@ -1184,13 +1606,14 @@ class Game:
                                                                   not self.control_enemy)
                                 else:
                                     if clicked_cell != bridge_start_cell:
-                                        if self.create_bridge(bridge_start_cell, clicked_cell):
+                                        if self.apply_input("create_bridge", bridge_start_cell, clicked_cell):
                                             self.create_impact_effect(clicked_cell.x, clicked_cell.y,
                                                                       not self.control_enemy)
                                     creating_bridge = False
                                     bridge_start_cell = None
                             else:
-                                clicked_bridge, refund_to_source = self.get_bridge_at_position(mouse_pos[0], mouse_pos[1])
+                                clicked_bridge, refund_to_source = self.get_bridge_at_position(
+                                    world_x, world_y, 10 / self.camera.zoom)
 
                                 if clicked_bridge:
                                     refund_cell = clicked_bridge.source_cell if refund_to_source else clicked_bridge.target_cell
@@ -1203,9 +1626,8 @@ class Game:
                                     if can_remove:
                                         bridge_cost = getattr(clicked_bridge, 'creation_cost',
                                                               1)
-                                        self.remove_bridge(clicked_bridge)
-
-                                        refund_cell.points += bridge_cost
+                                        self.apply_input("remove_bridge", clicked_bridge.source_cell,
+                                                         clicked_bridge.target_cell, refund_cell)
 
                                         self.create_impact_effect(refund_cell.x, refund_cell.y,
                                                                   refund_cell.cell_type == CellType.PLAYER)
@@ -1219,7 +1641,7 @@ class Game:
                                     option_index = (mouse_pos[1] - self.menu_rect.y) // 30
                                     if option_index == 0:
                                         logger.info(f"All connections are removed")
-                                        self.remove_all_bridges_from_cell(self.context_menu_cell)
+                                        self.apply_input("remove_all_bridges", self.context_menu_cell)
 
                                 self.show_context_menu = False
                                 self.context_menu_cell = None
@@ -1227,7 +1649,7 @@ class Game:
 
                         elif event.button == 3:  # Right click
                             mouse_pos = pygame.mouse.get_pos()
-                            clicked_cell = self.get_cell_at_position(mouse_pos[0], mouse_pos[1])
+                            clicked_cell = self.get_cell_at_position(*self.camera.to_world(mouse_pos))
 
                             if clicked_cell:
                                 if (self.control_enemy and clicked_cell.cell_type == CellType.ENEMY) or \
@@ -1237,15 +1659,12 @@ class Game:
                                     logger.info(f"Context menu opened for cell at ({clicked_cell.x}, {clicked_cell.y})")
 
                 if self.turn_based_mode and self.turn_timer_active:
-                    dt = self.clock.get_time() / 1000.0  # ms to s
-                    self.turn_time_remaining -= dt
-
-                    if self.turn_time_remaining <= 0 or self.move_made_this_turn:
-                        self.switch_turns()
-                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                    # the turn timer itself runs in step()
+                    if not self.move_made_this_turn and event.type == pygame.MOUSEBUTTONDOWN:
                         if event.button == 1:  # Left click
                             mouse_pos = pygame.mouse.get_pos()
-                            clicked_cell = self.get_cell_at_position(mouse_pos[0], mouse_pos[1])
+                            world_x, world_y = self.camera.to_world(mouse_pos)
+                            clicked_cell = self.get_cell_at_position(world_x, world_y)
 
                             if clicked_cell:
                                 if not creating_bridge:
@@ -1269,18 +1688,18 @@ class Game:
                                                                   not self.control_enemy)
                                 else:
                                     if clicked_cell != bridge_start_cell:
-                                        if self.create_bridge(bridge_start_cell, clicked_cell):
+                                        if self.apply_input("create_bridge", bridge_start_cell, clicked_cell):
                                             self.create_impact_effect(clicked_cell.x, clicked_cell.y,
                                                                       not self.control_enemy)
 
                                             if self.turn_based_mode:
-                                                self.move_made_this_turn = True
-                                                self.switch_turns()
+                                                self.apply_input("switch_turns")
 
                                     creating_bridge = False
                                     bridge_start_cell = None
                             else:
-                                clicked_bridge, refund_to_source = self.get_bridge_at_position(mouse_pos[0], mouse_pos[1])
+                                clicked_bridge, refund_to_source = self.get_bridge_at_position(
+                                    world_x, world_y, 10 / self.camera.zoom)
 
                                 if clicked_bridge:
                                     can_remove = True
@@ -1304,9 +1723,8 @@ class Game:
                                         bridge_cost = getattr(clicked_bridge, 'creation_cost',
                                                               1)
 
-                                        self.remove_bridge(clicked_bridge)
-
-                                        refund_cell.points += bridge_cost
+                                        self.apply_input("remove_bridge", clicked_bridge.source_cell,
+                                                         clicked_bridge.target_cell, refund_cell)
 
                                         self.create_impact_effect(refund_cell.x, refund_cell.y,
                                                                   refund_cell.cell_type == CellType.PLAYER)
@@ -1314,113 +1732,18 @@ class Game:
                                             f"Bridge removed. Refunded {bridge_cost} points to cell at ({refund_cell.x}, {refund_cell.y})")
 
                                         if self.turn_based_mode:
-                                            self.move_made_this_turn = True
-                                            self.switch_turns()
+                                            self.apply_input("switch_turns")
 
                                         continue
 
-                for cell in self.cells:
-                    cell.update(current_time)
-                    if cell.cell_type != CellType.EMPTY:
-                        self.update_evolution_based_on_points(cell)
-
-                if self.ai_enabled:
-                    if self.ai_difficulty == "Easy":
-                        self.ai_move_cooldown = 1500
-                    elif self.ai_difficulty == "Medium":
-                        self.ai_move_cooldown = 1000
-                    else:  # Hard
-                        self.ai_move_cooldown = 500
-
-                    #self.ai.update(current_time)
-
-                    #if current_time % 20000 < 50:
-                     #   self.ai.adapt_strategy()
-
-                self.spawn_balls(current_time)
-
-                for bridge in self.bridges:
-                    bridge.update()
-
-                balls_to_remove = []
-                for ball in self.balls:
-                    ball.update()
-
-                    for other_ball in self.balls:
-                        if ball != other_ball and ball.check_collision(other_ball):
-                            if ball not in balls_to_remove:
-                                balls_to_remove.append(ball)
-                            if other_ball not in balls_to_remove:
-                                balls_to_remove.append(other_ball)
-
-                            self.create_collision_effect(ball.x, ball.y)
-
-                    target_cell = self.get_cell_at_position(ball.target_x, ball.target_y)
-                    if target_cell and ball.reached_target(target_cell):
-                        balls_to_remove.append(ball)
-
-                        self.create_impact_effect(target_cell.x, target_cell.y, ball.is_player)
-
-                        if target_cell.cell_type == CellType.EMPTY:
-                            captured = target_cell.try_capture(ball.attack_value, ball.is_player)
-                            if captured and ball.is_player:
-                                self.points += 50
-                        elif (target_cell.cell_type == CellType.PLAYER and ball.is_player) or \
-                                (target_cell.cell_type == CellType.ENEMY and not ball.is_player):
-                            target_cell.points += ball.attack_value
-                            if ball.is_player:
-                                self.points += 5
-                        else:
-                            damage = ball.attack_value
+                self.advance_simulation()
+                self.maybe_autosave()
 
-                            if not getattr(ball, 'is_support_ball', False):
-                                support_multiplier = self.get_support_bonus(ball.source_cell)
-                                damage = int(damage * support_multiplier)
+                keys = pygame.key.get_pressed()
+                self.camera.pan((keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * PAN_SPEED,
+                                (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * PAN_SPEED)
 
-                            old_points = target_cell.points
-                            target_cell.points = max(0, target_cell.points - damage)
-                            points_reduced = old_points - target_cell.points
-
-                            if ball.is_player:
-                                self.points += points_reduced * 10
-
-                            if damage > ball.attack_value and ball.is_player:
-                                self.create_support_effect(target_cell.x, target_cell.y, ball.is_player)
-
-                            if target_cell.points == 0:
-                                self.remove_all_bridges_from_cell(target_cell)
-                                old_type = target_cell.cell_type
-                                target_cell.cell_type = CellType.PLAYER if ball.is_player else CellType.ENEMY
-                                target_cell.points = 10
-
-                                if ball.is_player:
-                                    self.points += 100
-
-                                logger.info(
-                                    f"Cell at ({target_cell.x}, {target_cell.y}) captured: {old_type} -> {target_cell.cell_type}")
-
-                                for _ in range(5):
-                                    self.create_impact_effect(target_cell.x, target_cell.y, ball.is_player)
-                for ball in balls_to_remove:
-                    if ball in self.balls:
-                        self.balls.remove(ball)
-
-                self.screen.blit(background, (0, 0))
-
-                for bridge in self.bridges:
-                    bridge.draw(self.screen)
-
-                if creating_bridge:
-                    mouse_pos = pygame.mouse.get_pos()
-                    pygame.draw.line(self.screen, (100, 100, 100),
-                                     (bridge_start_cell.x, bridge_start_cell.y),
-                                     mouse_pos, BRIDGE_WIDTH)
-
-                for cell in self.cells:
-                    cell.draw(self.screen, self)
-
-                for ball in self.balls:
-                    ball.draw(self.screen)
+                self.draw_board(background, bridge_start_cell if creating_bridge else None)
 
                 self.draw_game_info()
 
@@ -1430,8 +1753,12 @@ class Game:
                 self.draw_context_menu(self.screen)
                 if self.check_win_condition():
                     continue
+
+            self.update_persistence_status()
+            self.draw_persistence_status()
             pygame.display.flip()
             self.clock.tick(FPS)
+            self.frame_timer.frame()
         pygame.quit()
         sys.exit()
 
@@ -1470,6 +1797,7 @@ class Game:
 
         new_bridge = Bridge(source_cell, target_cell)
         self.bridges.append(new_bridge)
+        self.on_bridge_changed(source_cell, target_cell)
         logger.info(f"Bridge created from ({source_cell.x}, {source_cell.y}) to ({target_cell.x}, {target_cell.y})")
 
         source_cell.points -= bridge_cost
@@ -1494,8 +1822,8 @@ class Game:
 
         if new_bridge and not self.playback_active:
             self.game_recorder.record_event("BRIDGE_CREATED", {
-                "sourceId": self.game_recorder.cell_id_map.get(source_cell, -1),
-                "targetId": self.game_recorder.cell_id_map.get(target_cell, -1),
+                "sourceId": source_cell.id,
+                "targetId": target_cell.id,
                 "direction": "TWO_WAY" if existing_bridge else "ONE_WAY",
                 "cost": bridge_cost
             })
@@ -1506,7 +1834,7 @@ class Game:
         for bridge in self.bridges:
             source_spawn_interval = 3000 // bridge.source_cell.evolution.value
 
-            bridge_key = (id(bridge.source_cell), id(bridge.target_cell))
+            bridge_key = (bridge.source_cell.id, bridge.target_cell.id)
             if bridge_key not in self.last_ball_spawn_time or \
                     current_time - self.last_ball_spawn_time[bridge_key] >= source_spawn_interval:
 
@@ -1525,7 +1853,7 @@ class Game:
                             extra_balls = int((support_multiplier - 1.0) * 5)
 
                             for _ in range(min(extra_balls, 3)):
-                                if random.random() < 0.5:
+                                if self.rng.random() < 0.5:
                                     support_ball = Ball(bridge.source_cell, bridge.target_cell, is_player)
                                     support_ball.is_support_ball = True
                                     if is_player:
@@ -1542,7 +1870,7 @@ class Game:
 
             if bridge.direction == BridgeDirection.TWO_WAY and bridge.has_reverse:
                 target_spawn_interval = 3000 // bridge.target_cell.evolution.value
-                reverse_bridge_key = (id(bridge.target_cell), id(bridge.source_cell))
+                reverse_bridge_key = (bridge.target_cell.id, bridge.source_cell.id)
 
                 if reverse_bridge_key not in self.last_ball_spawn_time or \
                         current_time - self.last_ball_spawn_time[reverse_bridge_key] >= target_spawn_interval:
@@ -1562,7 +1890,7 @@ class Game:
                                 extra_balls = int((support_multiplier - 1.0) * 5)
 
                                 for _ in range(min(extra_balls, 3)):
-                                    if random.random() < 0.5:
+                                    if self.rng.random() < 0.5:
                                         support_ball = Ball(bridge.target_cell, bridge.source_cell, is_player)
                                         support_ball.is_support_ball = True
                                         if is_player:
@@ -1581,8 +1909,9 @@ class Game:
 
         menu_width = 180
         menu_height = 30 * len(self.context_menu_options)
-        menu_x = min(self.context_menu_cell.x + 40, SCREEN_WIDTH - menu_width)
-        menu_y = min(self.context_menu_cell.y + 40, SCREEN_HEIGHT - menu_height)
+        cell_x, cell_y = self.camera.to_screen(self.context_menu_cell.x, self.context_menu_cell.y)
+        menu_x = min(cell_x + 40, SCREEN_WIDTH - menu_width)
+        menu_y = min(cell_y + 40, SCREEN_HEIGHT - menu_height)
 
         menu_surface = pygame.Surface((menu_width, menu_height), pygame.SRCALPHA)
         menu_surface.fill((40, 40, 50, 220))
@@ -1604,40 +1933,30 @@ class Game:
         menu_running = True
         clock = pygame.time.Clock()
 
-        json_files = []
-        xml_files = []
-
-        if os.path.exists("saved_games/json"):
-            json_files = sorted([f for f in os.listdir("saved_games/json") if f.endswith(".json")], reverse=True)
+        # rows come a page at a time from the save index, nothing is listed or opened up front
+        if self.replay_browser is None:
+            self.replay_browser = ReplayBrowser()
+        browser = self.replay_browser
+        browser.refresh()
 
-        if os.path.exists("saved_games/xml"):
-            xml_files = sorted([f for f in os.listdir("saved_games/xml") if f.endswith(".xml")], reverse=True)
-
-        formats = ["JSON", "XML", "MongoDB"]
+        formats = ["JSON", "XML", "Binary", "MongoDB"]
+        format_keys = ["json", "xml", "binary", "mongodb"]
         current_format = 0
 
-        mongodb_games = []
-        try:
-            mongodb_games = get_saved_games_from_mongodb(20)  #limit up to 20 games
-        except:
-            logger.error("Failed to fetch games from MongoDB")
-
         scroll_offset = 0
         max_items = 8
         selected_index = 0
 
-        def get_active_list():
-            if formats[current_format] == "JSON":
-                return json_files
-            elif formats[current_format] == "XML":
-                return xml_files
-            elif formats[current_format] == "MongoDB":
-                return mongodb_games
-            else:
-                return []
+        def open_replay(row):
+            if self.start_playback(row["path"], row["format"]):
+                self.game_started = True
+                return True
+            return False
 
         while menu_running:
-            active_list = get_active_list()
+            save_format = format_keys[current_format]
+            total = browser.count(save_format)
+            active_list = browser.rows(save_format, scroll_offset, max_items) if total else []
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -1648,12 +1967,16 @@ class Game:
                         return False
                     elif event.key == pygame.K_UP:
                         selected_index = max(0, selected_index - 1)
-                        if selected_index < scroll_offset:
-                            scroll_offset = selected_index
                     elif event.key == pygame.K_DOWN:
-                        selected_index = min(len(active_list) - 1, selected_index + 1)
-                        if selected_index >= scroll_offset + max_items:
-                            scroll_offset = selected_index - max_items + 1
+                        selected_index = min(total - 1, selected_index + 1)
+                    elif event.key == pygame.K_PAGEUP:
+                        selected_index = max(0, selected_index - max_items)
+                    elif event.key == pygame.K_PAGEDOWN:
+                        selected_index = min(total - 1, selected_index + max_items)
+                    elif event.key == pygame.K_HOME:
+                        selected_index = 0
+                    elif event.key == pygame.K_END:
+                        selected_index = total - 1
                     elif event.key == pygame.K_LEFT:
                         current_format = (current_format - 1) % len(formats)
                         selected_index = 0
@@ -1663,87 +1986,39 @@ class Game:
                         selected_index = 0
                         scroll_offset = 0
                     elif event.key == pygame.K_RETURN:
-                        if active_list and 0 <= selected_index < len(active_list):
-                            if formats[current_format] == "JSON":
-                                filename = f"saved_games/json/{active_list[selected_index]}"
-                                if self.start_playback(filename, "json"):
-                                    return True
-                            elif formats[current_format] == "XML":
-                                filename = f"saved_games/xml/{active_list[selected_index]}"
-                                if self.start_playback(filename, "xml"):
-                                    return True
-                            elif formats[current_format] == "MongoDB" and mongodb_games and 0 <= selected_index < len(
-                                    mongodb_games):
-                                game_id = str(mongodb_games[selected_index]["_id"])
-                                if self.start_playback(game_id, "mongodb"):
-                                    self.game_started = True
-                                    return True
+                        if 0 <= selected_index - scroll_offset < len(active_list):
+                            if open_replay(active_list[selected_index - scroll_offset]):
+                                return True
 
-                    if formats[current_format] == "JSON":
-                        filename = f"saved_games/json/{active_list[selected_index]}"
-                        if self.start_playback(filename, "json"):
-                            return True
-                    elif formats[current_format] == "XML":
-                        filename = f"saved_games/xml/{active_list[selected_index]}"
-                        if self.start_playback(filename, "xml"):
-                            return True
-                    elif formats[current_format] == "MongoDB":
-                        if not active_list:
-                            no_files_font = pygame.font.SysFont('Arial', 20)
-                            no_files_text = "No MongoDB saved games found"
-                            no_files_surface = no_files_font.render(no_files_text, True, (180, 180, 180))
-                            no_files_rect = no_files_surface.get_rect(center=(SCREEN_WIDTH / 2, 200))
-                            self.screen.blit(no_files_surface, no_files_rect)
-                        else:
-                            item_font = pygame.font.SysFont('Arial', 18)
-                            for i in range(min(max_items, len(active_list) - scroll_offset)):
-                                idx = scroll_offset + i
-                                item = active_list[idx]
-
-                                try:
-                                    timestamp = item.get("timestamp", None)
-                                    if timestamp:
-                                        formatted_date = timestamp.strftime("%Y-%m-%d")
-                                        formatted_time = timestamp.strftime("%H:%M:%S")
-                                        display_text = f"{formatted_date} {formatted_time}"
-                                    else:
-                                        display_text = f"Game {idx + 1}"
-                                except:
-                                    display_text = f"Game {idx + 1}"
+                    selected_index = max(0, selected_index)
+                    if selected_index < scroll_offset:
+                        scroll_offset = selected_index
+                    elif selected_index >= scroll_offset + max_items:
+                        scroll_offset = selected_index - max_items + 1
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left click
                         mouse_pos = pygame.mouse.get_pos()
 
                         tab_width = SCREEN_WIDTH / len(formats)
                         for i, fmt in enumerate(formats):
-                            tab_rect = pygame.Rect(tab_width * i, 0, tab_width, 50)
+                            tab_rect = pygame.Rect(tab_width * i, 60, tab_width, 40)
                             if tab_rect.collidepoint(mouse_pos):
                                 current_format = i
                                 selected_index = 0
                                 scroll_offset = 0
 
-                        item_height = 50
-                        for i in range(min(max_items, len(active_list) - scroll_offset)):
-                            item_rect = pygame.Rect(100, 100 + i * item_height, SCREEN_WIDTH - 200, item_height)
+                        for i, row in enumerate(active_list):
+                            item_rect = pygame.Rect(100, 120 + i * 50, SCREEN_WIDTH - 200, 40)
                             if item_rect.collidepoint(mouse_pos):
                                 selected_index = scroll_offset + i
-
-                                if formats[current_format] == "JSON":
-                                    filename = f"saved_games/json/{active_list[selected_index]}"
-                                    success = self.start_playback(filename, "json")
-                                    if success:
-                                        self.game_started = True
-                                        return True
-                                elif formats[current_format] == "XML":
-                                    filename = f"saved_games/xml/{active_list[selected_index]}"
-                                    success = self.start_playback(filename, "xml")
-                                    if success:
-                                        self.game_started = True
-                                        return True
+                                if open_replay(row):
+                                    return True
                     elif event.button == 4:  # Scroll up
                         scroll_offset = max(0, scroll_offset - 1)
                     elif event.button == 5:  # Scroll down
-                        scroll_offset = min(max(0, len(active_list) - max_items), scroll_offset + 1)
+                        scroll_offset = min(max(0, total - max_items), scroll_offset + 1)
+
+            active_list = browser.rows(save_format, scroll_offset, max_items) if total else []
 
             self.screen.fill(MENU_BG_COLOR)
 
@@ -1772,20 +2047,24 @@ class Game:
                 self.screen.blit(no_files_surface, no_files_rect)
             else:
                 item_font = pygame.font.SysFont('Arial', 18)
-                for i in range(min(max_items, len(active_list) - scroll_offset)):
+                for i, row in enumerate(active_list):
                     idx = scroll_offset + i
-                    item = active_list[idx]
-
-                    # extract date and time from filename
-                    # format: game_20240406_123456_789.json
-                    try:
-                        date_str = item.split("_")[1]
-                        time_str = item.split("_")[2]
-                        formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-                        formatted_time = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:]}"
-                        display_text = f"{formatted_date} {formatted_time}"
-                    except:
-                        display_text = item
+
+                    # timestamp: 20240406_123456
+                    timestamp = row["timestamp"]
+                    if len(timestamp) == 15:
+                        display_text = f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]} " \
+                                       f"{timestamp[9:11]}:{timestamp[11:13]}:{timestamp[13:]}"
+                    else:
+                        display_text = row["game_id"]
+
+                    details = [row["level"] or "", row["result"] or ("Unfinished" if row["status"] == "in_progress"
+                                                                     else "")]
+                    if row["points"] is not None:
+                        details.append(f"{row['points']} pts")
+                    if row["time_taken"] is not None:
+                        details.append(f"{int(row['time_taken']) // 60}:{int(row['time_taken']) % 60:02d}")
+                    display_text += "   " + "   ".join(detail for detail in details if detail)
 
                     item_y = 120 + i * 50
                     item_rect = pygame.Rect(100, item_y, SCREEN_WIDTH - 200, 40)
@@ -1794,12 +2073,21 @@ class Game:
                     pygame.draw.rect(self.screen, highlight_color, item_rect)
                     pygame.draw.rect(self.screen, (100, 100, 150), item_rect, 1)
 
+                    thumbnail = browser.thumbnail(row)
+                    if thumbnail is not None:
+                        self.screen.blit(thumbnail, (104, item_y + 2))
+
                     item_surface = item_font.render(display_text, True, (255, 255, 255))
-                    self.screen.blit(item_surface, (120, item_y + 12))
+                    self.screen.blit(item_surface, (164, item_y + 12))
+
+                position_font = pygame.font.SysFont('Arial', 16)
+                position_text = f"{scroll_offset + 1}-{scroll_offset + len(active_list)} of {total}"
+                position_surface = position_font.render(position_text, True, (180, 180, 180))
+                self.screen.blit(position_surface, position_surface.get_rect(topright=(SCREEN_WIDTH - 100, 522)))
 
             instructions_font = pygame.font.SysFont('Arial', 16)
             instructions = [
-                "↑/↓: Navigate files   ←/→: Change format",
+                "↑/↓, PgUp/PgDn: Navigate files   ←/→: Change format",
                 "ENTER: Load selected replay   ESC: Back to menu"
             ]
 
@@ -1833,6 +2121,7 @@ class Game:
         for bridge in bridges_to_remove:
             if bridge in self.bridges:
                 self.bridges.remove(bridge)
+                self.on_bridge_changed(bridge.source_cell, bridge.target_cell)
                 if bridge in cell.outgoing_bridges:
                     cell.outgoing_bridges.remove(bridge)
                 if bridge in bridge.target_cell.incoming_bridges:
@@ -1956,6 +2245,16 @@ class Game:
     def game_over(self, message):
         logger.info(f"Game over: {message}")
 
+        if not self.playback_active:
+            # saved in the background so the game over screen shows up right away
+            result = "Player Wins" if "Blue Wins" in message else "Enemy Wins"
+            discard_saves = self.game_recorder.discard_saves()
+            self.game_recorder.game_id = completed_game_id(self.game_recorder.game_id)
+            self.game_recorder.stop_recording(result)
+            self.save_history_async("Game history", self.game_recorder.snapshot())
+            self.persistence.submit("Saves in progress", [("saves", discard_saves)])
+            logger.info(f"Frame times, {self.frame_timer.summary()}; {self.frame_timer.summary('autosave')}")
+
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 150))
         self.screen.blit(overlay, (0, 0))
@@ -2001,15 +2300,11 @@ class Game:
 
             options_font = pygame.font.SysFont('Arial', 24)
 
-            if self.current_level.startswith("level"):
-                level_num = int(self.current_level[5:])
-                next_level = f"level{level_num + 1}"
-
-                if next_level in self.game_data.get("levels", {}):
-                    next_text = "Press N for next level"
-                    next_surface = options_font.render(next_text, True, (100, 255, 100))
-                    next_rect = next_surface.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 90))
-                    self.screen.blit(next_surface, next_rect)
+            if self.catalogue.next_level(self.current_level) is not None:
+                next_text = "Press N for next level"
+                next_surface = options_font.render(next_text, True, (100, 255, 100))
+                next_rect = next_surface.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 90))
+                self.screen.blit(next_surface, next_rect)
 
         options_font = pygame.font.SysFont('Arial', 24)
 
@@ -2023,6 +2318,7 @@ class Game:
         quit_rect = quit_surface.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 150))
         self.screen.blit(quit_surface, quit_rect)
 
+        self.draw_persistence_status()
         pygame.display.flip()
 
         waiting = True
@@ -2039,34 +2335,16 @@ class Game:
                         self.game_started = False
                         waiting = False
                     elif event.key == pygame.K_n and "Player Wins" in message:
-                        if self.current_level.startswith("level"):
-                            level_num = int(self.current_level[5:])
-                            next_level = f"level{level_num + 1}"
-
-                            if next_level in self.game_data.get("levels", {}):
-                                self.current_level = next_level
-                                self.start_game()
-                                waiting = False
-        if not self.playback_active:
-            result = "Player Wins" if "Blue Wins" in message else "Enemy Wins"
-            self.game_recorder.game_id = generate_game_id(self.current_level, completed=True)
-
-            self.game_recorder.stop_recording(result)
+                        next_level = self.catalogue.next_level(self.current_level)
+                        if next_level is not None:
+                            self.current_level = next_level
+                            self.start_game()
+                            waiting = False
 
-            json_file = self.game_recorder.save_to_json()
-            xml_file = self.game_recorder.save_to_xml()
-            mongo_id = self.game_recorder.save_to_mongodb()
-
-            logger.info(f"Game history saved to JSON: {json_file}")
-            logger.info(f"Game history saved to XML: {xml_file}")
-            try:
-                mongodb_id = self.game_recorder.save_to_mongodb()
-                if mongodb_id:
-                    logger.info(f"Game history saved to MongoDB with ID: {mongodb_id}")
-            except Exception as e:
-                logger.error(f"Failed to save to MongoDB: {e}")
-            except ImportError:
-                pass
+            if waiting and self.update_persistence_status():
+                self.draw_persistence_status()
+                pygame.display.flip()
+            self.clock.tick(30)
 
     def reset_game(self):
         self.cells = []
@@ -2095,11 +2373,14 @@ class Game:
             success = self.game_playback.load_json_history(filename)
         elif format_type.lower() == "xml":
             success = self.game_playback.load_xml_history(filename)
+        elif format_type.lower() == "binary":
+            success = self.game_playback.load_binary_history(filename)
         elif format_type.lower() == "mongodb":
             success = self.game_playback.load_mongodb_history(filename)
 
         if success:
             self.game_playback.start_playback()
+            self.reset_camera(fit=True)
             self.playback_controls_visible = True
             return True
         else:
@@ -2118,8 +2399,8 @@ class Game:
         font_text = pygame.font.SysFont('Arial', 18)
 
         timestamp = saved_game["timestamp"].replace("_", " ")
-        points = saved_game["data"]["events"][-1]["data"].get("points", 0)
-        time_taken = saved_game["data"]["events"][-1]["data"].get("time_taken", 0)
+        points = saved_game.get("points") or 0
+        time_taken = saved_game.get("time_taken") or 0
 
         title_surface = font_title.render("Continue Game", True, (255, 255, 255))
         text1 = font_text.render(f"Found saved game from: {timestamp}", True, (220, 220, 220))
@@ -2171,99 +2452,148 @@ class Game:
 
         return result
 
+    def playback_bar_rect(self):
+        return pygame.Rect(20, SCREEN_HEIGHT - PLAYBACK_CONTROLS_HEIGHT + 10, SCREEN_WIDTH - 40, 8)
+
+    def seek_to_mouse(self, mouse_x):
+        bar = self.playback_bar_rect()
+        fraction = min(1.0, max(0.0, (mouse_x - bar.x) / bar.width))
+        self.game_playback.seek(fraction * self.game_playback.duration)
+
+    def handle_playback_events(self):
+        # returns False when the window is closed
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+            if self.handle_camera_event(event):
+                pass
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    if self.game_playback.is_playing:
+                        self.game_playback.pause()
+                    else:
+                        self.game_playback.resume()
+                elif event.key == pygame.K_RIGHT:
+                    self.game_playback.set_speed(self.game_playback.playback_speed + 0.25)
+                elif event.key == pygame.K_LEFT:
+                    self.game_playback.set_speed(self.game_playback.playback_speed - 0.25)
+                elif event.key == pygame.K_UP:
+                    self.game_playback.seek(self.game_playback.current_time + PLAYBACK_SKIP)
+                elif event.key == pygame.K_DOWN:
+                    self.game_playback.seek(self.game_playback.current_time - PLAYBACK_SKIP)
+                elif event.key == pygame.K_HOME:
+                    self.game_playback.seek(0)
+                elif event.key == pygame.K_END:
+                    self.game_playback.seek(self.game_playback.duration)
+                elif event.key == pygame.K_ESCAPE:
+                    self.playback_active = False
+                    self.game_playback = None
+                    self.game_started = False
+                    self.scrubbing = False
+                    return True
+
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if self.playback_bar_rect().inflate(0, 16).collidepoint(event.pos):
+                    self.scrubbing = True
+                    self.seek_to_mouse(event.pos[0])
+            elif event.type == pygame.MOUSEMOTION and self.scrubbing:
+                self.seek_to_mouse(event.pos[0])
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                self.scrubbing = False
+
+        return True
+
     def draw_playback_controls(self):
         if not self.game_playback:
             return
 
-        control_height = 40
+        control_height = PLAYBACK_CONTROLS_HEIGHT
         control_bg = pygame.Surface((SCREEN_WIDTH, control_height), pygame.SRCALPHA)
         control_bg.fill((0, 0, 0, 180))
         self.screen.blit(control_bg, (0, SCREEN_HEIGHT - control_height))
 
         font = pygame.font.SysFont('Arial', 16)
+        text_y = SCREEN_HEIGHT - control_height + 24
 
         status_text = "⏸ PAUSED" if not self.game_playback.is_playing else "▶ PLAYING"
         status_surface = font.render(status_text, True, WHITE)
-        self.screen.blit(status_surface, (20, SCREEN_HEIGHT - control_height + 10))
+        self.screen.blit(status_surface, (20, text_y))
 
         speed_text = f"{self.game_playback.playback_speed:.2f}x"
         speed_surface = font.render(speed_text, True, WHITE)
-        self.screen.blit(speed_surface, (150, SCREEN_HEIGHT - control_height + 10))
+        self.screen.blit(speed_surface, (120, text_y))
 
         if self.game_playback.history and len(self.game_playback.history["events"]) > 0:
-            total_duration = self.game_playback.history["metadata"].get("duration", 0)
-            progress = min(1.0, self.game_playback.current_time / total_duration) if total_duration > 0 else 0
-
-            pygame.draw.rect(self.screen, (80, 80, 80),
-                             (200, SCREEN_HEIGHT - control_height + 15, 400, 10))
-
-            pygame.draw.rect(self.screen, (200, 200, 255),
-                             (200, SCREEN_HEIGHT - control_height + 15, int(400 * progress), 10))
-
-        help_text = "SPACE: Play/Pause | ←→: Speed | ESC: Exit"
+            total_duration = self.game_playback.duration
+            current_time = min(self.game_playback.current_time, total_duration)
+            progress = current_time / total_duration if total_duration > 0 else 0
+
+            bar = self.playback_bar_rect()
+            pygame.draw.rect(self.screen, (80, 80, 80), bar)
+            pygame.draw.rect(self.screen, (200, 200, 255), (bar.x, bar.y, int(bar.width * progress), bar.height))
+            handle_color = WHITE if self.scrubbing else (200, 200, 255)
+            pygame.draw.circle(self.screen, handle_color, (bar.x + int(bar.width * progress), bar.centery), 7)
+
+            time_text = f"{int(current_time) // 60}:{int(current_time) % 60:02d} / " \
+                        f"{int(total_duration) // 60}:{int(total_duration) % 60:02d}"
+            time_surface = font.render(time_text, True, WHITE)
+            self.screen.blit(time_surface, (190, text_y))
+
+        help_text = "SPACE: Play/Pause | ←→: Speed | ↑↓: Skip | Drag bar: Seek | ESC: Exit"
         help_surface = font.render(help_text, True, (200, 200, 200))
-        self.screen.blit(help_surface, (SCREEN_WIDTH - 280, SCREEN_HEIGHT - control_height + 10))
+        self.screen.blit(help_surface, (SCREEN_WIDTH - help_surface.get_width() - 20, text_y))
 
     def save_to_mongodb(self, connection_string=None):
-        try:
-            import pymongo
-            MONGODB_AVAILABLE = True
-        except ImportError:
-            print("MongoDB support not available. Install pymongo package with 'pip install pymongo'")
-            return None
+        return self.game_recorder.save_to_mongodb(connection_string)
 
-        if not self.events:
-            return None
-
-        try:
-            conn_str = connection_string or "mongodb://localhost:27017/"
-            client = pymongo.MongoClient(conn_str, serverSelectionTimeoutMS=5000)  # 5 second timeout
-
-            client.server_info()
-
-            db = client["war_of_cells"]
-            collection = db["game_history"]
-
-            game_history = {
-                "metadata": self.metadata,
-                "events": self.events
-            }
-
-            result = collection.insert_one(game_history)
-            print(f"Game history saved to MongoDB with ID: {result.inserted_id}")
-            return str(result.inserted_id)
-
-        except pymongo.errors.ServerSelectionTimeoutError:
-            print("Could not connect to MongoDB server. Is it running?")
-            return None
-        except Exception as e:
-            print(f"MongoDB error: {e}")
-            return None
-
-    def load_saved_game(self, saved_game):
-        save_events = [event for event in saved_game["data"]["events"] if event["eventType"] == "GAME_SAVE"]
-        if not save_events:
+    def load_saved_game(self, saved_game, save_event=None):
+        if save_event is None:
+            save_event = load_last_save(saved_game)
+        if save_event is None:
             return False
 
-        save_data = save_events[-1]["data"]
+        self.restore_state(save_event["data"])
+        self.reset_camera()
+        if saved_game.get("game_id") and not self.game_recorder.recording:
+            # later saves of the continued game keep its id
+            self.game_recorder.game_id = saved_game["game_id"]
+        if saved_game["format"] == "checkpoint":
+            # later saves of the continued game go to the same log
+            self.game_recorder.checkpoint_key = checkpoint_key(saved_game["file"])
+        return True
 
+    def restore_state(self, save_data):
+        # rebuilds the board from serialize_state() output (GAME_SAVE and KEYFRAME events);
+        # returns the recorded cell ids mapped to the new cells
         self.cells = []
         self.bridges = []
         self.balls = []
         self.effects = []
         self.selected_cell = None
         self.last_ball_spawn_time = {}
+        self.suggestions = []
+        self.suggestions_dirty = True
+
+        # saves from before the fixed timestep only know the time taken
+        tick = save_data.get("tick", int(save_data.get("time_taken", 0) * FPS))
+
+        # saves from before cells had ids of their own name them by id(), those are renumbered
+        saved_ids = [cell_data["id"] for cell_data in save_data["cells"]]
+        keep_ids = sorted(saved_ids) == list(range(len(saved_ids)))
 
         cell_id_map = {}
-        for cell_data in save_data["cells"]:
+        for i, cell_data in enumerate(save_data["cells"]):
             cell_type = getattr(CellType, cell_data["type"])
             shape = getattr(CellShape, cell_data["shape"])
             evolution = EvolutionLevel(cell_data["evolution"])
 
-            new_cell = Cell(cell_data["x"], cell_data["y"], cell_type, shape, evolution)
+            new_cell = Cell(cell_data["x"], cell_data["y"], cell_type, shape, evolution,
+                            cell_data["id"] if keep_ids else i)
             new_cell.points = cell_data["points"]
             new_cell.points_to_capture = cell_data["points_to_capture"]
             new_cell.enemy_points_to_capture = cell_data["enemy_points_to_capture"]
+            new_cell.last_growth_time = cell_data.get("last_growth_time", tick * TICK_MS)
 
             self.cells.append(new_cell)
             cell_id_map[cell_data["id"]] = new_cell
@@ -2284,11 +2614,13 @@ class Game:
 
         for ball_data in save_data.get("balls", []):
             source_cell = cell_id_map.get(ball_data["source_cell_id"])
-            if source_cell:
+            target_cell = cell_id_map.get(ball_data.get("target_cell_id"))
+            if source_cell and target_cell is None:
+                # saved before balls kept their target's id
                 target_cell = min(self.cells,
                                   key=lambda c: (
                                               (c.x - ball_data["target_x"]) ** 2 + (c.y - ball_data["target_y"]) ** 2))
-
+            if source_cell:
                 new_ball = Ball(source_cell, target_cell, ball_data["is_player"])
                 new_ball.x = ball_data["x"]
                 new_ball.y = ball_data["y"]
@@ -2304,7 +2636,25 @@ class Game:
         self.time_taken = save_data.get("time_taken", 0)
         self.start_time = pygame.time.get_ticks() / 1000 - self.time_taken
 
-        return True
+        self.tick = tick
+        self.tick_accumulator = 0
+        self.last_ai_move_time = self.tick * TICK_MS
+        self.turn_time_remaining = save_data.get("turn_time_remaining", 10.0)
+        self.move_made_this_turn = save_data.get("move_made_this_turn", False)
+        self.turn_timer_active = save_data.get("turn_timer_active", self.turn_based_mode)
+
+        for spawn in save_data.get("spawn_times", []):
+            source_cell = cell_id_map.get(spawn["source_cell_id"])
+            target_cell = cell_id_map.get(spawn["target_cell_id"])
+            if source_cell and target_cell:
+                self.last_ball_spawn_time[(source_cell.id, target_cell.id)] = spawn["time"]
+
+        if len(self.cells) <= DISTANCE_TABLE_CELLS:
+            by_id = sorted(self.cells, key=lambda cell: cell.id)
+            for cell, distances in zip(by_id, distance_table([(cell.x, cell.y) for cell in by_id])):
+                cell.distances = distances
+
+        return cell_id_map
 
     def show_save_dialog(self):
         dialog_bg = pygame.Surface((400, 150), pygame.SRCALPHA)
@@ -2380,6 +2730,73 @@ class Game:
 
         pygame.time.wait(2000)
 
+    def save_history_async(self, name, snapshot):
+        sinks = [("JSON", snapshot.save_to_json),
+                 ("XML", snapshot.save_to_xml),
+                 ("binary", snapshot.save_to_binary)]
+        if MONGODB_AVAILABLE:
+            sinks.append(("MongoDB", snapshot.save_to_mongodb))
+
+        def on_done(result):
+            if "JSON" in result.saved:
+                snapshot.discard_stream()
+
+        self.persistence.submit(name, sinks, on_done)
+        self.persistence_status = f"{name}: saving..."
+        self.persistence_status_ok = True
+        self.persistence_status_time = time.time()
+
+    def save_checkpoint_async(self, name, checkpoint):
+        sinks = [("checkpoint", checkpoint.save_to_file)]
+        if MONGODB_AVAILABLE:
+            sinks.append(("MongoDB", checkpoint.save_to_mongodb))
+
+        self.persistence.submit(name, sinks)
+        self.persistence_status = f"{name}: saving..."
+        self.persistence_status_ok = True
+        self.persistence_status_time = time.time()
+
+    def maybe_autosave(self):
+        # a checkpoint every so often without asking; only the board is gathered here, encoding
+        # and writing it happen on the persistence worker
+        if not self.game_started or self.game_over_state or self.playback_active:
+            return False
+        if not self.autosave.due(self.tick, self.inputs_applied):
+            return False
+        if self.persistence.busy():
+            # the last save has not finished (slow disk, MongoDB timing out), try again next frame
+            return False
+
+        self.autosave.reset(self.tick, self.inputs_applied)
+        save_data = {"level": self.current_level}
+        save_data.update(self.serialize_state())
+        self.save_checkpoint_async("Autosave", self.game_recorder.checkpoint(self.game_recorder.save_event(save_data)))
+        self.frame_timer.mark("autosave")
+        return True
+
+    def update_persistence_status(self):
+        results = self.persistence.poll()
+        for result in results:
+            self.persistence_status = result.summary()
+            self.persistence_status_ok = result.ok
+            self.persistence_status_time = time.time()
+        return bool(results)
+
+    def draw_persistence_status(self):
+        if not self.persistence_status:
+            return
+        if not self.persistence.busy() and time.time() - self.persistence_status_time > 4:
+            return
+
+        font = pygame.font.SysFont('Arial', 16)
+        color = (150, 255, 150) if self.persistence_status_ok else (255, 120, 120)
+        text_surface = font.render(self.persistence_status, True, color)
+
+        bg = pygame.Surface((text_surface.get_width() + 20, text_surface.get_height() + 10))
+        bg.fill((30, 30, 50))
+        self.screen.blit(bg, (0, SCREEN_HEIGHT - bg.get_height()))
+        self.screen.blit(text_surface, (10, SCREEN_HEIGHT - bg.get_height() + 5))
+
     def save_game_progress(self):
         save_confirmed = self.show_save_dialog()
         if not save_confirmed:
@@ -2388,11 +2805,26 @@ class Game:
         original_running_state = self.running
         self.running = False
 
-        game_id = generate_game_id(self.current_level, completed=False)
-        self.game_recorder.game_id = game_id
+        save_data = {"level": self.current_level}
+        save_data.update(self.serialize_state())
+        save_event = self.game_recorder.record_save(save_data)
+
+        # a save writes the board; the full history goes out on the first save of a recording and then
+        # only every COMPACT_EVERY saves, the rest when the recording ends or is abandoned
+        self.save_checkpoint_async("Saved game", self.game_recorder.checkpoint(save_event))
+        if self.saves_since_export % COMPACT_EVERY == 0 and self.game_recorder.recording:
+            self.save_history_async("Saved game history", self.game_recorder.snapshot())
+        self.saves_since_export += 1
+
+        self.show_save_confirmation()
+
+        self.game_started = False
+        logger.info("Game saved successfully. Returning to menu.")
 
-        self.game_recorder.record_event("GAME_SAVE", {
-            "level": self.current_level,
+
+    def serialize_state(self):
+        # full board, as restore_state() reads it back; also recorded as replay keyframes
+        return {
             "time_taken": self.time_taken,
             "points": self.points,
             "cells": [self._serialize_cell(cell) for cell in self.cells],
@@ -2400,28 +2832,21 @@ class Game:
             "balls": [self._serialize_ball(ball) for ball in self.balls],
             "turn_based_mode": self.turn_based_mode,
             "current_player_turn": self.current_player_turn,
-            "control_enemy": self.control_enemy
-        })
-
-        json_file = self.game_recorder.save_to_json()
-        xml_file = self.game_recorder.save_to_xml()
-
-        try:
-            mongodb_id = self.game_recorder.save_to_mongodb()
-            if mongodb_id:
-                logger.info(f"Game history saved to MongoDB with ID: {mongodb_id}")
-        except Exception as e:
-            logger.error(f"Failed to save to MongoDB: {e}")
-
-        self.show_save_confirmation()
-
-        self.game_started = False
-        logger.info("Game saved successfully. Returning to menu.")
+            "control_enemy": self.control_enemy,
+            "tick": self.tick,
+            "spawn_times": self._serialize_spawn_times(),
+            "turn_time_remaining": self.turn_time_remaining,
+            "move_made_this_turn": self.move_made_this_turn,
+            "turn_timer_active": self.turn_timer_active
+        }
 
+    def _serialize_spawn_times(self):
+        return [{"source_cell_id": source_id, "target_cell_id": target_id, "time": spawn_time}
+                for (source_id, target_id), spawn_time in self.last_ball_spawn_time.items()]
 
     def _serialize_cell(self, cell):
         return {
-            "id": id(cell),
+            "id": cell.id,
             "x": cell.x,
             "y": cell.y,
             "type": cell.cell_type.name,
@@ -2429,13 +2854,14 @@ class Game:
             "evolution": cell.evolution.value,
             "points": cell.points,
             "points_to_capture": cell.points_to_capture,
-            "enemy_points_to_capture": cell.enemy_points_to_capture
+            "enemy_points_to_capture": cell.enemy_points_to_capture,
+            "last_growth_time": cell.last_growth_time
         }
 
     def _serialize_bridge(self, bridge):
         return {
-            "source_cell_id": id(bridge.source_cell),
-            "target_cell_id": id(bridge.target_cell),
+            "source_cell_id": bridge.source_cell.id,
+            "target_cell_id": bridge.target_cell.id,
             "direction": bridge.direction.name,
             "has_reverse": bridge.has_reverse,
             "creation_cost": getattr(bridge, 'creation_cost', 1)
@@ -2443,7 +2869,8 @@ class Game:
 
     def _serialize_ball(self, ball):
         return {
-            "source_cell_id": id(ball.source_cell),
+            "source_cell_id": ball.source_cell.id,
+            "target_cell_id": ball.target_cell.id,
             "source_x": ball.source_x,
             "source_y": ball.source_y,
             "target_x": ball.target_x,
@@ -2456,181 +2883,105 @@ class Game:
         }
 
 
-def check_saved_games_for_level(level_name):
-    saved_games = []
-
-    if os.path.exists("saved_games/json"):
-        json_files = [f for f in os.listdir("saved_games/json") if
-                      f.startswith(f"{level_name}_") and f.endswith(".json")]
-        for file in json_files:
-            if "in_progress" in file:
-                try:
-                    with open(os.path.join("saved_games/json", file), "r") as f:
-                        data = json.load(f)
-                        timestamp = file.split("_")[1] + "_" + file.split("_")[2]
-                        saved_games.append({
-                            "file": file,
-                            "format": "json",
-                            "timestamp": timestamp,
-                            "data": data
-                        })
-                except Exception as e:
-                    logger.error(f"Error loading JSON save file {file}: {e}")
+def check_saved_games_for_level(level_name, limit=RECOVERY_CANDIDATES):
+    # indexed lookups instead of opening every save file and asking MongoDB, newest first;
+    # the history itself is only read by load_save_data if the player continues
+    try:
+        entries = list(itertools.islice(get_save_index().in_progress(level_name), limit))
+    except Exception as e:
+        logger.error(f"Error reading save index: {e}")
+        return None
 
-    if os.path.exists("saved_games/xml"):
-        try:
-            import xml.etree.ElementTree as ET
-            xml_files = [f for f in os.listdir("saved_games/xml") if
-                         f.startswith(f"{level_name}_") and f.endswith(".xml")]
-            for file in xml_files:
-                if "in_progress" in file:
-                    try:
-                        tree = ET.parse(os.path.join("saved_games/xml", file))
-                        root = tree.getroot()
-
-                        data = {"metadata": {}, "events": []}
-
-                        metadata_elem = root.find("Metadata")
-                        if metadata_elem:
-                            for child in metadata_elem:
-                                data["metadata"][child.tag] = child.text
-
-                        events_elem = root.find("Events")
-                        if events_elem:
-                            for event_elem in events_elem.findall("Event"):
-                                event = {
-                                    "timestamp": float(event_elem.get("timestamp")),
-                                    "eventType": event_elem.get("type"),
-                                    "data": {}
-                                }
-
-                                for child in event_elem:
-                                    if len(child) > 0:
-                                        items = []
-                                        for item_elem in child:
-                                            if len(item_elem) > 0:
-                                                item_dict = {}
-                                                for attr in item_elem:
-                                                    if attr.tag in ["id", "x", "y", "evolution", "points",
-                                                                    "points_to_capture", "enemy_points_to_capture"]:
-                                                        try:
-                                                            item_dict[attr.tag] = int(attr.text)
-                                                        except:
-                                                            item_dict[attr.tag] = attr.text
-                                                    else:
-                                                        item_dict[attr.tag] = attr.text
-                                                items.append(item_dict)
-                                            else:
-                                                items.append(item_elem.text)
-                                        event["data"][child.tag] = items
-                                    else:
-                                        if child.tag in ["points", "time_taken"]:
-                                            try:
-                                                event["data"][child.tag] = float(child.text)
-                                            except:
-                                                event["data"][child.tag] = child.text
-                                        elif child.tag in ["turn_based_mode", "current_player_turn",
-                                                           "control_enemy"]:
-                                            event["data"][child.tag] = child.text.lower() == "true"
-                                        else:
-                                            event["data"][child.tag] = child.text
+    return [{
+        "game_id": entry["game_id"],
+        "file": entry["path"],
+        "format": entry["format"],
+        "timestamp": entry["timestamp"],
+        "points": entry["points"],
+        "time_taken": entry["time_taken"],
+        "data": None
+    } for entry in entries] or None
+
+
+def find_recovery_save(level_name):
+    # the newest unfinished save whose last save can be read back; one cut short by a crash
+    # (or otherwise unreadable) is passed over for the one before it
+    for saved_game in check_saved_games_for_level(level_name) or []:
+        save_event = load_last_save(saved_game)
+        if save_event is not None and save_event.get("data", {}).get("cells"):
+            return saved_game, save_event
+        logger.warning(f"Skipping unreadable save {saved_game['file']}")
+    return None
 
-                                data["events"].append(event)
 
-                        timestamp = file.split("_")[1] + "_" + file.split("_")[2]
-                        saved_games.append({
-                            "file": file,
-                            "format": "xml",
-                            "timestamp": timestamp,
-                            "data": data
-                        })
-                    except Exception as e:
-                        logger.error(f"Error loading XML save file {file}: {e}")
-        except ImportError:
-            logger.error("XML parsing not available")
+def load_save_data(saved_game):
+    if saved_game.get("data") is not None:
+        return saved_game["data"]
 
+    save_format = saved_game["format"]
     try:
-        import pymongo
-        from mongodb_config import DEFAULT_CONNECTION_STRING, DATABASE_NAME, COLLECTION_NAME
-
-        client = pymongo.MongoClient(DEFAULT_CONNECTION_STRING, serverSelectionTimeoutMS=2000)
-        db = client[DATABASE_NAME]
-        collection = db[COLLECTION_NAME]
-
-        query = {
-            "metadata.gameId": {"$regex": f"^{level_name}_.*_in_progress$"}
-        }
+        if save_format == "json":
+            with open(saved_game["file"], "r") as f:
+                saved_game["data"] = json.load(f)
+        elif save_format == "xml":
+            saved_game["data"] = read_xml_history(saved_game["file"])
+        elif save_format == "binary":
+            saved_game["data"] = load_binary_history(saved_game["file"])
+        elif save_format == "mongodb":
+            playback = GamePlayback(None)
+            if playback.load_mongodb_history(saved_game["file"]):
+                saved_game["data"] = playback.history
+    except Exception as e:
+        logger.error(f"Error loading {save_format} save {saved_game['file']}: {e}")
 
-        mongo_saves = list(collection.find(query).sort("metadata.timestamp", pymongo.DESCENDING))
+    return saved_game.get("data")
 
-        for save in mongo_saves:
-            save["_id"] = str(save["_id"])
 
-            game_id = save["metadata"].get("gameId", "")
-            parts = game_id.split("_")
-            if len(parts) >= 3:
-                timestamp = parts[1] + "_" + parts[2]
-            else:
-                timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-
-            saved_games.append({
-                "file": str(save["_id"]),
-                "format": "mongodb",
-                "timestamp": timestamp,
-                "data": save
-            })
+def load_last_save(saved_game):
+    # only the last GAME_SAVE event, from the footer of the file or a MongoDB projection,
+    # so continuing does not get slower the longer the saved game was
+    save_format = saved_game["format"]
+    path = saved_game["file"]
+    try:
+        if save_format == "json":
+            save_event = read_json_last_save(path)
+        elif save_format == "xml":
+            save_event = read_xml_last_save(path)
+        elif save_format == "binary":
+            save_event = read_binary_last_save(path)
+        elif save_format == "mongodb":
+            save_event = get_connection().run(lambda database: find_last_save(database, path))
+        elif save_format == "checkpoint":
+            save_event = read_last_checkpoint(path)
+            if save_event is None and MONGODB_AVAILABLE:
+                # the copy upserted with every checkpoint
+                save_event = get_connection().run(lambda database: find_checkpoint(database, checkpoint_key(path)))
+        else:
+            save_event = None
     except Exception as e:
-        logger.error(f"Error checking MongoDB saves: {e}")
-
-    saved_games.sort(key=lambda x: x["timestamp"], reverse=True)
+        logger.error(f"Error reading last save of {path}: {e}")
+        save_event = None
 
-    return saved_games if saved_games else None
+    if save_event is not None:
+        return save_event
 
-
-def load_game_data(file_path):
-    try:
-        with open(file_path, "r") as file:
-            data = json.load(file)
-        return data
-    except FileNotFoundError:
-        logger.error(f"Game data file not found: {file_path}")
-        return {}
-    except json.JSONDecodeError:
-        logger.error(f"Invalid JSON format in game data file: {file_path}")
-        return {}
+    # saved before the footers existed
+    data = load_save_data(saved_game)
+    if not data:
+        return None
+    save_events = [event for event in data["events"] if event["eventType"] == "GAME_SAVE"]
+    return save_events[-1] if save_events else None
 
 
 def create_menu(game):
     MENU_BG_COLOR = (20, 20, 40)
     TITLE_COLOR = (220, 220, 255)
-    LEVEL_WIDTH = 150
-    LEVEL_HEIGHT = 180
-    STAR_SIZE = 25
-    LEVELS_PER_ROW = 3
-    SPACING = 30
     BUTTON_WIDTH = 160
     BUTTON_HEIGHT = 40
 
     menu_running = True
     clock = pygame.time.Clock()
 
-    star_img = pygame.Surface((STAR_SIZE, STAR_SIZE), pygame.SRCALPHA)
-    star_points = []
-
-    for i in range(5):
-        angle = math.pi * 2 * i / 5 - math.pi / 2
-        star_points.append((STAR_SIZE / 2 + math.cos(angle) * STAR_SIZE / 2,
-                            STAR_SIZE / 2 + math.sin(angle) * STAR_SIZE / 2))
-        angle += math.pi / 5
-        star_points.append((STAR_SIZE / 2 + math.cos(angle) * STAR_SIZE / 4,
-                            STAR_SIZE / 2 + math.sin(angle) * STAR_SIZE / 4))
-    pygame.draw.polygon(star_img, (255, 255, 0), star_points)
-
-    lock_img = pygame.Surface((50, 50), pygame.SRCALPHA)
-    pygame.draw.rect(lock_img, (150, 150, 150), (15, 20, 20, 20))
-    pygame.draw.rect(lock_img, (150, 150, 150), (10, 10, 30, 15))
-    pygame.draw.circle(lock_img, (100, 100, 100), (25, 20), 8)
-
     editor_font = pygame.font.SysFont('Arial', 22, bold=True)
     editor_text = "Level Editor"
     editor_surface = editor_font.render(editor_text, True, (255, 255, 255))
@@ -2639,45 +2990,59 @@ def create_menu(game):
     replay_text = "View Replays"
     replay_surface = replay_font.render(replay_text, True, (255, 255, 255))
 
+    title_font = pygame.font.SysFont('Arial', 48, bold=True)
+    title_surface = title_font.render("WAR OF CELLS", True, TITLE_COLOR)
+    title_rect = title_surface.get_rect(center=(SCREEN_WIDTH / 2, 50))
+
+    inst_font = pygame.font.SysFont('Arial', 18)
+    inst_text = "Click on a level to play. Scroll or PgUp/PgDn for more levels, Left/Right for packs. ESC to exit."
+    inst_surface = inst_font.render(inst_text, True, (180, 180, 180))
+    inst_rect = inst_surface.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20))
+
     editor_rect = pygame.Rect(SCREEN_WIDTH / 2 - BUTTON_WIDTH - 10, 100, BUTTON_WIDTH, BUTTON_HEIGHT)
     replay_rect = pygame.Rect(SCREEN_WIDTH / 2 + 10, 100, BUTTON_WIDTH, BUTTON_HEIGHT)
 
     START_Y_LEVELS = 170
 
+    # tiles are rendered once and only the rows in view are drawn, kept between visits of the menu
+    if game.level_grid is None:
+        game.level_grid = LevelGrid(pygame.Rect(0, START_Y_LEVELS, SCREEN_WIDTH,
+                                                SCREEN_HEIGHT - 40 - START_Y_LEVELS))
+    grid = game.level_grid
+    grid.refresh()
+    grid.scroll_to(game.current_level)
+
     while menu_running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return False
+            elif grid.handle_event(event):
+                pass
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    mouse_pos = pygame.mouse.get_pos()
+                    mouse_pos = event.pos
 
                     if editor_rect.collidepoint(mouse_pos):
                         editor = LevelEditor(game)
                         editor.run()
                         pygame.event.clear()
-                        game.game_data = load_game_data("game_data.json")
+                        # the editor writes through the same level store and catalogue, the level
+                        # cache notices edited levels by their hash
+                        grid.refresh()
                     elif replay_rect.collidepoint(mouse_pos):
                         if game.show_replay_menu():
                             return True
                         pygame.event.clear()
                     else:
-                        level_clicked = check_level_click(mouse_pos, game.game_data, START_Y_LEVELS)
-                        if level_clicked:
-                            if is_level_unlocked(game.game_data, level_clicked):
-                                game.current_level = level_clicked
-                                return True
+                        level_clicked = grid.level_at(mouse_pos)
+                        if level_clicked and grid.unlocked(level_clicked):
+                            game.current_level = level_clicked
+                            return True
 
         game.screen.fill(MENU_BG_COLOR)
-
-        title_font = pygame.font.SysFont('Arial', 48, bold=True)
-        title_text = "WAR OF CELLS"
-        title_surface = title_font.render(title_text, True, TITLE_COLOR)
-        title_rect = title_surface.get_rect(center=(SCREEN_WIDTH / 2, 50))
         game.screen.blit(title_surface, title_rect)
 
         pygame.draw.rect(game.screen, (100, 100, 200), editor_rect)
@@ -2688,100 +3053,11 @@ def create_menu(game):
         text_rect = replay_surface.get_rect(center=replay_rect.center)
         game.screen.blit(replay_surface, text_rect)
 
-        level_count = len(game.game_data.get("levels", {}))
-        start_x = (SCREEN_WIDTH - (LEVELS_PER_ROW * LEVEL_WIDTH + (LEVELS_PER_ROW - 1) * SPACING)) / 2
-        start_y = START_Y_LEVELS
-
-        font = pygame.font.SysFont('Arial', 22, bold=True)
-        small_font = pygame.font.SysFont('Arial', 14)
-
-        for i, level_name in enumerate(sorted(game.game_data.get("levels", {}).keys())):
-            row = i // LEVELS_PER_ROW
-            col = i % LEVELS_PER_ROW
-
-            x = start_x + col * (LEVEL_WIDTH + SPACING)
-            y = start_y + row * (LEVEL_HEIGHT + SPACING)
-
-            level_info = game.game_data.get("summary", {}).get("levels", {}).get(level_name, {})
-            unlocked = is_level_unlocked(game.game_data, level_name)
-
-            level_color = (60, 80, 120) if unlocked else (60, 60, 60)
-            pygame.draw.rect(game.screen, level_color, (x, y, LEVEL_WIDTH, LEVEL_HEIGHT))
-            pygame.draw.rect(game.screen, (200, 200, 255), (x, y, LEVEL_WIDTH, LEVEL_HEIGHT), 2)
-
-            level_text = f"Level {level_name.replace('level', '')}"
-            level_surface = font.render(level_text, True, (255, 255, 255))
-            level_rect = level_surface.get_rect(center=(x + LEVEL_WIDTH / 2, y + 25))
-            game.screen.blit(level_surface, level_rect)
-
-            if unlocked:
-                stars = level_info.get("stars", 0)
-                star_y = y + 55
-                for s in range(3):
-                    star_color = (255, 255, 0) if s < stars else (70, 70, 70)
-                    star_x = x + LEVEL_WIDTH / 2 - (STAR_SIZE * 3) / 2 + s * STAR_SIZE
-                    pygame.draw.polygon(game.screen, star_color,
-                                        [(p[0] + star_x, p[1] + star_y) for p in star_points])
-
-                if "time" in level_info:
-                    time_text = f"Time: {level_info['time']}"
-                    time_surface = small_font.render(time_text, True, (200, 200, 200))
-                    time_rect = time_surface.get_rect(center=(x + LEVEL_WIDTH / 2, y + 90))
-                    game.screen.blit(time_surface, time_rect)
-
-                if "score" in level_info:
-                    score_text = f"Score: {level_info['score']}"
-                    score_surface = small_font.render(score_text, True, (200, 200, 200))
-                    score_rect = score_surface.get_rect(center=(x + LEVEL_WIDTH / 2, y + 110))
-                    game.screen.blit(score_surface, score_rect)
-            else:
-                game.screen.blit(lock_img, (x + LEVEL_WIDTH / 2 - 25, y + 60))
-
-        inst_font = pygame.font.SysFont('Arial', 18)
-        inst_text = "Click on a level to play. Press ESC to exit."
-        inst_surface = inst_font.render(inst_text, True, (180, 180, 180))
-        inst_rect = inst_surface.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 40))
+        grid.draw(game.screen)
         game.screen.blit(inst_surface, inst_rect)
 
         pygame.display.flip()
-        clock.tick(30)
-
-    return False
-
-
-def check_level_click(mouse_pos, game_data, start_y=170):
-    LEVEL_WIDTH = 150
-    LEVEL_HEIGHT = 180
-    LEVELS_PER_ROW = 3
-    SPACING = 30
-
-    level_count = len(game_data.get("levels", {}))
-    start_x = (SCREEN_WIDTH - (LEVELS_PER_ROW * LEVEL_WIDTH + (LEVELS_PER_ROW - 1) * SPACING)) / 2
-
-    for i, level_name in enumerate(sorted(game_data.get("levels", {}).keys())):
-        row = i // LEVELS_PER_ROW
-        col = i % LEVELS_PER_ROW
-
-        x = start_x + col * (LEVEL_WIDTH + SPACING)
-        y = start_y + row * (LEVEL_HEIGHT + SPACING)
-
-        if (x <= mouse_pos[0] <= x + LEVEL_WIDTH and
-                y <= mouse_pos[1] <= y + LEVEL_HEIGHT):
-            return level_name
-
-    return None
-
-
-def is_level_unlocked(game_data, level_name):
-    if level_name == "level1":
-        return True
-
-    if level_name.startswith("level"):
-        level_num = int(level_name[5:])
-        prev_level_name = f"level{level_num - 1}"
-
-        prev_level_stars = game_data.get("summary", {}).get("levels", {}).get(prev_level_name, {}).get("stars", 0)
-        return prev_level_stars > 0
+        clock.tick(FPS)
 
     return False
 
@@ -2811,106 +3087,88 @@ def format_time(seconds):
 
 
 def save_level_stats(game):
-    if not game.game_data:
-        return
-
-    if "summary" not in game.game_data:
-        game.game_data["summary"] = {"total_levels": len(game.game_data.get("levels", {})), "levels": {}}
-
-    if "levels" not in game.game_data["summary"]:
-        game.game_data["summary"]["levels"] = {}
-
     stars = calculate_stars(game.points, game.time_taken)
 
-    game.game_data["summary"]["levels"][game.current_level] = {
-        "stars": stars,
-        "time": format_time(game.time_taken),
-        "score": game.points
-    }
-
     try:
-        with open("game_data.json", "w") as file:
-            json.dump(game.game_data, file, indent=4)
+        # one row of the stats table, the levels are not touched
+        game.level_stats.record(game.current_level, stars, format_time(game.time_taken), game.points)
         logger.info(
             f"Saved stats for {game.current_level}: {stars} stars, time: {format_time(game.time_taken)}, score: {game.points}")
     except Exception as e:
-        logger.error(f"Error saving game data: {str(e)}")
+        logger.error(f"Error saving level stats: {str(e)}")
 
 
-def load_level(game, level_name):
+def clear_board(game):
     game.cells = []
     game.bridges = []
     game.balls = []
     game.effects = []
     game.selected_cell = None
     game.last_ball_spawn_time = {}
+    game.suggestions = []
+    game.suggestions_dirty = True
 
-    try:
-        if not hasattr(game, 'game_data') or not game.game_data:
-            game.game_data = load_game_data("game_data.json")
 
-        if level_name not in game.game_data.get("levels", {}):
+def load_level(game, level_name):
+    clear_board(game)
+
+    try:
+        level_data = get_level_store().get(level_name)
+        if level_data is None:
             logger.error(f"Level '{level_name}' not found")
             return False
 
-        level_data = game.game_data["levels"][level_name]
-        game_map = level_data.get("map", [])
-        description = level_data.get("description", {})
-
-        grid_width = SCREEN_WIDTH // len(game_map[0])
-        grid_height = SCREEN_HEIGHT // len(game_map)
-
-        type_counters = {cell_type: 0 for cell_type in description}
-
-        for y, row in enumerate(game_map):
-            for x, cell_char in enumerate(row):
-                if cell_char == '#' or cell_char == ' ':
-                    continue
-
-                if cell_char in description:
-                    if type_counters[cell_char] < len(description[cell_char]):
-                        cell_info = description[cell_char][type_counters[cell_char]]
-                        type_counters[cell_char] += 1
-
-                        cell_x = x * grid_width + grid_width // 2
-                        cell_y = y * grid_height + grid_height // 2
-
-                        if cell_info["color"] == "blue":
-                            cell_type = CellType.PLAYER
-                        elif cell_info["color"] == "red":
-                            cell_type = CellType.ENEMY
-                        else:
-                            cell_type = CellType.EMPTY
-
-                        if cell_info["kind"] == "c":
-                            shape = CellShape.CIRCLE
-                        elif cell_info["kind"] == "t":
-                            shape = CellShape.TRIANGLE
-                        else:
-                            shape = CellShape.RECTANGLE
-
-                        evolution = EvolutionLevel(cell_info["evolution"])
-
-                        new_cell = Cell(cell_x, cell_y, cell_type, shape, evolution)
-                        new_cell.points = cell_info["points"]
-                        game.cells.append(new_cell)
-                    else:
-                        logger.warning(f"Too many cells of type {cell_char} in map")
-
-        for cell_type, counter in type_counters.items():
-            if counter != len(description[cell_type]):
-                logger.warning(
-                    f"Not all cells of type {cell_type} were placed. Used {counter}/{len(description[cell_type])}")
+        compiled = get_level_cache().get(level_data)
+        for warning in compiled["warnings"]:
+            logger.warning(warning)
 
+        build_level(game, compiled)
         logger.info(f"Loaded level: {level_name}")
         return True
 
+    except LevelSchemaError as e:
+        logger.error(f"Invalid level {level_name}: {e}")
+        return False
     except Exception as e:
         logger.error(f"Error loading level {level_name}: {str(e)}")
         return False
 
 
+def build_level(game, compiled):
+    # the cells of a compiled level on an emptied board, and the camera on the new world
+    distances = compiled["distances"]
+    for cell_id, (cell_x, cell_y, cell_type, shape, evolution, points) in enumerate(compiled["cells"]):
+        new_cell = Cell(cell_x, cell_y, CellType[cell_type], CellShape[shape], EvolutionLevel(evolution), cell_id)
+        new_cell.points = points
+        # large levels have no table, their distances are computed when needed
+        new_cell.distances = distances[cell_id] if distances is not None else None
+        game.cells.append(new_cell)
+
+    game.reset_camera(compiled["world"])
+
+
 def suggest_moves(game, for_player=True):
+    # identical positions (e.g. turn-based stalemates) are answered from the transposition cache
+    cache_key = game.ai_cache.key(game, for_player)
+    cached = game.ai_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    if game.evaluation_model is not None:
+        suggestions = game.evaluation_model.score_moves(game, for_player, top_k=3)
+    elif NUMPY_AVAILABLE:
+        suggestions = score_moves(game, for_player, top_k=3)
+    else:
+        suggestions = suggest_moves_loop(game, for_player)
+
+    for i, s in enumerate(suggestions):
+        logger.info(f"  {i + 1}: {s['description']} (Score: {s['score']})")
+
+    game.ai_cache.put(cache_key, suggestions)
+    return list(suggestions)
+
+
+def suggest_moves_loop(game, for_player=True):
     suggestions = []
 
     if for_player:
@@ -3002,10 +3260,6 @@ def suggest_moves(game, for_player=True):
 
     suggestions.sort(key=lambda x: x['score'], reverse=True)
 
-    #logger.info(f"Generated {len(suggestions)} suggestions")
-    for i, s in enumerate(suggestions[:3]):
-        logger.info(f"  {i + 1}: {s['description']} (Score: {s['score']})")
-
     return suggestions[:3]
 
 
@@ -3032,7 +3286,7 @@ def execute_ai_move(game, is_suggestion=False):
 
     if not suggestions:
         if game.turn_based_mode and not game.current_player_turn:
-            game.move_made_this_turn = True
+            game.apply_input("move_made")
         return
 
     best_move = suggestions[0]
@@ -3042,17 +3296,17 @@ def execute_ai_move(game, is_suggestion=False):
         return
 
     if best_move['type'] in ['attack', 'capture', 'support']:
-        game.create_bridge(best_move['source'], best_move['target'])
+        game.apply_input("create_bridge", best_move['source'], best_move['target'])
         logger.info(
             f"AI executed {best_move['type']} move: {best_move['source'].x},{best_move['source'].y} -> {best_move['target'].x},{best_move['target'].y}")
 
     elif best_move['type'] == 'remove':
-        game.remove_bridge(best_move['bridge'])
+        game.apply_input("remove_bridge", best_move['bridge'].source_cell, best_move['bridge'].target_cell)
         logger.info(
             f"AI removed bridge: {best_move['bridge'].source_cell.x},{best_move['bridge'].source_cell.y} -> {best_move['bridge'].target_cell.x},{best_move['bridge'].target_cell.y}")
 
     if game.turn_based_mode and not game.current_player_turn:
-        game.move_made_this_turn = True
+        game.apply_input("move_made")
 
 
 def draw_suggestions(game, screen):
@@ -3060,22 +3314,23 @@ def draw_suggestions(game, screen):
         #logger.info("Not showing suggestions: empty suggestions or show_suggestions is False")
         return
 
-    print(f"Drawing {len(game.suggestions)} suggestions")
+    render_debug.debug("draw_suggestions", f"Drawing {len(game.suggestions)} suggestions")
 
-    font = pygame.font.SysFont('Arial', 16, bold=True)
+    font = get_font(16, bold=True)
     highlight_color = (255, 255, 0)
 
+    camera = game.camera
     for i, suggestion in enumerate(game.suggestions):
         if suggestion.get('type') in ['attack', 'capture', 'support']:
-            source = suggestion['source']
-            target = suggestion['target']
+            source_x, source_y = camera.to_screen(suggestion['source'].x, suggestion['source'].y)
+            target_x, target_y = camera.to_screen(suggestion['target'].x, suggestion['target'].y)
 
             pygame.draw.line(screen, highlight_color,
-                             (source.x, source.y),
-                             (target.x, target.y), 6)
+                             (source_x, source_y),
+                             (target_x, target_y), 6)
 
-            pygame.draw.circle(screen, highlight_color, (source.x, source.y), 15, 4)
-            pygame.draw.circle(screen, highlight_color, (target.x, target.y), 15, 4)
+            pygame.draw.circle(screen, highlight_color, (source_x, source_y), 15, 4)
+            pygame.draw.circle(screen, highlight_color, (target_x, target_y), 15, 4)
 
             rank_text = str(i + 1)
             text_surf = font.render(rank_text, True, (0, 0, 0))
@@ -3087,15 +3342,15 @@ def draw_suggestions(game, screen):
             text_rect = text_surf.get_rect(center=(circle_radius, circle_radius))
             circle_surf.blit(text_surf, text_rect)
 
-            mid_x = (source.x + target.x) // 2
-            mid_y = (source.y + target.y) // 2
+            mid_x = (source_x + target_x) // 2
+            mid_y = (source_y + target_y) // 2
 
             screen.blit(circle_surf, (mid_x - circle_radius, mid_y - circle_radius))
 
         elif suggestion.get('type') == 'remove':
             bridge = suggestion['bridge']
-            source_x, source_y = bridge.source_cell.x, bridge.source_cell.y
-            target_x, target_y = bridge.target_cell.x, bridge.target_cell.y
+            source_x, source_y = camera.to_screen(bridge.source_cell.x, bridge.source_cell.y)
+            target_x, target_y = camera.to_screen(bridge.target_cell.x, bridge.target_cell.y)
 
             mid_x = (source_x + target_x) // 2
             mid_y = (source_y + target_y) // 2
@@ -3125,27 +3380,8 @@ def draw_suggestions(game, screen):
 
 
 def get_saved_games_from_mongodb(limit=20):
-    try:
-        import pymongo
-        from mongodb_config import DEFAULT_CONNECTION_STRING, DATABASE_NAME, COLLECTION_NAME
-    except ImportError:
-        logger.error("MongoDB support not available. Install pymongo package.")
-        return []
-
-    try:
-        client = pymongo.MongoClient(DEFAULT_CONNECTION_STRING, serverSelectionTimeoutMS=2000)
-        db = client[DATABASE_NAME]
-        collection = db[COLLECTION_NAME]
-
-        games = list(collection.find({},
-                                     {"metadata": 1, "timestamp": 1})
-                     .sort("timestamp", pymongo.DESCENDING)
-                     .limit(limit))
-
-        return games
-    except Exception as e:
-        logger.error(f"Error fetching games from MongoDB: {e}")
-        return []
+    # the games collection only, the events stay in event_chunks until a game is played back
+    return get_connection().run(lambda database: find_games(database, limit=limit), default=[])
 
 
 def safe_mongodb_operation(func):
@@ -1,15 +1,518 @@
+import time
+import logging
+import datetime
+import threading
+
+try:
+    import pymongo
+    from pymongo.errors import ConnectionFailure
+    MONGODB_AVAILABLE = True
+except ImportError:
+    MONGODB_AVAILABLE = False
+    ConnectionFailure = ConnectionError
+
+logger = logging.getLogger('WarOfCEllsGame')
+
 DEFAULT_CONNECTION_STRING = "mongodb://localhost:27017/"
 DATABASE_NAME = "war_of_cells"
-COLLECTION_NAME = "game_history"
+COLLECTION_NAME = "game_history"  # one document per game with every event, read for old saves only
+GAMES_COLLECTION = "games"
+CHUNKS_COLLECTION = "event_chunks"
+CHUNK_SIZE = 500  # events per event_chunks document, far below the 16 MB document limit
+CHECKPOINTS_COLLECTION = "checkpoints"  # newest GAME_SAVE of each recording, replaced on every save
+
+SERVER_SELECTION_TIMEOUT_MS = 2000
+MAX_POOL_SIZE = 10
+# after the server could not be reached, calls fail at once for this long, doubling up to the maximum
+BREAKER_COOLDOWN = 5.0  # s
+BREAKER_MAX_COOLDOWN = 300.0  # s
+INSERT_BATCH_SIZE = 50
+MAX_QUEUED_HISTORIES = 100
+
+
+class MongoUnavailable(Exception):
+    pass
+
+
+def _is_connection_error(error):
+    return isinstance(error, (ConnectionFailure, ConnectionError))
+
+
+def _write_errors(insert):
+    # (index, message) of every document an unordered insert_many could not store; the server
+    # stores all the others
+    try:
+        insert()
+    except Exception as e:
+        details = getattr(e, "details", None)
+        if _is_connection_error(e) or not isinstance(details, dict) or "writeErrors" not in details:
+            raise
+        return [(error["index"], error.get("errmsg", "write error")) for error in details["writeErrors"]]
+    return []
+
+
+def ensure_indexes(database):
+    # idempotent, run once per client before its first query
+    games = database[GAMES_COLLECTION]
+    games.create_index([("gameId", 1)], unique=True, name="games_by_id")
+    games.create_index([("level", 1), ("status", 1), ("timestamp", -1)], name="games_by_level")
+    games.create_index([("timestamp", -1)], name="games_by_time")
+    database[CHUNKS_COLLECTION].create_index([("gameId", 1), ("seq", 1)], unique=True, name="chunks_by_game")
+
+
+def make_history(metadata, events):
+    # the games document and its event_chunks documents; the game document holds everything
+    # a listing needs, the events are only read by playback
+    from save_index import parse_game_id
+
+    game_id = metadata["gameId"]
+    _, status = parse_game_id(game_id)
+    chunks = []
+    chunk = []
+    event_count = 0
+    last_save = None
+    for event in events:
+        if event["eventType"] == "GAME_SAVE":
+            last_save = event
+        chunk.append(event)
+        event_count += 1
+        if len(chunk) == CHUNK_SIZE:
+            chunks.append(_make_chunk(game_id, len(chunks), chunk))
+            chunk = []
+    if chunk:
+        chunks.append(_make_chunk(game_id, len(chunks), chunk))
+
+    game = {
+        "gameId": game_id,
+        "level": metadata.get("level"),
+        "status": status,
+        "timestamp": datetime.datetime.now(),
+        "metadata": metadata,
+        "eventCount": event_count,
+        "chunkCount": len(chunks),
+        "lastSave": last_save
+    }
+    return {"game": game, "chunks": chunks}
+
+
+def _make_chunk(game_id, seq, events):
+    return {
+        "gameId": game_id,
+        "seq": seq,
+        "firstTimestamp": events[0]["timestamp"],
+        "lastTimestamp": events[-1]["timestamp"],
+        "events": events
+    }
+
+
+def _find_one(collection, game_id, id_field, projection=None):
+    # by the _id handed out when saving, or by the recorder's game id
+    if len(game_id) == 24:
+        try:
+            from bson import ObjectId
+            document = collection.find_one({"_id": ObjectId(game_id)}, projection)
+            if document:
+                return document
+        except Exception:
+            pass
+    return collection.find_one({id_field: game_id}, projection)
+
+
+def find_game(database, game_id, projection=None):
+    return _find_one(database[GAMES_COLLECTION], game_id, "gameId", projection)
+
+
+def find_legacy_history(database, game_id, projection=None):
+    # saved in one game_history document, before the events were split into chunks
+    return _find_one(database[COLLECTION_NAME], game_id, "metadata.gameId", projection)
+
+
+def find_last_save(database, game_id):
+    # the last GAME_SAVE event only, whatever the length of the game
+    game = find_game(database, game_id, {"lastSave": 1})
+    if game is not None:
+        return game.get("lastSave")
+
+    # a game ends on the save that made it "in progress", the last event is enough
+    legacy = find_legacy_history(database, game_id, {"events": {"$slice": -1}})
+    if legacy and legacy.get("events") and legacy["events"][-1]["eventType"] == "GAME_SAVE":
+        return legacy["events"][-1]
+    return None
+
+
+def save_checkpoint(database, key, game_id, level, save_event):
+    # an upsert of one board-sized document, however many saves and events came before
+    from save_index import parse_game_id
+
+    _, status = parse_game_id(game_id)
+    database[CHECKPOINTS_COLLECTION].replace_one({"_id": key}, {
+        "_id": key,
+        "gameId": game_id,
+        "level": level,
+        "status": status,
+        "timestamp": datetime.datetime.now(),
+        "lastSave": save_event
+    }, upsert=True)
+    return key
+
+
+def find_checkpoint(database, key):
+    checkpoint = database[CHECKPOINTS_COLLECTION].find_one({"_id": key}, {"lastSave": 1})
+    return checkpoint.get("lastSave") if checkpoint else None
+
+
+def delete_checkpoint(database, key):
+    database[CHECKPOINTS_COLLECTION].delete_one({"_id": key})
+    return key
+
+
+def delete_game(database, game_id):
+    # every copy of one game, chunked or saved before the events were split
+    database[GAMES_COLLECTION].delete_many({"gameId": game_id})
+    database[CHUNKS_COLLECTION].delete_many({"gameId": game_id})
+    database[COLLECTION_NAME].delete_many({"metadata.gameId": game_id})
+    return game_id
+
+
+def iter_game_events(database, game_id, batch_size=4):
+    # one chunk after the other in order, never the whole game in one response
+    cursor = database[CHUNKS_COLLECTION].find({"gameId": game_id}, {"events": 1, "_id": 0}) \
+        .sort("seq", 1).batch_size(batch_size)
+    for chunk in cursor:
+        yield from chunk["events"]
+
+
+def find_games(database, level=None, status=None, limit=20):
+    query = {}
+    if level is not None:
+        query["level"] = level
+    if status is not None:
+        query["status"] = status
+    return list(database[GAMES_COLLECTION].find(query, {"metadata": 1, "timestamp": 1, "gameId": 1})
+                .sort("timestamp", -1).limit(limit))
+
+
+class MongoConnection:
+    # one pooled client per connection string, created on first use and shared by every thread;
+    # while the server is down a circuit breaker answers at once instead of waiting for the
+    # server selection timeout on every call
+    def __init__(self, connection_string=None, client_factory=None):
+        # client_factory(connection_string) -> client, e.g. lambda _: mongomock.MongoClient()
+        self.connection_string = connection_string or DEFAULT_CONNECTION_STRING
+        self.client_factory = client_factory
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self._client = None
+        self.indexes_ready = False
+
+        self.failures = 0
+        self.open_until = 0
+        self.last_error = None
+        self.pending = []  # histories waiting for the next insert_many
+
+    def _create_client(self):
+        if self.client_factory is not None:
+            return self.client_factory(self.connection_string)
+        if not MONGODB_AVAILABLE:
+            raise MongoUnavailable("MongoDB support not available. Install pymongo package.")
+        return pymongo.MongoClient(self.connection_string, serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                                   maxPoolSize=MAX_POOL_SIZE)
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self.open_until
+
+    def client(self):
+        with self.lock:
+            if time.monotonic() < self.open_until:
+                raise MongoUnavailable(f"MongoDB unreachable ({self.last_error}), retrying in "
+                                       f"{self.open_until - time.monotonic():.0f} s")
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+
+    def database(self):
+        database = self.client()[DATABASE_NAME]
+        if not self.indexes_ready:
+            ensure_indexes(database)
+            self.indexes_ready = True
+        return database
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            cooldown = min(BREAKER_COOLDOWN * 2 ** (self.failures - 1), BREAKER_MAX_COOLDOWN)
+            self.open_until = time.monotonic() + cooldown
+        logger.warning(f"MongoDB unreachable, not trying again for {cooldown:.0f} s: {error}")
+
+    def run(self, operation, default=None):
+        # operation(database); returns default when the server is down or the call fails
+        try:
+            result = operation(self.database())
+        except MongoUnavailable as e:
+            logger.error(str(e))
+            return default
+        except Exception as e:
+            if _is_connection_error(e):
+                self.record_failure(e)
+            else:
+                logger.error(f"MongoDB error: {e}")
+            return default
+
+        self.record_success()
+        return result
+
+    def insert_history(self, metadata, events):
+        # queued, so histories saved while the server was down go out together with the next
+        # one in a single insert_many; returns the id of the games document once it is stored
+        history = make_history(metadata, events)
+        game_id = history["game"]["gameId"]
+        with self.lock:
+            # a newer save of the same game replaces one still waiting
+            self.pending = [queued for queued in self.pending if queued["game"]["gameId"] != game_id]
+            self.pending.append(history)
+            if len(self.pending) > MAX_QUEUED_HISTORIES:
+                self.pending.pop(0)
+                logger.error("Too many game histories waiting for MongoDB, dropped the oldest")
+
+        self.flush_histories()
+        with self.lock:
+            if any(queued is history for queued in self.pending):
+                return None
+        return history["game"].get("_id")
+
+    def delete_history(self, game_id):
+        # also drops a copy still waiting for the server, it would otherwise be stored later on
+        with self.lock:
+            self.pending = [queued for queued in self.pending if queued["game"]["gameId"] != game_id]
+        return self.run(lambda database: delete_game(database, game_id))
+
+    def flush_histories(self):
+        with self.flush_lock:
+            return self._flush_histories()
+
+    def _flush_histories(self):
+        while True:
+            with self.lock:
+                batch = self.pending[:INSERT_BATCH_SIZE]
+            if not batch:
+                return True
+
+            try:
+                failed = self._write_histories(self.database(), batch)
+            except MongoUnavailable as e:
+                logger.error(f"{len(self.pending)} game histories kept for later: {e}")
+                return False
+            except Exception as e:
+                if _is_connection_error(e):
+                    self.record_failure(e)
+                    return False
+                # not something a retry fixes
+                logger.error(f"MongoDB error, {len(batch)} game histories not saved: {e}")
+                for history in batch:
+                    history["game"].pop("_id", None)
+            else:
+                self.record_success()
+                # only the games with a document the server refused are lost, the rest of the batch is stored
+                for history in batch:
+                    error = failed.get(history["game"]["gameId"])
+                    if error is not None:
+                        logger.error(f"MongoDB refused game history {history['game']['gameId']}, not saved: {error}")
+                        history["game"].pop("_id", None)
+
+            sent = {id(history) for history in batch}
+            with self.lock:
+                self.pending = [history for history in self.pending if id(history) not in sent]
+
+    def _write_histories(self, database, batch):
+        game_ids = [history["game"]["gameId"] for history in batch]
+        games = database[GAMES_COLLECTION]
+        chunks = database[CHUNKS_COLLECTION]
+
+        # a game saved again (on S and later at game over) replaces its earlier copy
+        games.delete_many({"gameId": {"$in": game_ids}})
+        chunks.delete_many({"gameId": {"$in": game_ids}})
+
+        # the events first, a game is only listed once all of them are stored; returns the error of
+        # every game with a document the server refused, by game id
+        failed = {}
+        event_chunks = [chunk for history in batch for chunk in history["chunks"]]
+        if event_chunks:
+            for index, error in _write_errors(lambda: chunks.insert_many(event_chunks, ordered=False)):
+                failed.setdefault(event_chunks[index]["gameId"], error)
+
+        listed = [history["game"] for history in batch if history["game"]["gameId"] not in failed]
+        if listed:
+            for index, error in _write_errors(lambda: games.insert_many(listed, ordered=False)):
+                failed.setdefault(listed[index]["gameId"], error)
+
+        if failed:
+            # the chunks that did go in for a refused game would never be read
+            chunks.delete_many({"gameId": {"$in": list(failed)}})
+        return failed
+
+    def close(self):
+        with self.lock:
+            client, self._client = self._client, None
+            self.indexes_ready = False
+            if self.pending:
+                logger.error(f"{len(self.pending)} game histories were never saved to MongoDB")
+        if client is not None:
+            client.close()
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+_client_factory = None
+
+
+def set_client_factory(factory):
+    # swaps the driver for every connection made afterwards, e.g. mongomock in tests
+    global _client_factory
+    with _connections_lock:
+        _client_factory = factory
+        connections = list(_connections.values())
+        _connections.clear()
+    for connection in connections:
+        connection.close()
+
+
+def get_connection(connection_string=None):
+    connection_string = connection_string or DEFAULT_CONNECTION_STRING
+    with _connections_lock:
+        connection = _connections.get(connection_string)
+        if connection is None:
+            connection = MongoConnection(connection_string, _client_factory)
+            _connections[connection_string] = connection
+        return connection
+
+
+def close_connections():
+    with _connections_lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for connection in connections:
+        connection.close()
+
+
+def prepare_in_background(connection_string=None):
+    # connects and creates the indexes while the menu is up, so the first save does not wait for it
+    thread = threading.Thread(target=get_connection(connection_string).run, args=(lambda database: True,),
+                              name="MongoDBSetup", daemon=True)
+    thread.start()
+    return thread
+
 
 def check_connection(connection_string=None):
+    connection = get_connection(connection_string)
     try:
-        import pymongo
-        client = pymongo.MongoClient(connection_string or DEFAULT_CONNECTION_STRING,
-                                    serverSelectionTimeoutMS=2000)
+        client = connection.client()
         client.server_info()
-        return True, client
-    except ImportError:
-        return False, "Biblioteka pymongo nie jest zainstalowana"
     except Exception as e:
-        return False, str(e)
\ No newline at end of file
+        if _is_connection_error(e):
+            connection.record_failure(e)
+        return False, str(e)
+
+    connection.record_success()
+    return True, client
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+# every query the game makes, as (name, collection, filter, sort); the values are only examples
+GAME_QUERIES = (
+    ("list games", GAMES_COLLECTION, {}, [("timestamp", -1)]),
+    ("games of a level", GAMES_COLLECTION, {"level": "level1", "status": "in_progress"}, [("timestamp", -1)]),
+    ("game by id", GAMES_COLLECTION, {"gameId": "level1_20240101_000000_completed"}, []),
+    ("event chunks", CHUNKS_COLLECTION, {"gameId": "level1_20240101_000000_completed"}, [("seq", 1)]),
+)
+
+
+def matching_index(indexes, query, sort):
+    # name of an index that answers query without a collection scan or an in-memory sort: the equality
+    # fields first in any order, then the sort fields in order (all in the same or all in reverse
+    # direction); indexes as returned by index_information()
+    for name, info in indexes.items():
+        keys = list(info["key"])
+        if {field for field, _ in keys[:len(query)]} != set(query):
+            continue
+        sort_keys = keys[len(query):len(query) + len(sort)]
+        if [field for field, _ in sort_keys] != [field for field, _ in sort]:
+            continue
+        directions = [direction * wanted for (_, direction), (_, wanted) in zip(sort_keys, sort)]
+        if len(set(directions)) <= 1:
+            return name
+    return None
+
+
+def index_report(database):
+    # the ensure_indexes() index each query can use, None where it would scan the collection;
+    # read from the index definitions, so it works without a query planner (mongomock)
+    return {name: matching_index(database[collection].index_information(), query, sort)
+            for name, collection, query, sort in GAME_QUERIES}
+
+
+def explain_queries(database):
+    # winning plan of every query the game makes, each should use one of ensure_indexes()'s indexes
+    plans = {}
+    for name, collection, query, sort in GAME_QUERIES:
+        cursor = database[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plans[name] = _plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+    return plans
+
+
+def run_benchmark(num_games=2000, connection_string=None):
+    # in a scratch database of the server get_connection() reaches, or of the stand-in given to
+    # set_client_factory(); the query plans need a real server, a stand-in only gets the index check
+    client = get_connection(connection_string).client()
+    database = client[DATABASE_NAME + "_benchmark"]
+    client.drop_database(database.name)
+    try:
+        ensure_indexes(database)
+        events = [{"timestamp": i * 0.05, "eventType": "INPUT", "data": {"tick": i * 3, "action": "create_bridge"}}
+                  for i in range(2000)]
+        start = time.perf_counter()
+        for i in range(num_games):
+            status = "completed" if i % 4 else "in_progress"
+            metadata = {"gameId": f"level{i % 30 + 1}_2024{i % 12 + 1:02d}01_{i:06d}_{status}",
+                        "level": f"level{i % 30 + 1}"}
+            history = make_history(metadata, events)
+            database[CHUNKS_COLLECTION].insert_many(history["chunks"])
+            database[GAMES_COLLECTION].insert_one(history["game"])
+        print(f"{num_games} games of {len(events)} events written in {time.perf_counter() - start:.1f} s")
+
+        try:
+            plans = explain_queries(database)
+        except (AttributeError, NotImplementedError):
+            plans = None
+        for name, index in index_report(database).items():
+            print(f"{name}: {index or 'no index matches!'}")
+            if plans is not None:
+                stages = plans[name]
+                print(f"  {' <- '.join(stages)}{'' if 'COLLSCAN' not in stages else '  (no index used!)'}")
+
+        start = time.perf_counter()
+        find_games(database)
+        print(f"listing 20 games: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        client.drop_database(database.name)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,171 @@
+import os
+import time
+import queue
+import atexit
+import tempfile
+import logging
+import threading
+import contextlib
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+SHUTDOWN_TIMEOUT = 15.0  # s, longer than a MongoDB server selection timeout
+
+# read once, os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w", **kwargs):
+    # written to a temporary file next to path and swapped in with os.replace once it is complete
+    # and on disk, so a crash mid-write leaves the previous file instead of half of the new one;
+    # every write gets a temporary file of its own, the worker and the game thread can be writing
+    # the same path at once
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    try:
+        # mkstemp files are private, saves get the permissions open() would have given them
+        os.chmod(temp_path, 0o666 & ~UMASK)
+        f = os.fdopen(fd, mode, **kwargs)
+    except BaseException:
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    except BaseException:
+        f.close()
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    f.close()
+    os.replace(temp_path, path)
+
+
+class PersistenceResult:
+    def __init__(self, name):
+        self.name = name
+        self.saved = {}
+        self.failed = {}
+        self.duration = 0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def summary(self):
+        if self.ok:
+            return f"{self.name}: saved ({', '.join(self.saved)})"
+        return f"{self.name}: failed to save {', '.join(self.failed)}"
+
+
+class PersistenceWorker:
+    # runs save jobs (JSON/XML/binary files, MongoDB) on a background thread so the game
+    # loop never waits on disk or database; finished jobs are collected with poll()
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self._run, name="PersistenceWorker", daemon=True)
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, name, sinks, on_done=None):
+        # sinks: list of (label, callable); a sink returning None counts as failed
+        with self.condition:
+            self.pending += 1
+        self.jobs.put((name, sinks, on_done))
+
+    def call(self, task):
+        # a plain task run in order with the save jobs, e.g. a recording stream's writes; nothing
+        # is logged or reported for it unless it fails
+        with self.condition:
+            self.pending += 1
+        self.jobs.put((None, task, None))
+
+    def on_thread(self):
+        return threading.current_thread() is self.thread
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            name, sinks, on_done = job
+            if name is None:
+                try:
+                    sinks()
+                except Exception as e:
+                    logger.error(f"Background task failed: {e}")
+                with self.condition:
+                    self.pending -= 1
+                    self.condition.notify_all()
+                continue
+
+            result = PersistenceResult(name)
+            start = time.perf_counter()
+
+            for label, sink in sinks:
+                try:
+                    value = sink()
+                except Exception as e:
+                    logger.error(f"{name}: {label} save failed: {e}")
+                    value = None
+                    result.failed[label] = str(e)
+                else:
+                    if value is None:
+                        result.failed[label] = "not saved"
+                    else:
+                        result.saved[label] = value
+
+            if on_done is not None:
+                try:
+                    on_done(result)
+                except Exception as e:
+                    logger.error(f"{name}: completion handler failed: {e}")
+
+            result.duration = time.perf_counter() - start
+            logger.info(f"{result.summary()} in {result.duration:.2f}s")
+            self.results.put(result)
+
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify_all()
+
+    def poll(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def busy(self):
+        with self.condition:
+            return self.pending > 0
+
+    def flush(self, timeout=None):
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending == 0, timeout)
+
+    def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        if not self.thread.is_alive():
+            return True
+
+        if self.busy():
+            logger.info("Waiting for game history saves to finish...")
+        done = self.flush(timeout)
+        if not done:
+            logger.error("Game history saves did not finish before exit")
+
+        self.jobs.put(None)
+        self.thread.join(timeout=1.0)
+        return done
@@ -0,0 +1,269 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from camera import world_size
+from game_playback import GamePlayback
+from save_index import get_save_index
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+PAGE_SIZE = 8
+CACHED_PAGES = 64
+CACHED_THUMBNAILS = 128
+THUMBNAIL_SIZE = (48, 36)
+
+THUMBNAIL_BG_COLOR = (15, 15, 30)
+THUMBNAIL_COLORS = {
+    "PLAYER": (50, 100, 255),
+    "ENEMY": (255, 50, 50),
+    "EMPTY": (50, 50, 50),
+}
+
+
+def read_summary(save_format, path):
+    # board, result, points and time taken of a save the index only knows by name;
+    # read from the file, so only done for rows that are about to be shown
+    playback = GamePlayback(None)
+    loaders = {
+        "json": playback.load_json_history,
+        "xml": playback.load_xml_history,
+        "binary": playback.load_binary_history,
+    }
+    if save_format not in loaders or not loaders[save_format](path):
+        return None
+
+    history = playback.history
+    board = []
+    points = time_taken = None
+    for event in reversed(history["events"]):
+        data = event["data"]
+        if data.get("cells"):
+            board = [[cell["x"], cell["y"], cell["type"]] for cell in data["cells"]]
+            points = data.get("points", data.get("score"))
+            time_taken = data.get("time_taken", data.get("time"))
+            break
+
+    return {
+        "board": board,
+        "result": history["metadata"].get("result"),
+        "points": points,
+        "time_taken": time_taken
+    }
+
+
+class ReplayBrowser:
+    # pages of the save index for the replay menu; only the rows on screen are queried,
+    # the next page is fetched in the background and thumbnails are drawn once
+    def __init__(self, index=None, page_size=PAGE_SIZE):
+        self.index = index or get_save_index()
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ReplayBrowser")
+
+        self.pages = OrderedDict()  # (format, page) -> rows
+        self.fetching = {}  # (format, page) -> future
+        self.counts = {}
+        self.summaries_pending = set()
+        self.thumbnails = OrderedDict()  # (format, path) -> surface
+        self.version = self.index.version
+
+    def refresh(self):
+        # forget listings made before the last save; thumbnails stay valid
+        if self.index.version == self.version:
+            return
+
+        with self.lock:
+            self.pages.clear()
+            self.fetching.clear()
+            self.counts.clear()
+        self.version = self.index.version
+
+    def count(self, save_format):
+        if save_format not in self.counts:
+            self.counts[save_format] = self.index.count(save_format=save_format)
+        return self.counts[save_format]
+
+    def _fetch_page(self, save_format, page):
+        rows = self.index.find(save_format=save_format, limit=self.page_size, offset=page * self.page_size)
+        for row in rows:
+            if row["board"] is None:
+                self._load_summary(row)
+        return rows
+
+    def _store_page(self, key, rows):
+        with self.lock:
+            self.fetching.pop(key, None)
+            self.pages[key] = rows
+            self.pages.move_to_end(key)
+            while len(self.pages) > CACHED_PAGES:
+                self.pages.popitem(last=False)
+
+    def page(self, save_format, page):
+        key = (save_format, page)
+        with self.lock:
+            rows = self.pages.get(key)
+            future = self.fetching.get(key)
+            if rows is not None:
+                self.pages.move_to_end(key)
+                return rows
+
+        rows = None
+        if future is not None:
+            try:
+                rows = future.result()
+            except Exception:
+                rows = None
+        if rows is None:
+            # rows on screen are never left waiting on a file read, summaries follow in the background
+            rows = self.index.find(save_format=save_format, limit=self.page_size, offset=page * self.page_size)
+            for row in rows:
+                if row["board"] is None:
+                    self._request_summary(row)
+        self._store_page(key, rows)
+        return rows
+
+    def prefetch(self, save_format, page):
+        key = (save_format, page)
+        if page < 0 or page * self.page_size >= self.count(save_format):
+            return
+
+        with self.lock:
+            if key in self.pages or key in self.fetching:
+                return
+            future = self.executor.submit(self._fetch_page, save_format, page)
+            self.fetching[key] = future
+        future.add_done_callback(lambda f: self._prefetched(key, f))
+
+    def _prefetched(self, key, future):
+        with self.lock:
+            # dropped by refresh() while it was loading
+            if self.fetching.get(key) is not future:
+                return
+        if future.exception() is None:
+            self._store_page(key, future.result())
+        else:
+            logger.error(f"Could not load replay page {key}: {future.exception()}")
+            with self.lock:
+                self.fetching.pop(key, None)
+
+    def rows(self, save_format, offset, count):
+        first = offset // self.page_size
+        last = (offset + count - 1) // self.page_size
+
+        rows = []
+        for page in range(first, last + 1):
+            rows.extend(self.page(save_format, page))
+        self.prefetch(save_format, last + 1)
+
+        start = offset - first * self.page_size
+        return rows[start:start + count]
+
+    def _load_summary(self, row):
+        key = (row["format"], row["path"])
+        try:
+            summary = read_summary(row["format"], row["path"])
+        except Exception as e:
+            logger.error(f"Could not read summary of {row['path']}: {e}")
+            summary = None
+
+        if summary is None:
+            # nothing to show, an empty board keeps it from being read again
+            summary = {"board": [], "result": None, "points": None, "time_taken": None}
+
+        for name in ("result", "points", "time_taken"):
+            if row[name] is None:
+                row[name] = summary[name]
+        row["board"] = summary["board"]
+        self.index.update_summary(row["format"], row["path"], summary["board"], summary["result"],
+                                  summary["points"], summary["time_taken"])
+        self.summaries_pending.discard(key)
+
+    def _request_summary(self, row):
+        key = (row["format"], row["path"])
+        if key in self.summaries_pending:
+            return
+        self.summaries_pending.add(key)
+        self.executor.submit(self._load_summary, row)
+
+    def thumbnail(self, row):
+        # main thread only, pygame surfaces are built here; None until the board is known
+        key = (row["format"], row["path"])
+        surface = self.thumbnails.get(key)
+        if surface is not None:
+            self.thumbnails.move_to_end(key)
+            return surface
+
+        board = row["board"]
+        if board is None:
+            self._request_summary(row)
+            return None
+        if isinstance(board, str):
+            board = json.loads(board)
+
+        # the world the board was played on, as large as its cells reach as when it is loaded; one
+        # scale for both axes, so a large level is not squashed
+        world_width, world_height = world_size((x, y) for x, y, _ in board)
+        scale = min(THUMBNAIL_SIZE[0] / world_width, THUMBNAIL_SIZE[1] / world_height)
+        surface = pygame.Surface(THUMBNAIL_SIZE)
+        surface.fill(THUMBNAIL_BG_COLOR)
+        for x, y, cell_type in board:
+            position = (int(x * scale), int(y * scale))
+            pygame.draw.circle(surface, THUMBNAIL_COLORS.get(cell_type, (120, 120, 120)), position, 2)
+
+        self.thumbnails[key] = surface
+        while len(self.thumbnails) > CACHED_THUMBNAILS:
+            self.thumbnails.popitem(last=False)
+        return surface
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def run_benchmark(num_saves=50000):
+    import os
+    import tempfile
+    from save_index import SaveIndex
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SaveIndex(os.path.join(directory, "index.sqlite"))
+        board = [[50 + i * 37 % 700, 60 + i * 53 % 500, "PLAYER" if i % 3 else "ENEMY"] for i in range(20)]
+        for i in range(num_saves):
+            day, second = divmod(i, 86400)
+            game_id = f"level{i % 30 + 1}_202{4 + day // 365}{day % 12 + 1:02d}01_" \
+                      f"{second // 3600:02d}{second // 60 % 60:02d}{second % 60:02d}_completed"
+            index.add(game_id, f"level{i % 30 + 1}", "json", f"saved_games/json/{game_id}.json", 20000,
+                      "Player Wins", 1200, 300.5, board)
+
+        pygame.init()
+        start = time.perf_counter()
+        browser = ReplayBrowser(index)
+        total = browser.count("json")
+        rows = browser.rows("json", 0, PAGE_SIZE)
+        for row in rows:
+            browser.thumbnail(row)
+        open_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        deep = browser.rows("json", total - PAGE_SIZE, PAGE_SIZE)
+        deep_time = time.perf_counter() - start
+
+        browser.executor.submit(lambda: None).result()
+        start = time.perf_counter()
+        browser.rows("json", PAGE_SIZE, PAGE_SIZE)
+        prefetched_time = time.perf_counter() - start
+
+        browser.close()
+        print(f"{total} saves in the index")
+        print(f"open (count, first page, thumbnails): {open_time * 1000:.1f} ms")
+        print(f"last page: {deep_time * 1000:.1f} ms ({deep[-1]['game_id']})")
+        print(f"prefetched next page: {prefetched_time * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
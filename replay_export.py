@@ -0,0 +1,162 @@
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+# pygame greets on stdout on import, which is the frame stream with --raw
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+DEFAULT_FPS = 30
+EXPORT_DIR = "exports"
+FORMATS_BY_EXTENSION = {
+    ".json": "json",
+    ".xml": "xml",
+    ".replay": "binary",
+}
+
+
+def format_for_path(path):
+    # anything without a known extension is taken to be a MongoDB id
+    return FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "mongodb")
+
+
+class ReplayExporter:
+    # renders a replay off-screen at a fixed step of game time per frame, as fast as the
+    # machine allows; the window is never shown, so it runs on the dummy SDL driver
+    def __init__(self, game, fps=DEFAULT_FPS, speed=1.0):
+        if fps <= 0 or speed <= 0:
+            raise ValueError("fps and speed must be positive")
+
+        self.game = game
+        self.fps = fps
+        self.speed = speed
+        self.frames = 0
+
+    def open(self, path, save_format=None):
+        # same loaders and playback as the replay menu, paused so only seek() moves it
+        if not self.game.start_playback(path, save_format or format_for_path(path)):
+            return None
+
+        playback = self.game.game_playback
+        playback.pause()
+        return playback
+
+    def frame_times(self, playback, start=0.0, end=None):
+        duration = playback.duration
+        end = duration if end is None else min(end, duration)
+        step = self.speed / self.fps
+
+        i = 0
+        while start + i * step <= end:
+            yield start + i * step
+            i += 1
+
+    def render(self, path, write_frame, save_format=None, start=0.0, end=None):
+        # write_frame(index, surface) is called once per output frame
+        playback = self.open(path, save_format)
+        if playback is None:
+            return 0
+
+        # particles and the starfield use the global random module, seeded so exports repeat exactly
+        random.seed(0)
+        background = self.game.draw_background_gradient()
+
+        count = 0
+        try:
+            for frame_time in self.frame_times(playback, start, end):
+                playback.seek(frame_time)
+                self.game.draw_board(background)
+                write_frame(count, self.game.screen)
+                count += 1
+        finally:
+            self.game.playback_active = False
+            self.game.game_playback = None
+
+        self.frames += count
+        return count
+
+
+def png_writer(directory):
+    os.makedirs(directory, exist_ok=True)
+
+    def write_frame(index, surface):
+        pygame.image.save(surface, os.path.join(directory, f"frame_{index:06d}.png"))
+    return write_frame
+
+
+def raw_writer(stream):
+    # rgb24, e.g. | ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 30 -i - clip.mp4
+    to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+
+    def write_frame(index, surface):
+        stream.write(to_bytes(surface, "RGB"))
+    return write_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render replays to frames without a window, faster than real time")
+    parser.add_argument("files", nargs="+", help="replay files (.json, .xml, .replay) or MongoDB ids")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="frames per second of the output")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="game seconds per second of output, any positive value")
+    parser.add_argument("--start", type=float, default=0.0, help="first second of the replay to render")
+    parser.add_argument("--end", type=float, default=None, help="last second of the replay to render")
+    parser.add_argument("--format", choices=["json", "xml", "binary", "mongodb"], default=None,
+                        help="format of the files (default: from the extension)")
+    parser.add_argument("--output", default=EXPORT_DIR,
+                        help="directory for the PNG frames, one folder per replay")
+    parser.add_argument("--raw", action="store_true",
+                        help="write raw RGB frames to stdout instead of PNG files, for piping to an encoder")
+    args = parser.parse_args()
+
+    if args.raw and len(args.files) > 1:
+        parser.error("--raw takes a single replay")
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import main as game_module
+
+    game = game_module.Game(show_menu=False)
+    exporter = ReplayExporter(game, args.fps, args.speed)
+
+    failed = 0
+    for path in args.files:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if args.raw:
+            write_frame = raw_writer(sys.stdout.buffer)
+        else:
+            write_frame = png_writer(os.path.join(args.output, name))
+
+        started = time.perf_counter()
+        try:
+            count = exporter.render(path, write_frame, args.format, args.start, args.end)
+        except BrokenPipeError:
+            # the encoder went away, nothing more to write to
+            logger.error(f"{path}: output closed after {exporter.frames} frames")
+            return 1
+        elapsed = time.perf_counter() - started
+
+        if not count:
+            failed += 1
+            print(f"{path}: could not be loaded", file=sys.stderr)
+            continue
+
+        rendered = count * args.speed / args.fps
+        print(f"{path}: {count} frames ({rendered:.1f} s of game) in {elapsed:.1f} s, "
+              f"{count / elapsed:.0f} frames/s, {rendered / elapsed:.1f}x real time", file=sys.stderr)
+
+    if args.raw:
+        sys.stdout.buffer.flush()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        datefmt='%H:%M:%S')
+    sys.exit(main())
@@ -0,0 +1,612 @@
+import os
+import sys
+import json
+import lzma
+import time
+import zlib
+import struct
+import logging
+import random
+import argparse
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+# file layout, little endian:
+#   header   magic "WOCR", u16 version, u8 compression, u8 reserved
+#   blocks   u32 stored size, u32 raw size, payload - until the trailer
+#   trailer  (version 2) the last GAME_SAVE event as JSON, u32 its length, magic "WOCS";
+#            length 0 when the game was never saved
+# the concatenated raw blocks hold
+#   u32 string count, then u16 length + utf-8 bytes per string
+#   u32 metadata length + metadata as JSON
+#   u32 event count n, n u8 opcodes, n f64 timestamps
+#   per opcode in order: u32 section length + the packed records of all events with that opcode
+# version 3 added the INPUT, CHECKSUM and board records, older files have the first 7 sections
+REPLAY_MAGIC = b"WOCR"
+REPLAY_VERSION = 3
+REPLAY_EXTENSION = ".replay"
+BLOCK_SIZE = 256 * 1024
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lzma": COMPRESSION_LZMA}
+
+HEADER = struct.Struct("<4sHBB")
+BLOCK = struct.Struct("<II")
+COUNT = struct.Struct("<I")
+STRING_LENGTH = struct.Struct("<H")
+TRAILER = struct.Struct("<I4s")
+TRAILER_MAGIC = b"WOCS"
+TABLE = struct.Struct("<HIB")  # key, rows, columns
+
+# field kinds: i - int32, I - uint32, B - uint8, ? - bool, s - string table index
+# an event type can have several layouts, one per set of keys its data is recorded with
+OPCODE_GENERIC = 0
+EVENT_RECORDS = {
+    "BRIDGE_CREATED": ((1, (("sourceId", "i"), ("targetId", "i"), ("direction", "s"), ("cost", "i"))),),
+    "BRIDGE_REMOVED": ((2, (("sourceId", "i"), ("targetId", "i"))),),
+    "CELL_CAPTURED": ((3, (("cellId", "i"), ("newType", "s"), ("points", "i"), ("isPlayer", "?"))),),
+    "CELL_EVOLVED": ((4, (("cellId", "i"), ("oldLevel", "B"), ("newLevel", "B"))),),
+    "TURN_SWITCH": ((5, (("isPlayerTurn", "?"),)),),
+    "INPUT": ((7, (("tick", "i"), ("action", "s"))),
+              (8, (("tick", "i"), ("action", "s"), ("sourceId", "i"))),
+              (9, (("tick", "i"), ("action", "s"), ("sourceId", "i"), ("targetId", "i"))),
+              (10, (("tick", "i"), ("action", "s"), ("sourceId", "i"), ("targetId", "i"), ("refundId", "i")))),
+    "CHECKSUM": ((11, (("tick", "i"), ("checksum", "I"))),),
+}
+OPCODE_GAME_START = 6
+# whole-board events: their lists of cells, bridges, balls... are stored column by column, the
+# rest of their data as JSON
+OPCODE_BOARD = 12
+BOARD_EVENTS = ("KEYFRAME", "GAME_SAVE", "GAME_END")
+CELL_FIELDS = (("id", "i"), ("x", "i"), ("y", "i"), ("type", "s"), ("shape", "s"), ("evolution", "B"),
+               ("points", "i"))
+
+EVENT_KEYS = ["timestamp", "eventType", "data"]
+
+
+def _record_struct(fields):
+    return struct.Struct("<" + "".join("H" if kind == "s" else kind for _, kind in fields))
+
+
+RECORD_LAYOUTS = {event_type: {tuple(name for name, _ in fields): opcode for opcode, fields in layouts}
+                  for event_type, layouts in EVENT_RECORDS.items()}
+RECORD_STRUCTS = {opcode: (event_type, [name for name, _ in fields], [kind for _, kind in fields],
+                           _record_struct(fields))
+                  for event_type, layouts in EVENT_RECORDS.items() for opcode, fields in layouts}
+CELL_NAMES = [name for name, _ in CELL_FIELDS]
+CELL_KINDS = [kind for _, kind in CELL_FIELDS]
+CELL_STRUCT = _record_struct(CELL_FIELDS)
+OPCODE_COUNT = OPCODE_BOARD + 1
+VERSION_2_OPCODE_COUNT = OPCODE_GAME_START + 1
+EVENT_TYPES = {opcode: record[0] for opcode, record in RECORD_STRUCTS.items()}
+EVENT_TYPES[OPCODE_GAME_START] = "GAME_START"
+
+
+class ReplayFormatError(Exception):
+    pass
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return i
+
+
+def _fits(value, kind):
+    # only values that come back bit-for-bit identical are packed, anything else goes to JSON
+    if kind == "?":
+        return type(value) is bool
+    if kind == "s":
+        return type(value) is str and len(value.encode("utf-8")) <= 0xFFFF
+    if type(value) is not int:
+        return False
+    if kind == "B":
+        return 0 <= value <= 0xFF
+    if kind == "I":
+        return 0 <= value < 2 ** 32
+    if kind == "q":
+        return -2 ** 63 <= value < 2 ** 63
+    return -2 ** 31 <= value < 2 ** 31
+
+
+def _column_kind(values):
+    # the narrowest kind every value of a column packs into exactly, None if there is none
+    first = type(values[0])
+    if any(type(value) is not first for value in values):
+        return None
+    if first is bool:
+        return "?"
+    if first is float:
+        return "d"
+    if first is str:
+        return "s" if all(_fits(value, "s") for value in values) else None
+    if first is int:
+        for kind in ("i", "q"):
+            if all(_fits(value, kind) for value in values):
+                return kind
+    return None
+
+
+def _pack_table(rows, strings):
+    # a list of dicts with the same keys, column by column; None if it does not fit
+    if not rows or not all(type(row) is dict for row in rows):
+        return None
+    names = list(rows[0])
+    if not names or len(names) > 0xFF or not all(list(row) == names for row in rows):
+        return None
+
+    columns = []
+    for name in names:
+        values = [row[name] for row in rows]
+        kind = _column_kind(values)
+        if kind is None or not _fits(name, "s"):
+            return None
+        if kind == "s":
+            values = [strings.add(value) for value in values]
+        columns.append((strings.add(name), kind, values))
+
+    packed = bytearray(struct.pack(f"<{len(columns)}H", *(name for name, _, _ in columns)))
+    packed += "".join(kind for _, kind, _ in columns).encode()
+    for _, kind, values in columns:
+        packed += struct.pack(f"<{len(values)}{'H' if kind == 's' else kind}", *values)
+    return packed
+
+
+def _pack_fields(record_struct, names, kinds, data, strings):
+    if list(data) != names or not all(_fits(data[name], kind) for name, kind in zip(names, kinds)):
+        return None
+
+    values = [strings.add(data[name]) if kind == "s" else data[name] for name, kind in zip(names, kinds)]
+    return record_struct.pack(*values)
+
+
+def _encode_event(event, strings, sections, boards):
+    # packs the event into its opcode section and returns (opcode, timestamp); the JSON part of
+    # board events is collected in boards
+    timestamp = event.get("timestamp")
+    event_type = event.get("eventType")
+    data = event.get("data")
+
+    if list(event) == EVENT_KEYS and type(timestamp) is float and isinstance(data, dict):
+        opcode = RECORD_LAYOUTS.get(event_type, {}).get(tuple(data))
+        if opcode is not None:
+            _, names, kinds, record_struct = RECORD_STRUCTS[opcode]
+            packed = _pack_fields(record_struct, names, kinds, data, strings)
+            if packed is not None:
+                sections[opcode] += packed
+                return opcode, timestamp
+
+        elif event_type in BOARD_EVENTS:
+            boards.append(_pack_board(event_type, data, strings, sections[OPCODE_BOARD]))
+            return OPCODE_BOARD, timestamp
+
+        elif event_type == "GAME_START" and list(data) == ["cells"] and isinstance(data["cells"], list):
+            cells = []
+            for cell in data["cells"]:
+                packed = _pack_fields(CELL_STRUCT, CELL_NAMES, CELL_KINDS, cell, strings) \
+                    if isinstance(cell, dict) else None
+                if packed is None:
+                    break
+                cells.append(packed)
+            else:
+                sections[OPCODE_GAME_START] += COUNT.pack(len(cells))
+                sections[OPCODE_GAME_START] += b"".join(cells)
+                return OPCODE_GAME_START, timestamp
+
+    # anything unexpected keeps its full JSON form
+    payload = json.dumps(event, separators=(',', ':')).encode("utf-8")
+    sections[OPCODE_GENERIC] += COUNT.pack(len(payload))
+    sections[OPCODE_GENERIC] += payload
+    return OPCODE_GENERIC, 0.0
+
+
+def _pack_board(event_type, data, strings, section):
+    # u16 event type, u8 table count, then per table u16 key, u32 rows, u8 column count, u16 per
+    # column name, u8 per column kind and the column arrays; returns the data with every packed
+    # list left as null, all boards' JSON goes in front of the section as one array
+    tables = []
+    rest = {}
+    for key, value in data.items():
+        packed = _pack_table(value, strings) if type(value) is list and _fits(key, "s") else None
+        if packed is None:
+            rest[key] = value
+        else:
+            rest[key] = None
+            tables.append(TABLE.pack(strings.add(key), len(value), len(value[0])) + packed)
+
+    section += STRING_LENGTH.pack(strings.add(event_type))
+    section.append(len(tables))
+    for table in tables:
+        section += table
+    return rest
+
+
+def encode_history(history, compression=COMPRESSION_ZLIB):
+    strings = StringTable()
+    events = history.get("events", [])
+
+    sections = [bytearray() for _ in range(OPCODE_COUNT)]
+    boards = []
+    opcodes = bytearray()
+    timestamps = []
+    last_save = None
+    for event in events:
+        if event.get("eventType") == "GAME_SAVE":
+            last_save = event
+        opcode, timestamp = _encode_event(event, strings, sections, boards)
+        opcodes.append(opcode)
+        timestamps.append(timestamp)
+
+    board_json = json.dumps(boards, separators=(',', ':')).encode("utf-8")
+    sections[OPCODE_BOARD][:0] = COUNT.pack(len(board_json)) + board_json
+
+    if len(strings.strings) > 0xFFFF:
+        raise ReplayFormatError("Too many distinct strings for the string table")
+
+    raw = bytearray(COUNT.pack(len(strings.strings)))
+    for value in strings.strings:
+        encoded = value.encode("utf-8")
+        raw += STRING_LENGTH.pack(len(encoded))
+        raw += encoded
+
+    metadata = json.dumps(history.get("metadata", {}), separators=(',', ':'), default=str).encode("utf-8")
+    raw += COUNT.pack(len(metadata))
+    raw += metadata
+
+    raw += COUNT.pack(len(events))
+    raw += opcodes
+    raw += struct.pack(f"<{len(timestamps)}d", *timestamps)
+    for section in sections:
+        raw += COUNT.pack(len(section))
+        raw += section
+
+    out = bytearray(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, compression, 0))
+    for start in range(0, len(raw), BLOCK_SIZE):
+        block = bytes(raw[start:start + BLOCK_SIZE])
+        if compression == COMPRESSION_ZLIB:
+            stored = zlib.compress(block, 6)
+        elif compression == COMPRESSION_LZMA:
+            stored = lzma.compress(block)
+        else:
+            stored = block
+        out += BLOCK.pack(len(stored), len(block))
+        out += stored
+
+    # uncompressed at the very end, continuing a saved game reads only this
+    trailer = json.dumps(last_save, separators=(',', ':'), default=str).encode("utf-8") if last_save else b""
+    out += trailer
+    out += TRAILER.pack(len(trailer), TRAILER_MAGIC)
+
+    return bytes(out)
+
+
+def _trailer_start(data):
+    if len(data) < HEADER.size + TRAILER.size:
+        raise ReplayFormatError("File too short for a replay trailer")
+    length, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    if magic != TRAILER_MAGIC:
+        raise ReplayFormatError("Replay trailer missing")
+    return len(data) - TRAILER.size - length
+
+
+def _read_blocks(data, compression, end):
+    chunks = []
+    offset = HEADER.size
+    while offset < end:
+        stored_size, raw_size = BLOCK.unpack_from(data, offset)
+        offset += BLOCK.size
+        stored = data[offset:offset + stored_size]
+        offset += stored_size
+
+        if compression == COMPRESSION_ZLIB:
+            block = zlib.decompress(stored)
+        elif compression == COMPRESSION_LZMA:
+            block = lzma.decompress(stored)
+        else:
+            block = bytes(stored)
+
+        if len(block) != raw_size:
+            raise ReplayFormatError("Corrupted replay block")
+        chunks.append(block)
+
+    return b"".join(chunks)
+
+
+def _decode_records(section, names, kinds, record_struct, strings):
+    string_names = [name for name, kind in zip(names, kinds) if kind == "s"]
+    rows = [dict(zip(names, values)) for values in record_struct.iter_unpack(section)]
+    for row in rows:
+        for name in string_names:
+            row[name] = strings[row[name]]
+    return rows
+
+
+def _decode_game_starts(section, strings):
+    starts = []
+    offset = 0
+    while offset < len(section):
+        (cell_count,) = COUNT.unpack_from(section, offset)
+        offset += COUNT.size
+        end = offset + cell_count * CELL_STRUCT.size
+        cells = _decode_records(section[offset:end], CELL_NAMES, CELL_KINDS, CELL_STRUCT, strings)
+        starts.append({"cells": cells})
+        offset = end
+    return starts
+
+
+def _decode_boards(section, strings):
+    (length,) = COUNT.unpack_from(section, 0)
+    boards = json.loads(str(section[COUNT.size:COUNT.size + length], "utf-8"))
+    events = []
+    # boards repeat the same few table shapes: names, kinds and struct are worked out once per shape
+    layouts = {}
+    offset = COUNT.size + length
+    for data in boards:
+        (event_type,) = STRING_LENGTH.unpack_from(section, offset)
+        table_count = section[offset + STRING_LENGTH.size]
+        offset += STRING_LENGTH.size + 1
+
+        for _ in range(table_count):
+            key, rows, column_count = TABLE.unpack_from(section, offset)
+            offset += TABLE.size
+            header = bytes(section[offset:offset + 3 * column_count])
+            offset += 3 * column_count
+
+            layout = layouts.get((header, rows))
+            if layout is None:
+                names = [strings[i] for i in struct.unpack_from(f"<{column_count}H", header)]
+                kinds = header[2 * column_count:].decode()
+                table_struct = struct.Struct("<" + "".join(f"{rows}{'H' if kind == 's' else kind}" for kind in kinds))
+                layout = layouts[(header, rows)] = (names, [kind == "s" for kind in kinds], table_struct)
+            names, string_columns, table_struct = layout
+
+            # all columns of the table in one unpack, then cut into columns
+            flat = table_struct.unpack_from(section, offset)
+            offset += table_struct.size
+            columns = [flat[i * rows:(i + 1) * rows] for i in range(column_count)]
+            for i, is_string in enumerate(string_columns):
+                if is_string:
+                    columns[i] = [strings[index] for index in columns[i]]
+            data[strings[key]] = [dict(zip(names, row)) for row in zip(*columns)]
+
+        events.append({"eventType": strings[event_type], "data": data})
+    return events
+
+
+def _decode_generic(section):
+    events = []
+    offset = 0
+    while offset < len(section):
+        (length,) = COUNT.unpack_from(section, offset)
+        offset += COUNT.size
+        events.append(json.loads(str(section[offset:offset + length], "utf-8")))
+        offset += length
+    return events
+
+
+def decode_history(data):
+    if len(data) < HEADER.size:
+        raise ReplayFormatError("File too short for a replay header")
+
+    magic, version, compression, _ = HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC:
+        raise ReplayFormatError("Not a War of Cells replay file")
+    if version > REPLAY_VERSION:
+        raise ReplayFormatError(f"Replay version {version} is newer than supported version {REPLAY_VERSION}")
+    if compression not in COMPRESSION_NAMES.values():
+        raise ReplayFormatError(f"Unknown compression {compression}")
+
+    end = _trailer_start(data) if version >= 2 else len(data)
+    raw = memoryview(_read_blocks(data, compression, end))
+
+    offset = 0
+    (string_count,) = COUNT.unpack_from(raw, offset)
+    offset += COUNT.size
+    strings = []
+    for _ in range(string_count):
+        (length,) = STRING_LENGTH.unpack_from(raw, offset)
+        offset += STRING_LENGTH.size
+        strings.append(str(raw[offset:offset + length], "utf-8"))
+        offset += length
+
+    (metadata_length,) = COUNT.unpack_from(raw, offset)
+    offset += COUNT.size
+    metadata = json.loads(str(raw[offset:offset + metadata_length], "utf-8"))
+    offset += metadata_length
+
+    (event_count,) = COUNT.unpack_from(raw, offset)
+    offset += COUNT.size
+    opcodes = bytes(raw[offset:offset + event_count])
+    offset += event_count
+    timestamps = struct.unpack_from(f"<{event_count}d", raw, offset)
+    offset += event_count * 8
+
+    # every section decodes in bulk, the events are then stitched back in recorded order
+    decoded = []
+    for opcode in range(OPCODE_COUNT if version >= 3 else VERSION_2_OPCODE_COUNT):
+        (length,) = COUNT.unpack_from(raw, offset)
+        offset += COUNT.size
+        section = raw[offset:offset + length]
+        offset += length
+
+        if opcode == OPCODE_GENERIC:
+            decoded.append(iter(_decode_generic(section)))
+        elif opcode == OPCODE_GAME_START:
+            decoded.append(iter(_decode_game_starts(section, strings)))
+        elif opcode == OPCODE_BOARD:
+            decoded.append(iter(_decode_boards(section, strings)))
+        else:
+            _, names, kinds, record_struct = RECORD_STRUCTS[opcode]
+            decoded.append(iter(_decode_records(section, names, kinds, record_struct, strings)))
+
+    if max(opcodes, default=0) >= len(decoded):
+        raise ReplayFormatError("Unknown event opcode")
+
+    events = []
+    for opcode, timestamp in zip(opcodes, timestamps):
+        if opcode == OPCODE_GENERIC:
+            events.append(next(decoded[OPCODE_GENERIC]))
+        elif opcode == OPCODE_BOARD:
+            board = next(decoded[OPCODE_BOARD])
+            events.append({"timestamp": timestamp, "eventType": board["eventType"], "data": board["data"]})
+        else:
+            events.append({"timestamp": timestamp, "eventType": EVENT_TYPES[opcode], "data": next(decoded[opcode])})
+
+    return {
+        "metadata": metadata,
+        "events": events
+    }
+
+
+def save_binary_history(filename, history, compression=COMPRESSION_ZLIB):
+    data = encode_history(history, compression)
+    with atomic_open(filename, "wb") as f:
+        f.write(data)
+    return filename
+
+
+def load_binary_history(filename):
+    with open(filename, "rb") as f:
+        return decode_history(f.read())
+
+
+def read_binary_last_save(filename):
+    # the last GAME_SAVE event from the trailer, without decompressing the events;
+    # None for version 1 files and games that were never saved
+    with open(filename, "rb") as f:
+        magic, version, _, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != REPLAY_MAGIC or version < 2:
+            return None
+
+        f.seek(-TRAILER.size, os.SEEK_END)
+        length, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != TRAILER_MAGIC or not length:
+            return None
+
+        f.seek(-TRAILER.size - length, os.SEEK_END)
+        return json.loads(f.read(length))
+
+
+def json_to_binary(json_file, binary_file=None, compression=COMPRESSION_ZLIB):
+    with open(json_file, "r") as f:
+        history = json.load(f)
+
+    binary_file = binary_file or os.path.splitext(json_file)[0] + REPLAY_EXTENSION
+    return save_binary_history(binary_file, history, compression)
+
+
+def binary_to_json(binary_file, json_file=None):
+    history = load_binary_history(binary_file)
+
+    json_file = json_file or os.path.splitext(binary_file)[0] + ".json"
+    with open(json_file, "w") as f:
+        json.dump(history, f, indent=2)
+    return json_file
+
+
+def _time_load(load, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        load()
+    return (time.perf_counter() - start) / repeats
+
+
+def size_report(history, repeats=5):
+    json_data = json.dumps(history, indent=2)
+    json_time = _time_load(lambda: json.loads(json_data), repeats)
+
+    print(f"{len(history['events'])} events")
+    print(f"{'format':<14}{'size KB':>10}{'size ratio':>12}{'load ms':>10}{'load ratio':>12}")
+    print(f"{'json indent=2':<14}{len(json_data) / 1024:>10.1f}{1:>12.2f}{json_time * 1000:>10.2f}{1:>12.2f}")
+
+    for name, compression in COMPRESSION_NAMES.items():
+        data = encode_history(history, compression)
+        if decode_history(data) != history:
+            print(f"binary {name}: round trip changed the history")
+        load_time = _time_load(lambda: decode_history(data), repeats)
+        print(f"{'binary ' + name:<14}{len(data) / 1024:>10.1f}{len(data) / len(json_data):>12.3f}"
+              f"{load_time * 1000:>10.2f}{load_time / json_time:>12.2f}")
+
+
+def _long_game_history(level_name, num_events, seed):
+    from self_play import simulate_level
+    from ai_evaluation import EvaluationModel
+    from level_store import get_level_store
+
+    level_data = get_level_store().get(level_name)
+
+    # simulated games end within a minute or two, so several of them are chained into one
+    # long session: the events after each game's GAME_START are appended with shifted timestamps,
+    # the first game's GAME_END (if it has one) closes the session
+    rng = random.Random(seed)
+    model = EvaluationModel.load_if_exists() or EvaluationModel()
+    history = None
+    game_end = None
+    offset = 0.0
+
+    while history is None or len(history["events"]) < num_events:
+        game = simulate_level(level_data, seed=rng.getrandbits(32), max_time=1800, record=True,
+                              level_name=level_name, player_agent=model.agent(0.3, rng),
+                              enemy_agent=model.agent(0.3, rng)).history
+        events = [event for event in game["events"] if event["eventType"] != "GAME_END"]
+        if history is None:
+            history = {"metadata": game["metadata"], "events": events}
+            game_end = next((event for event in game["events"] if event["eventType"] == "GAME_END"), None)
+        else:
+            for event in events[1:]:
+                history["events"].append(dict(event, timestamp=event["timestamp"] + offset))
+        offset = history["events"][-1]["timestamp"]
+
+    if game_end is not None:
+        history["events"].append(dict(game_end, timestamp=offset))
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert replays between JSON and the binary format")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    to_binary = subparsers.add_parser("to-binary", help="convert a JSON history to a binary replay")
+    to_binary.add_argument("json_file")
+    to_binary.add_argument("--out")
+    to_binary.add_argument("--compression", choices=list(COMPRESSION_NAMES), default="zlib")
+
+    to_json = subparsers.add_parser("to-json", help="convert a binary replay back to JSON")
+    to_json.add_argument("binary_file")
+    to_json.add_argument("--out")
+
+    report = subparsers.add_parser("report", help="compare sizes and load times against JSON")
+    report.add_argument("json_file", nargs="?", help="recorded game, a simulated long game by default")
+    report.add_argument("--level", default="level1")
+    report.add_argument("--events", type=int, default=20000, help="length of the simulated session")
+    report.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == "to-binary":
+        print(json_to_binary(args.json_file, args.out, COMPRESSION_NAMES[args.compression]))
+    elif args.command == "to-json":
+        print(binary_to_json(args.binary_file, args.out))
+    elif args.json_file:
+        with open(args.json_file, "r") as f:
+            size_report(json.load(f))
+    else:
+        size_report(_long_game_history(args.level, args.events, args.seed))
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    sys.exit(main())
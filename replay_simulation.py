@@ -0,0 +1,178 @@
+import sys
+import glob
+import time
+import bisect
+import logging
+import argparse
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+
+def keyframe_seed(seed, tick):
+    # the game reseeds its random stream at every keyframe, so a replay can start from any of them
+    # without storing the generator state
+    return seed * 1000003 + tick
+
+
+class ReplaySimulator:
+    # replays a recording by running Game.step() again: state comes from the KEYFRAME events, the
+    # player and AI actions from the INPUT events, and CHECKSUM events tell when the result drifts
+    def __init__(self, game, history):
+        self.game = game
+        metadata = history["metadata"]
+        self.seed = metadata["seed"]
+        self.tick_rate = metadata["tickRate"]
+
+        self.events = history["events"]
+        self.keyframe_ticks = []
+        self.keyframe_indices = []
+        self.checksums = {}
+        self.end_tick = 0
+        for i, event in enumerate(self.events):
+            data = event["data"]
+            if event["eventType"] == "KEYFRAME":
+                self.keyframe_ticks.append(data["tick"])
+                self.keyframe_indices.append(i)
+            elif event["eventType"] == "CHECKSUM":
+                self.checksums[data["tick"]] = data["checksum"]
+            if "tick" in data:
+                self.end_tick = max(self.end_tick, data["tick"])
+
+        self.end_tick = max(self.end_tick, int(round(metadata.get("duration", 0) * self.tick_rate)))
+        self.event_index = 0
+        self.cells_by_id = {}
+        self.started = False
+        self.checked = 0
+        self.divergence = None
+
+    @staticmethod
+    def supports(history):
+        # recordings from before the fixed timestep only have the events to patch in
+        metadata = history.get("metadata", {})
+        if metadata.get("seed") is None or not metadata.get("tickRate"):
+            return False
+        return any(event["eventType"] == "KEYFRAME" and "tick" in event["data"] for event in history["events"])
+
+    def inputs_until(self, tick):
+        # called by Game.step() in place of the AI
+        inputs = []
+        while self.event_index < len(self.events):
+            event = self.events[self.event_index]
+            if event["eventType"] == "INPUT":
+                data = event["data"]
+                if data["tick"] > tick:
+                    break
+                inputs.append((data["action"], self.cells_by_id.get(data.get("sourceId")),
+                               self.cells_by_id.get(data.get("targetId")), self.cells_by_id.get(data.get("refundId"))))
+            elif event["eventType"] == "KEYFRAME" and event["data"]["tick"] > tick:
+                break
+            self.event_index += 1
+        return inputs
+
+    def _restore(self, k):
+        index = self.keyframe_indices[k]
+        self.cells_by_id = self.game.restore_state(self.events[index]["data"])
+        self.game.seed = self.seed
+        self.game.reseed()
+        self.event_index = index + 1
+        self.started = True
+
+    def seek(self, tick):
+        tick = max(0, min(tick, self.end_tick))
+        k = max(0, bisect.bisect_right(self.keyframe_ticks, tick) - 1)
+
+        # going forward within the current stretch needs no restore
+        if not (self.started and self.keyframe_ticks[k] <= self.game.tick <= tick):
+            self._restore(k)
+        self.advance_to(tick)
+
+    def advance_to(self, tick):
+        if not self.started:
+            self._restore(0)
+
+        previous_source = self.game.input_source
+        self.game.input_source = self
+        try:
+            while self.game.tick < min(tick, self.end_tick):
+                self.game.step()
+                self._verify()
+        finally:
+            self.game.input_source = previous_source
+
+    def _verify(self):
+        expected = self.checksums.get(self.game.tick)
+        if expected is None:
+            return
+
+        self.checked += 1
+        actual = self.game.state_checksum()
+        if actual != expected and self.divergence is None:
+            self.divergence = self.game.tick
+            logger.warning(f"Replay diverged from the recording at tick {self.game.tick} "
+                           f"({self.game.tick / self.tick_rate:.2f} s)")
+
+    @property
+    def finished(self):
+        return self.game.tick >= self.end_tick
+
+
+def load_history(path):
+    from game_playback import GamePlayback
+
+    playback = GamePlayback(None)
+    if path.endswith(".xml"):
+        loaded = playback.load_xml_history(path)
+    elif path.endswith(".replay"):
+        loaded = playback.load_binary_history(path)
+    else:
+        loaded = playback.load_json_history(path)
+    return playback.history if loaded else None
+
+
+def verify_replay(game, history):
+    # full headless re-simulation; every recorded checksum must match
+    simulator = ReplaySimulator(game, history)
+    simulator.seek(0)
+    simulator.advance_to(simulator.end_tick)
+    return simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-simulate recorded games and compare them with their checksums, e.g. after changing the rules "
+                    "or optimising the game loop")
+    parser.add_argument("files", nargs="*", help="replays to check (default: every JSON save)")
+    args = parser.parse_args()
+
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import main as game_module
+
+    files = args.files or sorted(glob.glob("saved_games/json/*.json"))
+    game = game_module.Game(show_menu=False)
+
+    failed = 0
+    for path in files:
+        history = load_history(path)
+        if history is None or not ReplaySimulator.supports(history):
+            print(f"{path}: skipped, not a re-simulatable recording")
+            continue
+
+        start = time.perf_counter()
+        simulator = verify_replay(game, history)
+        elapsed = time.perf_counter() - start
+
+        if simulator.divergence is None:
+            print(f"{path}: ok, {simulator.end_tick} ticks, {simulator.checked} checksums in {elapsed:.2f}s")
+        else:
+            failed += 1
+            print(f"{path}: DIVERGED at tick {simulator.divergence} "
+                  f"({simulator.divergence / simulator.tick_rate:.2f} s)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        datefmt='%H:%M:%S')
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+INDEX_FILE = "saved_games/index.sqlite"
+SAVE_DIRS = {
+    "json": ("saved_games/json", ".json"),
+    "xml": ("saved_games/xml", ".xml"),
+    "binary": ("saved_games/binary", ".replay"),
+}
+# when one save exists in several formats, the one that loads fastest is offered first
+FORMAT_PREFERENCE = ("checkpoint", "binary", "json", "xml", "mongodb")
+
+
+def parse_game_id(game_id):
+    # "<level or game>_<YYYYmmdd>_<HHMMSS>_<completed|in_progress>" as made by generate_game_id
+    status = "in_progress" if game_id.endswith("_in_progress") else "completed"
+    base = game_id[:-len("_" + status)] if game_id.endswith("_" + status) else game_id
+    parts = base.rsplit("_", 2)
+    timestamp = f"{parts[1]}_{parts[2]}" if len(parts) == 3 else ""
+    return timestamp, status
+
+
+def parse_game_level(game_id):
+    # the level part of a game id, split from the right since level names may hold underscores;
+    # None for games recorded without a level ("game_<timestamp>_<status>")
+    _, status = parse_game_id(game_id)
+    base = game_id[:-len("_" + status)] if game_id.endswith("_" + status) else game_id
+    parts = base.rsplit("_", 2)
+    if len(parts) != 3 or parts[0] == "game":
+        return None
+    return parts[0]
+
+
+class SaveIndex:
+    # SQLite table of every saved history (one row per format), so menus never have to open the files
+    def __init__(self, path=INDEX_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.lock = threading.Lock()
+        # bumped on every change, lets cached listings tell they are stale
+        self.version = 0
+        is_new = not os.path.exists(path)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.lock, self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS saves (
+                    game_id TEXT NOT NULL,
+                    level TEXT,
+                    timestamp TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    points NUMERIC,
+                    time_taken NUMERIC,
+                    board TEXT,
+                    created REAL DEFAULT (julianday('now')),
+                    PRIMARY KEY (format, path)
+                )""")
+            # indexes written before thumbnails were cached lack the board column
+            columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(saves)")}
+            if "board" not in columns:
+                self.connection.execute("ALTER TABLE saves ADD COLUMN board TEXT")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS saves_by_level ON saves (level, status, timestamp DESC)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS saves_by_format ON saves (format, timestamp DESC)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS saves_by_game ON saves (game_id)")
+
+        if is_new:
+            self.scan()
+
+    def add(self, game_id, level, save_format, path, size=None, result=None, points=None, time_taken=None,
+            board=None):
+        # board: [[x, y, cell type], ...] for the replay browser thumbnail
+        timestamp, status = parse_game_id(game_id)
+        board = json.dumps(board, separators=(',', ':')) if board is not None else None
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO saves (game_id, level, timestamp, format, path, size, status, result, "
+                "points, time_taken, board) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (game_id, level, timestamp, save_format, path, size, status, result, points, time_taken, board))
+            self.version += 1
+
+    def update_summary(self, save_format, path, board, result=None, points=None, time_taken=None):
+        # fills in what a scanned row was missing once the file has been read; known values are kept
+        board = json.dumps(board, separators=(',', ':'))
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE saves SET board = ?, result = COALESCE(result, ?), points = COALESCE(points, ?), "
+                "time_taken = COALESCE(time_taken, ?) WHERE format = ? AND path = ?",
+                (board, result, points, time_taken, save_format, path))
+
+    def remove(self, save_format, path):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM saves WHERE format = ? AND path = ?", (save_format, path))
+            self.version += 1
+
+    def find(self, level=None, status=None, save_format=None, limit=None, offset=0, game_id=None):
+        conditions = []
+        params = []
+        for column, value in (("level", level), ("status", status), ("format", save_format),
+                              ("game_id", game_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        preference = " ".join(f"WHEN '{name}' THEN {i}" for i, name in enumerate(FORMAT_PREFERENCE))
+        query = "SELECT * FROM saves"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC"
+        if save_format is None:
+            # a constant tie-breaker would keep SQLite from walking saves_by_format in order
+            query += f", CASE format {preference} ELSE {len(FORMAT_PREFERENCE)} END"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(query, params)]
+
+    def count(self, level=None, status=None, save_format=None):
+        conditions = []
+        params = []
+        for column, value in (("level", level), ("status", status), ("format", save_format)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        query = "SELECT COUNT(*) FROM saves"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with self.lock:
+            return self.connection.execute(query, params).fetchone()[0]
+
+    def in_progress(self, level):
+        # unfinished saves of the level whose file still exists, newest first
+        for entry in self.find(level=level, status="in_progress"):
+            if entry["format"] == "mongodb" or os.path.exists(entry["path"]):
+                yield entry
+            else:
+                self.remove(entry["format"], entry["path"])
+
+    def latest_in_progress(self, level):
+        return next(self.in_progress(level), None)
+
+    def scan(self):
+        # one-off import of files saved before the index existed; unfinished games are read once
+        # for the points/time shown by the continue dialog
+        from xml_history import read_xml_history
+        from replay_format import load_binary_history
+
+        added = 0
+        for save_format, (directory, extension) in SAVE_DIRS.items():
+            if not os.path.exists(directory):
+                continue
+
+            for file in os.listdir(directory):
+                if not file.endswith(extension):
+                    continue
+
+                path = os.path.join(directory, file)
+                game_id = file[:-len(extension)]
+                level = parse_game_level(game_id)
+                points = time_taken = None
+
+                if game_id.endswith("_in_progress"):
+                    try:
+                        if save_format == "json":
+                            with open(path, "r") as f:
+                                history = json.load(f)
+                        elif save_format == "xml":
+                            history = read_xml_history(path)
+                        else:
+                            history = load_binary_history(path)
+                        last = history["events"][-1]["data"] if history["events"] else {}
+                        points = last.get("points")
+                        time_taken = last.get("time_taken")
+                        level = history["metadata"].get("level") or level
+                    except Exception as e:
+                        logger.error(f"Error indexing save file {path}: {e}")
+                        continue
+
+                self.add(game_id, level, save_format, path, os.path.getsize(path), points=points,
+                         time_taken=time_taken)
+                added += 1
+
+        if added:
+            logger.info(f"Indexed {added} existing save files")
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_save_index():
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SaveIndex()
+        return _default_index
@@ -0,0 +1,138 @@
+import os
+import random
+import logging
+import tempfile
+import threading
+
+from ai_scoring import score_moves
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+FPS = 60
+# ms between two moves of a side, the cooldowns Game.step() uses for each AI difficulty
+AI_COOLDOWNS = {"Easy": 1500, "Medium": 1000, "Hard": 500}
+
+
+def rules_agent(game, for_player):
+    # the same hand-written rules the in-game AI uses
+    return score_moves(game, for_player=for_player, top_k=1)
+
+
+class SelfPlayInputs:
+    # stands in for both players: Game.step() asks it for the actions of every tick, as it asks a
+    # replay, so self-play runs the game's own rules; an agent(game, for_player) returns moves as
+    # suggest_moves does and the first one is played
+    def __init__(self, game, player_agent=rules_agent, enemy_agent=rules_agent, player_ai="Medium",
+                 enemy_ai="Medium", seed=None):
+        self.game = game
+        self.agents = {True: player_agent, False: enemy_agent}
+        self.cooldowns = {True: AI_COOLDOWNS[player_ai], False: AI_COOLDOWNS[enemy_ai]}
+        # random phase so both sides do not always think on the same tick
+        rng = random.Random(seed)
+        self.last_move = {is_player: -rng.uniform(0, cooldown) for is_player, cooldown in self.cooldowns.items()}
+
+    def inputs_until(self, tick):
+        now = tick * 1000 / FPS
+        inputs = []
+        for is_player in (False, True):
+            if now - self.last_move[is_player] < self.cooldowns[is_player]:
+                continue
+            self.last_move[is_player] = now
+            for move in self.agents[is_player](self.game, is_player)[:1]:
+                inputs.append(("create_bridge", move["source"], move["target"], None))
+        return inputs
+
+
+class SelfPlayResult:
+    def __init__(self, level_name, result, duration, points, history=None):
+        self.level_name = level_name
+        self.result = result
+        self.duration = duration  # s of game time
+        self.points = points
+        self.history = history  # the GameRecorder history, when recorded
+
+
+class SelfPlay:
+    # one headless Game, reused for every game a process plays; recordings go to a scratch directory
+    # and are read back from their stream
+    def __init__(self):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        # SDL turns SIGTERM into a quit event, a worker process would then outlive Pool.terminate()
+        os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+        import main as game_module
+        from game_recorder import GameRecorder
+
+        self.game_module = game_module
+        self.game = game_module.Game(show_menu=False)
+        self.scratch = tempfile.TemporaryDirectory(prefix="self_play_")
+        self.game.game_recorder = GameRecorder(self.game, self.scratch.name)
+
+    def play(self, compiled, seed=None, player_agent=rules_agent, enemy_agent=rules_agent, player_ai="Medium",
+             enemy_ai="Medium", max_time=600.0, record=False, level_name=None):
+        # compiled as returned by level_cache.compile_level; a game not decided after max_time s is a draw
+        from event_stream import read_event_stream
+
+        game = self.game
+        seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.game_module.clear_board(game)
+        self.game_module.build_level(game, compiled)
+        game.current_level = level_name
+        game.points = 0
+        game.time_taken = 0
+        game.game_over_state = False
+        game.reset_clock(seed)
+
+        recorder = game.game_recorder
+        if record:
+            recorder.start_recording()
+
+        game.input_source = SelfPlayInputs(game, player_agent, enemy_agent, player_ai, enemy_ai, seed)
+        max_ticks = int(max_time * FPS)
+        # the rules log every bridge and capture, too much for thousands of games
+        log_level = logger.level
+        logger.setLevel(max(log_level, logging.WARNING))
+        try:
+            while game.tick < max_ticks:
+                game.step()
+                # nothing draws them
+                game.effects.clear()
+                if game.check_win_condition():
+                    break
+        finally:
+            game.input_source = None
+            logger.setLevel(log_level)
+
+        if not game.check_win_condition():
+            result = "Draw"
+        elif any(cell.cell_type == self.game_module.CellType.PLAYER for cell in game.cells):
+            result = "Player Wins"
+        else:
+            result = "Enemy Wins"
+
+        history = None
+        if record:
+            recorder.stop_recording(result)
+            recorder.stream.wait()
+            history = read_event_stream(recorder.stream.path)
+            recorder.stream.discard()
+        return SelfPlayResult(level_name, result, game.tick / FPS, game.points, history)
+
+
+_self_play = None
+_self_play_lock = threading.Lock()
+
+
+def get_self_play():
+    global _self_play
+    with _self_play_lock:
+        if _self_play is None:
+            _self_play = SelfPlay()
+        return _self_play
+
+
+def simulate_level(level_data, seed=None, player_ai="Medium", enemy_ai="Medium", max_time=600.0,
+                   record=False, level_name=None, player_agent=rules_agent, enemy_agent=rules_agent):
+    from level_cache import compile_level
+
+    return get_self_play().play(compile_level(level_data), seed, player_agent, enemy_agent, player_ai, enemy_ai,
+                                max_time, record, level_name)
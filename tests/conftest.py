@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the game's modules live at the top of the repository
+sys.path.insert(0, ROOT)
+# the game runs headless under test
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+
+@pytest.fixture
+def shipped_levels():
+    from level_store import LevelStore
+    return LevelStore(os.path.join(ROOT, "levels"))
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    # the game writes saved_games/ and settings next to where it runs
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,111 @@
+import enum
+from types import SimpleNamespace
+
+from ai_cache import BoardHasher, DecisionCache, BRIDGE_COST_DISTANCE
+
+
+class Owner(enum.Enum):
+    EMPTY = 0
+    PLAYER = 1
+    ENEMY = 2
+
+
+class Level(enum.Enum):
+    ONE = 1
+    TWO = 2
+
+
+class Cell:
+    # the attributes BoardHasher reads; hashed by identity as the game's cells are
+    def __init__(self, x, y, cell_type, evolution, points):
+        self.x = x
+        self.y = y
+        self.cell_type = cell_type
+        self.evolution = evolution
+        self.points = points
+
+
+def make_game():
+    cells = [Cell(x, 0, owner, Level.ONE, 10)
+             for x, owner in ((0, Owner.PLAYER), (BRIDGE_COST_DISTANCE * 3, Owner.EMPTY),
+                              (BRIDGE_COST_DISTANCE * 6, Owner.ENEMY), (BRIDGE_COST_DISTANCE * 9, Owner.ENEMY))]
+    return SimpleNamespace(cells=cells, bridges=[])
+
+
+def test_incremental_hash_matches_a_rebuild():
+    game = make_game()
+    hasher = BoardHasher()
+    hasher.rebuild(game)
+    player, empty, enemy, _ = game.cells
+
+    empty.cell_type = Owner.PLAYER
+    hasher.owner_changed(empty, Owner.EMPTY, Owner.PLAYER)
+    enemy.evolution = Level.TWO
+    hasher.evolution_changed(enemy, Level.ONE.value, Level.TWO.value)
+    game.bridges.append(SimpleNamespace(source_cell=player, target_cell=enemy))
+    hasher.bridge_toggled(player, enemy)
+    incremental = hasher.structure_hash
+
+    hasher.rebuild(game)
+    assert hasher.structure_hash == incremental
+
+
+def test_bridge_toggled_twice_restores_the_key():
+    game = make_game()
+    hasher = BoardHasher()
+    hasher.rebuild(game)
+    key = hasher.board_key(game, True)
+
+    hasher.bridge_toggled(game.cells[0], game.cells[1])
+    assert hasher.board_key(game, True) != key
+    hasher.bridge_toggled(game.cells[0], game.cells[1])
+    assert hasher.board_key(game, True) == key
+
+
+def test_points_only_change_the_key_when_they_cross_a_bridge_cost():
+    game = make_game()
+    hasher = BoardHasher()
+    hasher.rebuild(game)
+    player = game.cells[0]
+    # the player's bridges cost 3, 6 and 9
+    player.points = 4
+    key = hasher.board_key(game, True)
+
+    player.points = 5
+    assert hasher.board_key(game, True) == key
+    player.points = 6
+    assert hasher.board_key(game, True) != key
+
+
+def test_key_names_the_two_weakest_enemies_and_the_side():
+    game = make_game()
+    hasher = BoardHasher()
+    hasher.rebuild(game)
+    game.cells[2].points = 3
+
+    key, for_player, weakest = hasher.board_key(game, True)
+    assert for_player and weakest == (2, 3)
+    assert hasher.board_key(game, False) != (key, for_player, weakest)
+
+
+def test_cache_is_cleared_for_a_new_board():
+    game = make_game()
+    cache = DecisionCache(max_size=2)
+    key = cache.key(game, True)
+    cache.put(key, ["move"])
+    assert cache.get(cache.key(game, True)) == ["move"]
+
+    # a level load replaces the cell list
+    game.cells = list(game.cells)
+    assert cache.key(game, True) == key
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = DecisionCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert list(cache.entries) == ["a", "c"]
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pygame")
+
+from ai_evaluation import FEATURE_NAMES, history_positions
+from self_play import simulate_level
+
+
+def owner_balance(cells):
+    return sum(cell["type"] == "PLAYER" for cell in cells) - sum(cell["type"] == "ENEMY" for cell in cells)
+
+
+def test_cells_feature_follows_the_recorded_game(scratch, shipped_levels):
+    result = simulate_level(shipped_levels.get("level5"), seed=3, max_time=60, record=True, level_name="level5")
+    events = result.history["events"]
+    assert events[-1]["eventType"] == "GAME_END"
+    assert any(event["eventType"] == "CELL_CAPTURED" for event in events)
+
+    positions = list(history_positions(result.history))
+    assert len(positions) == len(events)
+    cells = FEATURE_NAMES.index("cells")
+
+    keyframes = [i for i, event in enumerate(events) if event["eventType"] == "KEYFRAME"]
+    assert owner_balance(events[keyframes[-1]]["data"]["cells"]) != 0
+    for i in keyframes[1:]:
+        balance = owner_balance(events[i]["data"]["cells"])
+        # the captures recorded since the last keyframe already account for the whole change
+        assert positions[i - 1][cells] == balance
+        assert positions[i][cells] == balance
+    assert positions[-1][cells] == owner_balance(events[-1]["data"]["cells"])
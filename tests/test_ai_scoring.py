@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pygame")
+
+import main
+from ai_scoring import assert_matches_loop, check_levels, _build_benchmark_board
+
+
+def test_vectorized_scorer_matches_loop_on_shipped_levels(scratch, shipped_levels):
+    assert check_levels(shipped_levels, max_time=30) == len(shipped_levels) > 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_vectorized_scorer_matches_loop_on_random_boards(seed):
+    assert_matches_loop(main, _build_benchmark_board(main, 200, seed), f"seed {seed}")
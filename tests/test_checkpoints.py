@@ -0,0 +1,27 @@
+import json
+
+from checkpoints import append_checkpoint, read_last_checkpoint
+
+
+def save_event(tick):
+    return {"type": "GAME_SAVE", "tick": tick, "data": {"cells": []}}
+
+
+def test_append_after_a_torn_record_starts_on_a_new_line(tmp_path):
+    path = str(tmp_path / "level1.ndjson")
+    append_checkpoint(path, "level1_20260101_120000", save_event(1))
+    append_checkpoint(path, "level1_20260101_120000", save_event(2))
+
+    # a crash halfway through writing the second record
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-10])
+    assert read_last_checkpoint(path)["tick"] == 1
+
+    append_checkpoint(path, "level1_20260101_120000", save_event(3))
+
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["save"]["tick"] for line in lines] == [1, 3]
+    assert read_last_checkpoint(path)["tick"] == 3
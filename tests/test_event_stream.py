@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from event_stream import (EventStreamWriter, read_event_stream, iter_event_stream, write_json_history,
+                          read_json_last_save)
+from persistence import PersistenceWorker
+
+
+@pytest.fixture
+def worker():
+    worker = PersistenceWorker()
+    yield worker
+    worker.shutdown()
+
+
+def event(i):
+    return {"timestamp": i * 0.05, "eventType": "INPUT", "data": {"tick": i * 3, "action": "create_bridge"}}
+
+
+def test_worker_writes_the_events_in_order(tmp_path, worker):
+    writer = EventStreamWriter(str(tmp_path / "game.ndjson"), worker=worker)
+    writer.write_metadata({"gameId": "game", "result": None})
+    events = [event(i) for i in range(3000)]
+    for i, e in enumerate(events):
+        writer.append(e)
+        if i % 700 == 0:
+            writer.flush()
+    writer.write_metadata({"gameId": "game", "result": "Draw"})
+    writer.close()
+    writer.wait()
+
+    history = read_event_stream(writer.path)
+    assert history["metadata"] == {"gameId": "game", "result": "Draw"}
+    assert history["events"] == events
+
+
+def test_events_changed_after_append_are_written_as_appended(tmp_path, worker):
+    writer = EventStreamWriter(str(tmp_path / "game.ndjson"), worker=worker)
+    e = event(1)
+    writer.append(e)
+    e["eventType"] = "CHANGED"
+    e["data"]["tick"] = 99
+    writer.close()
+    writer.wait()
+
+    assert read_event_stream(writer.path)["events"] == [event(1)]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    writer = EventStreamWriter(str(tmp_path / "game.ndjson"))
+    for i in range(3):
+        writer.append(event(i))
+    writer.close()
+    with open(writer.path, "a") as f:
+        f.write('{"timestamp": 0.15, "eventType": "INP')
+
+    assert [record for kind, record in iter_event_stream(writer.path)] == [event(i) for i in range(3)]
+
+
+def test_discard_removes_the_stream_after_its_writes(tmp_path, worker):
+    writer = EventStreamWriter(str(tmp_path / "game.ndjson"), worker=worker)
+    writer.append(event(0))
+    writer.discard()
+    writer.wait()
+    assert not (tmp_path / "game.ndjson").exists()
+
+
+def save(i):
+    return {"timestamp": i * 0.05, "eventType": "GAME_SAVE", "data": {"level": "level1", "tick": i * 3}}
+
+
+def test_json_history_is_written_as_json_dump_writes_it(tmp_path):
+    path = tmp_path / "game.json"
+    metadata = {"gameId": "level1_20260101_120000_completed", "result": None}
+    events = [event(i) for i in range(5)]
+    write_json_history(str(path), metadata, iter(events))
+
+    assert path.read_text() == json.dumps({"metadata": metadata, "events": events}, indent=2)
+    assert read_json_last_save(str(path)) is None
+
+
+def test_last_save_is_read_from_the_json_footer(tmp_path):
+    path = tmp_path / "game.json"
+    events = [event(0), save(1), event(2), save(3), event(4)]
+    write_json_history(str(path), {"gameId": "level1_20260101_120000_in_progress"}, iter(events))
+
+    history = json.loads(path.read_text())
+    assert history["events"] == events
+    assert read_json_last_save(str(path)) == save(3)
+
+    # written before the footer existed
+    del history["lastSave"]
+    path.write_text(json.dumps(history, indent=2))
+    assert read_json_last_save(str(path)) is None
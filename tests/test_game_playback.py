@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from game_playback import GamePlayback
+
+
+@pytest.mark.parametrize("load, content", [
+    ("load_json_history", b'{"metadata": {}, "events": ['),
+    ("load_binary_history", b"not a replay"),
+    ("load_xml_history", b"<GameHistory><Events>"),
+])
+def test_load_errors_are_logged_not_printed(tmp_path, capsys, caplog, load, content):
+    path = tmp_path / "damaged"
+    path.write_bytes(content)
+
+    with caplog.at_level(logging.ERROR, logger="WarOfCEllsGame"):
+        assert getattr(GamePlayback(None), load)(str(path)) is False
+
+    # replay_export --raw writes frames to stdout
+    assert capsys.readouterr().out == ""
+    assert str(path) in caplog.text
+
+
+def board(game):
+    return sorted((cell.id, cell.cell_type.name, cell.evolution.value) for cell in game.cells)
+
+
+@pytest.mark.parametrize("resimulated", [True, False])
+def test_seek_back_matches_playing_forward(scratch, shipped_levels, resimulated):
+    pytest.importorskip("pygame")
+    import main
+    from self_play import get_self_play, simulate_level
+
+    history = simulate_level(shipped_levels.get("level5"), seed=5, max_time=40, record=True,
+                             level_name="level5").history
+    if not resimulated:
+        # a recording from before the fixed timestep, played by patching its events onto the board
+        history["metadata"].pop("seed")
+
+    game = get_self_play().game
+    playback = GamePlayback(game, main.Cell, main.CellType, main.CellShape, main.EvolutionLevel)
+    playback.history = history
+    playback.start_playback()
+    assert (playback.simulator is not None) == resimulated
+
+    times = [playback.duration * part / 4 for part in (1, 3, 2)]
+    forward = {}
+    for target in sorted(times):
+        playback.seek(target)
+        forward[target] = board(game)
+    assert forward[times[0]] != forward[times[1]]
+
+    playback.seek(playback.duration)
+    for target in times:
+        playback.seek(target)
+        assert board(game) == forward[target]
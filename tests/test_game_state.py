@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+pytest.importorskip("pygame")
+
+from self_play import get_self_play, simulate_level
+
+
+@pytest.fixture
+def game(scratch, shipped_levels):
+    # halfway through a game, with bridges and balls on the way
+    simulate_level(shipped_levels.get("level5"), seed=11, max_time=20, level_name="level5")
+    game = get_self_play().game
+    assert game.bridges and game.balls
+    return game
+
+
+def test_save_restores_the_same_board(game):
+    saved = game.serialize_state()
+    cell_id_map = game.restore_state(copy.deepcopy(saved))
+
+    assert game.serialize_state() == saved
+    assert sorted(cell_id_map) == [cell["id"] for cell in saved["cells"]]
+    assert all(cell_id_map[cell.id] is cell for cell in game.cells)
+
+
+def test_saves_that_named_cells_by_id_are_renumbered(game):
+    saved = game.serialize_state()
+    expected = copy.deepcopy(saved)
+
+    # id(cell) as written before cells had ids of their own
+    legacy_ids = {cell["id"]: 140000000000 + 48 * cell["id"] for cell in saved["cells"]}
+    for cell in saved["cells"]:
+        cell["id"] = legacy_ids[cell["id"]]
+    for item in saved["bridges"] + saved["balls"] + saved["spawn_times"]:
+        item["source_cell_id"] = legacy_ids[item["source_cell_id"]]
+        item["target_cell_id"] = legacy_ids[item["target_cell_id"]]
+
+    cell_id_map = game.restore_state(saved)
+    assert sorted(cell_id_map) == sorted(legacy_ids.values())
+    assert game.serialize_state() == expected
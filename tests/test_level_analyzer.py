@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pygame")
+
+from level_analyzer import summarize, run_games
+
+
+def test_star_rates_apply_the_time_penalty():
+    results = [
+        ("level1", "Player Wins", 120.0, 1600),  # 3 stars
+        ("level1", "Player Wins", 400.0, 1600),  # 3 less one for taking over 5 minutes
+        ("level1", "Player Wins", 400.0, 1200),  # 2 less one
+        ("level1", "Enemy Wins", 90.0, 0),
+    ]
+    summary = summarize("level1", results)
+    assert summary["win_rate"] == 0.75
+    assert summary["current_stars"] == {"three": 0.25, "two_or_more": 0.5}
+
+
+def test_games_run_on_the_shipped_level(scratch, shipped_levels):
+    options = {"player_agent": "rules", "enemy_agent": "rules", "epsilon": 0.0, "player_ai": "Medium",
+               "enemy_ai": "Medium", "max_time": 30.0}
+    results = run_games(("level1", shipped_levels.get("level1"), [1, 2], options))
+    assert [r[0] for r in results] == ["level1", "level1"]
+    assert all(r[1] in ("Player Wins", "Enemy Wins", "Draw") and 0 < r[2] <= 30.0 for r in results)
+    assert summarize("level1", results)["games"] == 2
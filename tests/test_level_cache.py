@@ -0,0 +1,106 @@
+import copy
+import json
+import math
+import os
+
+import pytest
+
+import level_cache
+from level_cache import LevelCache, LevelSchemaError, compile_level, level_hash, COMPILED_VERSION
+
+LEVEL = {
+    "map": [
+        "#####",
+        "#u e#",
+        "#####",
+    ],
+    "description": {
+        "u": [{"points": 30, "evolution": 1, "kind": "c", "color": "blue"}],
+        "e": [{"points": 20, "evolution": 2, "kind": "t", "color": "red"},
+              {"points": 10, "evolution": 1, "kind": "r", "color": "grey"}],
+    },
+}
+
+
+def test_compiled_level_places_every_described_cell():
+    compiled = compile_level(LEVEL)
+
+    # 5 x 3 tiles, never smaller than those of a 10x10 level
+    assert compiled["world"] == [5 * 160, 3 * 200]
+    assert compiled["cells"] == [[240, 300, "PLAYER", "CIRCLE", 1, 30], [560, 300, "ENEMY", "TRIANGLE", 2, 20]]
+    assert compiled["distances"] == [[0.0, 320.0], [320.0, 0.0]]
+    assert compiled["warnings"] == ["Not all cells of type e were placed. Used 1/2"]
+
+
+def test_large_level_has_no_distance_table():
+    level = {"map": ["u" * 21] * 20, "description": {
+        "u": [{"points": 1, "evolution": 1, "kind": "c", "color": "blue"}] * 420}}
+    compiled = compile_level(level)
+    assert len(compiled["cells"]) == 420
+    assert compiled["distances"] is None
+    assert compiled["world"] == [21 * 80, 20 * 60]
+
+
+def test_shipped_levels_compile_cleanly(shipped_levels):
+    for name in shipped_levels.names():
+        compiled = compile_level(shipped_levels.get(name))
+        assert compiled["cells"], name
+        assert compiled["warnings"] == [], name
+        (x1, y1, *_), (x2, y2, *_) = compiled["cells"][:2]
+        assert compiled["distances"][0][1] == math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda level: level.update(map=[]), "map must be"),
+    (lambda level: level.update(map=["", ""]), "rows must not be empty"),
+    (lambda level: level["description"].update(ab=[]), "single character"),
+    (lambda level: level["description"]["u"][0].pop("kind"), "has no kind"),
+    (lambda level: level["description"]["u"][0].update(evolution=4), "has evolution 4"),
+    (lambda level: level["description"]["u"][0].update(points=True), "has points True"),
+])
+def test_invalid_levels_are_refused(change, message):
+    level = copy.deepcopy(LEVEL)
+    change(level)
+    with pytest.raises(LevelSchemaError, match=message):
+        compile_level(level)
+
+
+def test_cache_compiles_a_level_once(tmp_path, monkeypatch):
+    cache = LevelCache(str(tmp_path))
+    compiled = cache.get(LEVEL)
+    assert os.listdir(tmp_path) == [f"{level_hash(LEVEL)}.json"]
+
+    # from memory, and in a new process from the file
+    monkeypatch.setattr(level_cache, "compile_level", lambda level_data: pytest.fail("compiled again"))
+    assert cache.get(copy.deepcopy(LEVEL)) is compiled
+    assert LevelCache(str(tmp_path)).get(LEVEL) == compiled
+
+
+def test_edited_level_is_compiled_again(tmp_path):
+    cache = LevelCache(str(tmp_path))
+    cache.get(LEVEL)
+
+    edited = copy.deepcopy(LEVEL)
+    edited["description"]["u"][0]["points"] = 50
+    assert level_hash(edited) != level_hash(LEVEL)
+    assert cache.get(edited)["cells"][0][5] == 50
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_cache_file_of_another_layout_is_not_read(tmp_path):
+    path = tmp_path / f"{level_hash(LEVEL)}.json"
+    path.write_text(json.dumps({"version": COMPILED_VERSION - 1, "cells": []}))
+    compiled = LevelCache(str(tmp_path)).get(LEVEL)
+    assert compiled == compile_level(LEVEL)
+    assert json.loads(path.read_text()) == compiled
+
+
+def test_memory_cache_keeps_the_newest_levels(tmp_path):
+    cache = LevelCache(str(tmp_path), size=2)
+    levels = []
+    for points in (1, 2, 3):
+        level = copy.deepcopy(LEVEL)
+        level["description"]["u"][0]["points"] = points
+        cache.get(level)
+        levels.append(level_hash(level))
+    assert list(cache.levels) == levels[1:]
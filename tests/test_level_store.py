@@ -0,0 +1,116 @@
+import os
+import json
+
+import pytest
+
+from level_store import LevelStore, LevelStats, LevelCatalogue, import_game_data, natural_key
+
+LEVEL = {"map": ["#u#"], "description": {"u": [{"points": 10, "evolution": 1, "kind": "c", "color": "blue"}]}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LevelStore(str(tmp_path / "levels"))
+
+
+def test_levels_are_one_file_each(store):
+    assert store.names() == [] and store.get("level1") is None
+
+    store.save("level1", LEVEL)
+    store.save("my_pack_3", LEVEL)
+    assert store.names() == ["level1", "my_pack_3"]
+    assert "my_pack_3" in store and len(store) == 2
+    assert store.get("level1") == LEVEL
+    with open(store.path("level1")) as f:
+        assert json.load(f) == LEVEL
+
+
+def test_natural_order():
+    assert sorted(["level10", "level2", "level1"], key=natural_key) == ["level1", "level2", "level10"]
+
+
+def test_a_win_replaces_the_level_stats(tmp_path):
+    stats = LevelStats(str(tmp_path / "stats.sqlite"))
+    stats.record("level1", 2, "03:10", 1100)
+    stats.record("level1", 3, "02:00", 1600)
+    stats.record("level2", 1, "04:00", 300)
+
+    assert stats.get("level1") == {"stars": 3, "time": "02:00", "score": 1600}
+    assert stats.get("level3") is None
+    assert set(LevelStats(str(tmp_path / "stats.sqlite")).all()) == {"level1", "level2"}
+
+
+def test_game_data_is_imported_once(tmp_path, store):
+    store.save("level1", LEVEL)
+    stats = LevelStats(str(tmp_path / "stats.sqlite"))
+    stats.record("level1", 3, "01:00", 2000)
+
+    legacy = tmp_path / "game_data.json"
+    legacy.write_text(json.dumps({
+        "levels": {"level1": {"map": ["#"], "description": {}}, "level2": LEVEL},
+        "summary": {"levels": {"level1": {"stars": 1, "time": "09:00", "score": 10},
+                               "level2": {"stars": 2, "time": "05:00", "score": 900}}},
+        "settings": {"volume": 3},
+    }))
+    settings = tmp_path / "settings.json"
+
+    assert import_game_data(store, stats, str(legacy), str(settings))
+    # the level file and the stats already there are newer than game_data.json
+    assert store.get("level1") == LEVEL
+    assert store.get("level2") == LEVEL
+    assert stats.get("level1")["stars"] == 3
+    assert stats.get("level2") == {"stars": 2, "time": "05:00", "score": 900}
+    assert json.loads(settings.read_text()) == {"volume": 3}
+
+    assert not import_game_data(store, stats, str(legacy), str(settings))
+
+
+def catalogue_file(store, packs):
+    os.makedirs(store.directory, exist_ok=True)
+    with open(os.path.join(store.directory, "catalogue.json"), "w") as f:
+        json.dump({"packs": [{"name": name, "levels": levels} for name, levels in packs]}, f)
+
+
+def test_catalogue_order_follows_the_packs(store):
+    for name in ("level1", "level2", "level10", "level3", "my_pack_3"):
+        store.save(name, LEVEL)
+    catalogue_file(store, [("Classic", ["level2", "level1", "deleted"]), ("Extra", ["my_pack_3", "level1"])])
+    catalogue = LevelCatalogue(store)
+
+    # unlisted levels go to the last pack in natural order, listed ones without a file are left out
+    assert catalogue.packs() == [("Classic", ["level2", "level1"]), ("Extra", ["my_pack_3", "level3", "level10"])]
+    assert catalogue.order() == ["level2", "level1", "my_pack_3", "level3", "level10"]
+    assert catalogue.next_level("level1") == "my_pack_3"
+    assert catalogue.next_level("level10") is None
+    assert catalogue.previous_level("level2") is None
+    assert catalogue.position("deleted") is None
+
+    # a level added later shows up without reloading the catalogue
+    store.save("level4", LEVEL)
+    assert catalogue.order()[-2:] == ["level4", "level10"]
+
+
+def test_levels_unlock_one_win_at_a_time(store):
+    for name in ("level1", "level2", "level3"):
+        store.save(name, LEVEL)
+    catalogue = LevelCatalogue(store)
+
+    stats = {}
+    assert [catalogue.unlocked(name, stats) for name in catalogue.order()] == [True, False, False]
+    stats["level1"] = {"stars": 0, "time": "10:00", "score": 0}
+    assert catalogue.unlocked("level2", stats) is False
+    stats["level1"] = {"stars": 1, "time": "04:00", "score": 200}
+    assert [catalogue.unlocked(name, stats) for name in catalogue.order()] == [True, True, False]
+    assert catalogue.unlocked("missing", stats) is False
+
+
+def test_moved_level_is_written_to_the_catalogue(store):
+    for name in ("level1", "level2", "level3", "level4"):
+        store.save(name, LEVEL)
+    catalogue_file(store, [("Classic", ["level1", "level2"]), ("Extra", ["level3", "level4"])])
+    catalogue = LevelCatalogue(store)
+
+    assert catalogue.move("level4", 1)
+    assert catalogue.packs() == [("Classic", ["level1", "level4", "level2"]), ("Extra", ["level3"])]
+    assert LevelCatalogue(store).order() == ["level1", "level4", "level2", "level3"]
+    assert not catalogue.move("missing", 0)
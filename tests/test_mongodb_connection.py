@@ -0,0 +1,233 @@
+import types
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import mongodb_config
+from mongodb_config import (MongoConnection, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN, DATABASE_NAME, GAMES_COLLECTION,
+                            CHUNKS_COLLECTION, CHUNK_SIZE, ConnectionFailure, get_connection, set_client_factory)
+
+
+class FlakyServer:
+    # a mongomock server that can be taken down; every call made while it is up is logged
+    def __init__(self):
+        self.client = mongomock.MongoClient()
+        self.down = False
+        self.calls = []
+
+    def connect(self, connection_string):
+        return FlakyClient(self)
+
+
+class FlakyClient:
+    def __init__(self, server):
+        self.server = server
+
+    def __getitem__(self, name):
+        return FlakyDatabase(self.server, self.server.client[name])
+
+    def server_info(self):
+        if self.server.down:
+            raise ConnectionFailure("server down")
+        return {"version": "mongomock"}
+
+    def close(self):
+        pass
+
+
+class FlakyDatabase:
+    def __init__(self, server, database):
+        self.server = server
+        self.database = database
+
+    def __getitem__(self, name):
+        return FlakyCollection(self.server, self.database[name])
+
+
+class FlakyCollection:
+    def __init__(self, server, collection):
+        self.server = server
+        self.collection = collection
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        def call(*args, **kwargs):
+            if self.server.down:
+                raise ConnectionFailure("server down")
+            self.server.calls.append((self.collection.name, name))
+            return method(*args, **kwargs)
+        return call
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mongodb_config, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def server():
+    server = FlakyServer()
+    set_client_factory(server.connect)
+    yield server
+    set_client_factory(None)
+
+
+def make_events(count, save_at=None):
+    events = [{"timestamp": i * 0.05, "eventType": "INPUT", "data": {"tick": i * 3, "action": "create_bridge"}}
+              for i in range(count)]
+    if save_at is not None:
+        events[save_at] = {"timestamp": save_at * 0.05, "eventType": "GAME_SAVE", "data": {"level": "level1"}}
+    return events
+
+
+def metadata(game_id):
+    return {"gameId": game_id, "level": game_id.split("_")[0]}
+
+
+def test_set_client_factory_is_used_by_new_connections(server):
+    connection = get_connection()
+    assert connection.run(lambda database: database[GAMES_COLLECTION].count_documents({})) == 0
+    assert (GAMES_COLLECTION, "count_documents") in server.calls
+
+
+def test_breaker_opens_and_backs_off(server, clock):
+    connection = MongoConnection(client_factory=server.connect)
+    server.down = True
+
+    assert connection.run(lambda database: True, default="down") == "down"
+    assert connection.failures == 1
+    assert connection.is_open
+    assert connection.open_until == clock.now + BREAKER_COOLDOWN
+
+    # open: the server is not asked again, even once it is back
+    server.down = False
+    clock.now += BREAKER_COOLDOWN / 2
+    assert connection.run(lambda database: database[GAMES_COLLECTION].find_one({}), default="open") == "open"
+    assert server.calls == []
+
+    # half-open: one call goes through, failing again doubles the cooldown
+    server.down = True
+    clock.now += BREAKER_COOLDOWN
+    assert not connection.is_open
+    assert connection.run(lambda database: True) is None
+    assert connection.failures == 2
+    assert connection.open_until == clock.now + 2 * BREAKER_COOLDOWN
+
+    # up to the maximum
+    for _ in range(20):
+        clock.now = connection.open_until
+        connection.run(lambda database: True)
+    assert connection.open_until == clock.now + BREAKER_MAX_COOLDOWN
+
+    # a call that succeeds closes the breaker
+    server.down = False
+    clock.now = connection.open_until
+    assert connection.run(lambda database: "up") == "up"
+    assert connection.failures == 0
+    assert not connection.is_open
+
+
+def test_pending_histories_are_flushed_after_recovery(server, clock):
+    connection = MongoConnection(client_factory=server.connect)
+    server.down = True
+
+    assert connection.insert_history(metadata("level1_20240101_000000_in_progress"), make_events(10)) is None
+    # the breaker is open now, the second one is queued without asking the server
+    assert connection.insert_history(metadata("level2_20240101_000000_in_progress"), make_events(10)) is None
+    assert len(connection.pending) == 2
+    assert connection.failures == 1
+
+    server.down = False
+    clock.now += BREAKER_COOLDOWN
+    inserted_id = connection.insert_history(metadata("level3_20240101_000000_completed"), make_events(10))
+    assert inserted_id is not None
+    assert connection.pending == []
+
+    games = server.client[DATABASE_NAME][GAMES_COLLECTION]
+    assert sorted(game["level"] for game in games.find()) == ["level1", "level2", "level3"]
+    # all three in one batch
+    assert server.calls.count((GAMES_COLLECTION, "insert_many")) == 1
+
+
+def test_queued_save_of_the_same_game_replaces_the_older_one(server, clock):
+    connection = MongoConnection(client_factory=server.connect)
+    server.down = True
+    game_id = "level1_20240101_000000_in_progress"
+    connection.insert_history(metadata(game_id), make_events(10))
+    connection.insert_history(metadata(game_id), make_events(20))
+    assert len(connection.pending) == 1
+    assert connection.pending[0]["game"]["eventCount"] == 20
+
+
+def test_resave_deletes_then_inserts(server):
+    connection = MongoConnection(client_factory=server.connect)
+    game_id = "level1_20240101_000000_in_progress"
+
+    connection.insert_history(metadata(game_id), make_events(CHUNK_SIZE * 3))
+    server.calls.clear()
+    connection.insert_history(metadata(game_id), make_events(CHUNK_SIZE + 1, save_at=CHUNK_SIZE))
+
+    writes = [call for call in server.calls if call[1] in ("delete_many", "insert_many")]
+    assert writes == [(GAMES_COLLECTION, "delete_many"), (CHUNKS_COLLECTION, "delete_many"),
+                      (CHUNKS_COLLECTION, "insert_many"), (GAMES_COLLECTION, "insert_many")]
+
+    database = server.client[DATABASE_NAME]
+    assert database[GAMES_COLLECTION].count_documents({"gameId": game_id}) == 1
+    assert database[CHUNKS_COLLECTION].count_documents({"gameId": game_id}) == 2
+    game = database[GAMES_COLLECTION].find_one({"gameId": game_id})
+    assert game["eventCount"] == CHUNK_SIZE + 1
+    assert game["lastSave"]["eventType"] == "GAME_SAVE"
+
+
+def test_refused_documents_drop_only_their_game(server, clock):
+    connection = MongoConnection(client_factory=server.connect)
+    database = server.client[DATABASE_NAME]
+    database[CHUNKS_COLLECTION].insert_one({"_id": "taken", "gameId": "another_game", "seq": 0})
+
+    server.down = True
+    refused = "level1_20240101_000000_in_progress"
+    connection.insert_history(metadata(refused), make_events(CHUNK_SIZE * 2))
+    connection.pending[0]["chunks"][1]["_id"] = "taken"
+    server.down = False
+    clock.now += BREAKER_COOLDOWN
+
+    stored = "level2_20240101_000000_in_progress"
+    assert connection.insert_history(metadata(stored), make_events(10)) is not None
+    assert connection.pending == []
+    assert connection.failures == 0
+
+    assert [game["gameId"] for game in database[GAMES_COLLECTION].find()] == [stored]
+    # the refused game's first chunk went in and is removed again
+    assert database[CHUNKS_COLLECTION].count_documents({"gameId": refused}) == 0
+    assert database[CHUNKS_COLLECTION].count_documents({"gameId": stored}) == 1
+    assert database[CHUNKS_COLLECTION].count_documents({"_id": "taken"}) == 1
+
+
+def test_delete_history_removes_stored_and_queued_copies(server, clock):
+    connection = MongoConnection(client_factory=server.connect)
+    database = server.client[DATABASE_NAME]
+    game_id = "level1_20240101_000000_in_progress"
+    connection.insert_history(metadata(game_id), make_events(CHUNK_SIZE + 1))
+
+    server.down = True
+    connection.insert_history(metadata(game_id), make_events(10))
+    assert len(connection.pending) == 1
+    server.down = False
+    clock.now += BREAKER_COOLDOWN
+
+    connection.delete_history(game_id)
+    assert connection.pending == []
+    assert database[GAMES_COLLECTION].count_documents({"gameId": game_id}) == 0
+    assert database[CHUNKS_COLLECTION].count_documents({"gameId": game_id}) == 0
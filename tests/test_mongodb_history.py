@@ -0,0 +1,108 @@
+import itertools
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import mongodb_config
+from mongodb_config import (GAMES_COLLECTION, CHUNKS_COLLECTION, CHUNK_SIZE, GAME_QUERIES, make_history,
+                            ensure_indexes, find_game, find_games, find_last_save, iter_game_events, index_report,
+                            matching_index, get_connection, set_client_factory)
+
+GAME_ID = "level1_20240101_000000_in_progress"
+
+
+@pytest.fixture
+def connection():
+    set_client_factory(lambda _: mongomock.MongoClient())
+    yield get_connection()
+    set_client_factory(None)
+
+
+def make_events(count):
+    events = [{"timestamp": i * 0.05, "eventType": "INPUT", "data": {"tick": i * 3, "action": "create_bridge"}}
+              for i in range(count)]
+    for i in (10, CHUNK_SIZE + 3):
+        events[i] = {"timestamp": i * 0.05, "eventType": "GAME_SAVE", "data": {"level": "level1", "tick": i}}
+    return events
+
+
+def test_history_round_trip(connection):
+    events = make_events(2 * CHUNK_SIZE + 7)
+    assert connection.insert_history({"gameId": GAME_ID, "level": "level1"}, iter(events)) is not None
+
+    database = connection.database()
+    game = find_game(database, GAME_ID)
+    assert game["level"] == "level1"
+    assert game["status"] == "in_progress"
+    assert game["eventCount"] == len(events)
+    assert game["chunkCount"] == 3
+
+    assert list(iter_game_events(database, GAME_ID)) == events
+    assert find_last_save(database, GAME_ID) == events[CHUNK_SIZE + 3]
+    assert [game["gameId"] for game in find_games(database, level="level1", status="in_progress")] == [GAME_ID]
+    assert find_games(database, level="level1", status="completed") == []
+
+
+def test_events_are_read_chunk_by_chunk_in_order(connection):
+    events = make_events(3 * CHUNK_SIZE + 1)
+    history = make_history({"gameId": GAME_ID, "level": "level1"}, events)
+    assert [len(chunk["events"]) for chunk in history["chunks"]] == [CHUNK_SIZE] * 3 + [1]
+    assert [chunk["seq"] for chunk in history["chunks"]] == [0, 1, 2, 3]
+
+    # stored out of order, read back by seq
+    database = connection.database()
+    database[CHUNKS_COLLECTION].insert_many(list(reversed(history["chunks"])))
+    database[GAMES_COLLECTION].insert_one(history["game"])
+
+    first = list(itertools.islice(iter_game_events(database, GAME_ID), 3))
+    assert first == events[:3]
+    assert list(iter_game_events(database, GAME_ID)) == events
+    assert list(iter_game_events(database, "level2_20240101_000000_completed")) == []
+
+
+def test_every_query_has_an_index(connection):
+    database = connection.database()
+    report = index_report(database)
+    assert set(report) == {name for name, _, _, _ in GAME_QUERIES}
+    assert report == {
+        "list games": "games_by_time",
+        "games of a level": "games_by_level",
+        "game by id": "games_by_id",
+        "event chunks": "chunks_by_game",
+    }
+
+
+def test_matching_index_rules():
+    indexes = {"by_level": {"key": [("level", 1), ("status", 1), ("timestamp", -1)]}}
+    assert matching_index(indexes, {"status": "completed", "level": "level1"}, [("timestamp", -1)]) == "by_level"
+    # read backwards
+    assert matching_index(indexes, {"level": "level1", "status": "completed"}, [("timestamp", 1)]) == "by_level"
+    assert matching_index(indexes, {"level": "level1"}, []) == "by_level"
+    assert matching_index(indexes, {"status": "completed"}, [("timestamp", -1)]) is None
+    assert matching_index(indexes, {"level": "level1", "status": "completed"}, [("gameId", 1)]) is None
+
+
+def test_benchmark_runs_on_a_stand_in(connection, capsys):
+    mongodb_config.run_benchmark(num_games=4)
+    output = capsys.readouterr().out
+    assert "4 games" in output
+    assert "no index" not in output
+
+
+def test_query_plans_on_a_real_server():
+    # the same check against a server's query planner, when one is running
+    pytest.importorskip("pymongo")
+    available, client = mongodb_config.check_connection()
+    if not available:
+        pytest.skip(f"no MongoDB server: {client}")
+
+    database = client[mongodb_config.DATABASE_NAME + "_test"]
+    client.drop_database(database.name)
+    try:
+        ensure_indexes(database)
+        for name, stages in mongodb_config.explain_queries(database).items():
+            assert "COLLSCAN" not in stages, name
+            assert "IXSCAN" in stages, name
+    finally:
+        client.drop_database(database.name)
@@ -0,0 +1,62 @@
+import os
+import threading
+
+import pytest
+
+from persistence import atomic_open, PersistenceWorker
+
+
+def test_atomic_open_replaces_the_file_only_when_complete(tmp_path):
+    path = str(tmp_path / "save.json")
+    with atomic_open(path) as f:
+        f.write("first")
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as f:
+            f.write("half of the second")
+            raise RuntimeError("crash")
+
+    with open(path) as f:
+        assert f.read() == "first"
+    assert os.listdir(tmp_path) == ["save.json"]
+
+
+def test_threads_writing_the_same_path_do_not_share_a_temporary_file(tmp_path):
+    path = str(tmp_path / "catalogue.json")
+    both_open = threading.Barrier(2)
+    errors = []
+
+    def write(text):
+        try:
+            with atomic_open(path) as f:
+                f.write(text)
+                # both threads are inside atomic_open before either replaces the file
+                both_open.wait(timeout=5)
+                f.write(text)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(text,)) for text in ("a" * 1000, "b" * 1000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with open(path) as f:
+        assert f.read() in ("a" * 2000, "b" * 2000)
+    assert os.listdir(tmp_path) == ["catalogue.json"]
+
+
+def test_worker_runs_jobs_and_tasks_in_order(tmp_path):
+    worker = PersistenceWorker()
+    order = []
+    worker.call(lambda: order.append("task"))
+    worker.submit("job", [("file", lambda: order.append("job") or "saved"), ("broken", lambda: 1 / 0)])
+    worker.call(lambda: order.append("last"))
+    assert worker.flush(timeout=5)
+    assert order == ["task", "job", "last"]
+
+    results = worker.poll()
+    assert len(results) == 1 and results[0].saved == {"file": "saved"} and "broken" in results[0].failed
+    worker.shutdown()
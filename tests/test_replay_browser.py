@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from replay_browser import ReplayBrowser, THUMBNAIL_SIZE, THUMBNAIL_BG_COLOR, THUMBNAIL_COLORS
+from save_index import SaveIndex
+
+
+@pytest.fixture
+def browser(tmp_path):
+    browser = ReplayBrowser(SaveIndex(str(tmp_path / "index.sqlite")))
+    yield browser
+    browser.close()
+
+
+def test_thumbnail_of_a_large_world_shows_every_cell(browser):
+    # the far corner of the largest levels, 16000 x 12000
+    board = [[100, 100, "PLAYER"], [15960, 11960, "ENEMY"]]
+    row = {"format": "json", "path": "large.json", "board": board}
+
+    surface = browser.thumbnail(row)
+    assert surface.get_size() == THUMBNAIL_SIZE
+    width, height = THUMBNAIL_SIZE
+    colors = {tuple(surface.get_at((x, y)))[:3] for x in range(width) for y in range(height)}
+    assert colors == {THUMBNAIL_BG_COLOR, THUMBNAIL_COLORS["PLAYER"], THUMBNAIL_COLORS["ENEMY"]}
+
+
+def fill(index, count):
+    # every save in a different minute, newest last
+    for i in range(count):
+        index.add(f"level1_20260101_12{i:02d}00_completed", "level1", "json", f"{i}.json", board=[])
+
+
+def test_rows_span_pages_and_the_next_page_is_prefetched(browser):
+    fill(browser.index, 20)
+    browser.page_size = 4
+
+    rows = browser.rows("json", 6, 5)
+    assert [row["path"] for row in rows] == [f"{i}.json" for i in range(13, 8, -1)]
+
+    # pages 1 and 2 shown, page 3 loading in the background
+    browser.executor.submit(lambda: None).result()
+    assert set(browser.pages) == {("json", 1), ("json", 2), ("json", 3)}
+    assert browser.rows("json", 12, 4) == browser.pages[("json", 3)]
+
+
+def test_new_save_drops_the_cached_listing(browser):
+    fill(browser.index, 3)
+    assert browser.count("json") == 3
+    browser.rows("json", 0, 3)
+
+    browser.index.add("level1_20260102_120000_completed", "level1", "json", "new.json", board=[])
+    browser.refresh()
+    assert browser.count("json") == 4
+    assert browser.rows("json", 0, 1)[0]["path"] == "new.json"
+
+
+def test_summary_of_an_unread_save_is_loaded_once(browser, tmp_path):
+    path = str(tmp_path / "old.json")
+    with open(path, "w") as f:
+        json.dump({"metadata": {"result": "Player Wins"}, "events": [
+            {"timestamp": 1.0, "eventType": "GAME_END",
+             "data": {"score": 900, "time": 61.5, "cells": [{"x": 100, "y": 50, "type": "PLAYER"}]}}]}, f)
+    browser.index.add("level1_20260101_120000_completed", "level1", "json", path)
+
+    row = browser.rows("json", 0, 1)[0]
+    assert browser.thumbnail(row) is None
+    browser.executor.submit(lambda: None).result()
+
+    assert row["board"] == [[100, 50, "PLAYER"]]
+    assert browser.thumbnail(row) is not None
+    stored = browser.index.find()[0]
+    assert (json.loads(stored["board"]), stored["result"], stored["points"], stored["time_taken"]) == \
+           ([[100, 50, "PLAYER"]], "Player Wins", 900, 61.5)
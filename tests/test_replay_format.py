@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from replay_format import (encode_history, decode_history, save_binary_history, load_binary_history,
+                           read_binary_last_save, _trailer_start, COMPRESSION_NAMES, HEADER, BLOCK, COUNT,
+                           REPLAY_MAGIC, ReplayFormatError)
+
+
+def board(tick, owner):
+    return {
+        "time_taken": tick / 60,
+        "points": 120,
+        "cells": [{"id": i, "x": 100 * i, "y": 50, "type": owner if i % 2 else "EMPTY", "shape": "CIRCLE",
+                   "evolution": 1, "points": 10 + i, "points_to_capture": 0, "enemy_points_to_capture": 0,
+                   "last_growth_time": 3000.0 * i} for i in range(4)],
+        "bridges": [{"source_cell_id": 1, "target_cell_id": 2, "direction": "ONE_WAY", "has_reverse": False,
+                     "creation_cost": 3}],
+        "balls": [],
+        "turn_based_mode": False,
+        "tick": tick,
+    }
+
+
+def recorded_history():
+    events = [
+        {"timestamp": 0.0, "eventType": "GAME_START", "data": {"cells": [
+            {"id": 0, "x": 0, "y": 0, "type": "PLAYER", "shape": "TRIANGLE", "evolution": 1, "points": 20}]}},
+        {"timestamp": 0.0, "eventType": "KEYFRAME", "data": board(0, "PLAYER")},
+        {"timestamp": 0.5, "eventType": "INPUT", "data": {"tick": 31, "action": "create_bridge", "sourceId": 1,
+                                                          "targetId": 2}},
+        {"timestamp": 0.5, "eventType": "BRIDGE_CREATED", "data": {"sourceId": 1, "targetId": 2,
+                                                                   "direction": "ONE_WAY", "cost": 3}},
+        {"timestamp": 1.0, "eventType": "INPUT", "data": {"tick": 60, "action": "remove_bridge", "sourceId": 1,
+                                                          "targetId": 2, "refundId": 1}},
+        {"timestamp": 1.0, "eventType": "INPUT", "data": {"tick": 60, "action": "toggle_turn_based"}},
+        {"timestamp": 1.0, "eventType": "CHECKSUM", "data": {"tick": 60, "checksum": 3392766457}},
+        {"timestamp": 1.5, "eventType": "CELL_CAPTURED", "data": {"cellId": 2, "newType": "ENEMY", "points": 10,
+                                                                  "isPlayer": False}},
+        {"timestamp": 2.0, "eventType": "GAME_SAVE", "data": dict(board(120, "ENEMY"), level="my_pack_3")},
+        {"timestamp": 2.5, "eventType": "CUSTOM", "data": {"anything": [1, 2.5, None]}},
+        {"timestamp": 3.0, "eventType": "GAME_END", "data": {"result": "Enemy Wins", "score": 120, "time": 3.0,
+                                                             "cells": []}},
+    ]
+    return {"metadata": {"gameId": "my_pack_3_20240101_000000_completed", "seed": 7, "tickRate": 60},
+            "events": events}
+
+
+@pytest.mark.parametrize("compression", COMPRESSION_NAMES.values())
+def test_round_trip_is_exact(compression):
+    history = recorded_history()
+    decoded = decode_history(encode_history(history, compression))
+    assert decoded == history
+    # same types too, 1.0 does not come back as 1
+    assert json.dumps(decoded) == json.dumps(history)
+
+
+def test_frequent_events_are_packed_records():
+    data = encode_history(recorded_history(), COMPRESSION_NAMES["none"])
+    # the events, without the last save kept as JSON in the trailer
+    body = data[:_trailer_start(data)]
+    assert body.count(b'"eventType"') == 1  # only the unknown CUSTOM event is stored as JSON
+    assert b'"create_bridge"' not in body and b'"checksum"' not in body
+    assert b'"last_growth_time"' not in body and b'"cells":null' in body
+
+
+def test_unpackable_values_fall_back_to_json():
+    history = recorded_history()
+    history["events"][2]["data"]["sourceId"] = 2 ** 40
+    history["events"][1]["data"]["cells"][0]["points"] = 1.5  # mixed int and float column
+    history["events"][6]["data"]["checksum"] = -1
+    assert decode_history(encode_history(history)) == history
+
+
+def test_last_save_is_read_from_the_trailer(tmp_path):
+    path = str(tmp_path / "game.replay")
+    history = recorded_history()
+    save_binary_history(path, history)
+    assert read_binary_last_save(path) == history["events"][8]
+    assert load_binary_history(path) == history
+
+
+def as_version_2(data):
+    # version 2 files end their body after the GAME_START section: the five empty INPUT and
+    # CHECKSUM sections and the board section holding "[]" are cut off
+    end = _trailer_start(data)
+    body = data[HEADER.size + BLOCK.size:end]
+    tail = bytes(5 * COUNT.size) + COUNT.pack(COUNT.size + 2) + COUNT.pack(2) + b"[]"
+    assert body.endswith(tail)
+    body = body[:-len(tail)]
+    return HEADER.pack(REPLAY_MAGIC, 2, COMPRESSION_NAMES["none"], 0) + BLOCK.pack(len(body), len(body)) + \
+        body + data[end:]
+
+
+def test_version_2_files_still_load():
+    history = {"metadata": {"gameId": "old"}, "events": [
+        {"timestamp": 0.5, "eventType": "BRIDGE_REMOVED", "data": {"sourceId": 1, "targetId": 2}},
+        {"timestamp": 1.0, "eventType": "TURN_SWITCH", "data": {"isPlayerTurn": False}},
+    ]}
+    data = as_version_2(encode_history(history, COMPRESSION_NAMES["none"]))
+    assert HEADER.unpack_from(data)[1] == 2
+    assert decode_history(data) == history
+
+
+def test_not_a_replay():
+    with pytest.raises(ReplayFormatError):
+        decode_history(b"JSON" + bytes(20))
@@ -0,0 +1,54 @@
+import copy
+
+import pytest
+
+pytest.importorskip("pygame")
+
+from replay_simulation import ReplaySimulator, verify_replay
+from self_play import get_self_play, simulate_level
+
+
+@pytest.fixture
+def history(scratch, shipped_levels):
+    return simulate_level(shipped_levels.get("level5"), seed=7, max_time=40, record=True,
+                          level_name="level5").history
+
+
+def test_recording_replays_to_every_checksum(history):
+    assert ReplaySimulator.supports(history)
+
+    simulator = verify_replay(get_self_play().game, history)
+    assert simulator.finished
+    assert simulator.divergence is None
+    assert simulator.checked == sum(event["eventType"] == "CHECKSUM" for event in history["events"])
+
+
+def test_changed_checksum_is_reported_at_its_tick(history):
+    tampered = copy.deepcopy(history)
+    checksums = [event for event in tampered["events"] if event["eventType"] == "CHECKSUM"]
+    checksum = checksums[len(checksums) // 2]
+    checksum["data"]["checksum"] ^= 1
+
+    simulator = verify_replay(get_self_play().game, tampered)
+    assert simulator.divergence == checksum["data"]["tick"]
+
+
+def test_dropped_input_is_caught_by_a_later_checksum(history):
+    tampered = copy.deepcopy(history)
+    inputs = [i for i, event in enumerate(tampered["events"]) if event["eventType"] == "INPUT"]
+    dropped = tampered["events"].pop(inputs[0])
+
+    simulator = verify_replay(get_self_play().game, tampered)
+    assert simulator.divergence is not None
+    assert simulator.divergence > dropped["data"]["tick"]
+
+
+def test_seek_back_matches_playing_straight_through(history):
+    game = get_self_play().game
+    simulator = ReplaySimulator(game, history)
+    simulator.seek(simulator.end_tick)
+    expected = game.state_checksum()
+
+    simulator.seek(simulator.end_tick // 3)
+    simulator.seek(simulator.end_tick)
+    assert game.state_checksum() == expected
@@ -0,0 +1,122 @@
+import os
+import json
+
+import pytest
+
+import level_store
+import save_index
+from save_index import SaveIndex, parse_game_level
+
+
+@pytest.fixture
+def game(scratch, shipped_levels, monkeypatch):
+    pytest.importorskip("pygame")
+    import main
+
+    monkeypatch.setattr(level_store, "_default_store", shipped_levels)
+    monkeypatch.setattr(save_index, "_default_index", SaveIndex(str(scratch / "index.sqlite")))
+    game = main.Game(show_menu=False)
+    # the dialogs wait for the player
+    monkeypatch.setattr(game, "show_save_dialog", lambda: True)
+    monkeypatch.setattr(game, "show_save_confirmation", lambda: None)
+    monkeypatch.setattr(game, "show_continue_dialog", lambda saved_game: True)
+    yield game
+    game.persistence.shutdown()
+
+
+def test_game_over_retires_the_saves_of_a_continued_game(game, scratch):
+    from main import find_recovery_save
+
+    game.start_game()
+    for _ in range(120):
+        game.step()
+    game.save_game_progress()
+    game.persistence.flush()
+
+    saved_game, _ = find_recovery_save("level1")
+    in_progress_id = saved_game["game_id"]
+    assert {entry["format"] for entry in save_index.get_save_index().find(game_id=in_progress_id)} == \
+           {"checkpoint", "json", "xml", "binary"}
+
+    # continue the saved game and finish it
+    game.start_game()
+    assert game.game_recorder.game_id == in_progress_id
+    # M on the game over screen returns to the menu
+    import pygame
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_m))
+    game.game_over("Blue Wins!")
+    game.persistence.flush()
+
+    assert find_recovery_save("level1") is None
+    index = save_index.get_save_index()
+    assert index.find(status="in_progress") == []
+    completed = index.find(status="completed")
+    assert {entry["format"] for entry in completed} == {"json", "xml", "binary"}
+    for save_format, (directory, _) in save_index.SAVE_DIRS.items():
+        assert [file for file in os.listdir(directory) if "_in_progress" in file] == []
+
+
+@pytest.mark.parametrize("game_id, level", [
+    ("level1_20260101_120000_completed", "level1"),
+    ("my_pack_3_20260101_120000_in_progress", "my_pack_3"),
+    ("game_20260101_120000_completed", None),
+])
+def test_level_is_split_from_the_right_of_the_game_id(game_id, level):
+    assert parse_game_level(game_id) == level
+
+
+def test_scan_keeps_underscores_in_level_names(scratch):
+    os.makedirs("saved_games/json")
+    with open("saved_games/json/my_pack_3_20260101_120000_completed.json", "w") as f:
+        f.write("{}")
+
+    index = SaveIndex("saved_games/index.sqlite")
+    assert [entry["level"] for entry in index.find()] == ["my_pack_3"]
+
+
+@pytest.fixture
+def index(scratch):
+    return SaveIndex("saved_games/index.sqlite")
+
+
+def test_newest_first_and_the_fastest_format_first(index):
+    index.add("level1_20260101_120000_in_progress", "level1", "xml", "a.xml")
+    index.add("level1_20260101_120000_in_progress", "level1", "binary", "a.replay")
+    index.add("level1_20260102_120000_in_progress", "level1", "json", "b.json")
+    index.add("level1_20260103_120000_completed", "level1", "json", "c.json")
+    index.add("level2_20260104_120000_in_progress", "level2", "json", "d.json")
+
+    rows = index.find(level="level1", status="in_progress")
+    assert [row["path"] for row in rows] == ["b.json", "a.replay", "a.xml"]
+    assert index.count(level="level1") == 4
+    assert [row["path"] for row in index.find(save_format="json", limit=1, offset=1)] == ["c.json"]
+
+
+def test_in_progress_forgets_saves_whose_file_is_gone(index):
+    open("kept.json", "w").close()
+    index.add("level1_20260101_120000_in_progress", "level1", "json", "kept.json")
+    index.add("level1_20260102_120000_in_progress", "level1", "json", "deleted.json")
+    version = index.version
+
+    assert [entry["path"] for entry in index.in_progress("level1")] == ["kept.json"]
+    assert index.count() == 1
+    assert index.version > version
+
+
+def test_new_index_imports_the_files_saved_before_it(scratch):
+    os.makedirs("saved_games/json")
+    history = {"metadata": {"level": "level1"}, "events": [
+        {"timestamp": 3.0, "eventType": "GAME_SAVE", "data": {"points": 40, "time_taken": 12.5}}]}
+    with open("saved_games/json/level1_20260101_120000_in_progress.json", "w") as f:
+        json.dump(history, f)
+    with open("saved_games/json/level1_20260102_120000_completed.json", "w") as f:
+        f.write("not read")
+
+    index = SaveIndex("saved_games/index.sqlite")
+    entry = index.latest_in_progress("level1")
+    assert (entry["timestamp"], entry["points"], entry["time_taken"]) == ("20260101_120000", 40, 12.5)
+    assert index.count(status="completed") == 1
+
+    # opened again, the files are not scanned twice
+    os.remove("saved_games/json/level1_20260102_120000_completed.json")
+    assert SaveIndex("saved_games/index.sqlite").count() == 2
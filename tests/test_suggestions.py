@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("pygame")
+
+from self_play import get_self_play, simulate_level
+
+
+@pytest.fixture
+def game(scratch, shipped_levels):
+    simulate_level(shipped_levels.get("level5"), seed=11, max_time=20, level_name="level5")
+    game = get_self_play().game
+    game.refresh_suggestions()
+    return game
+
+
+def test_board_changes_mark_suggestions_stale(game):
+    assert not game.suggestions_stale()
+
+    game.remove_bridge(game.bridges[0])
+    assert game.suggestions_stale()
+    game.refresh_suggestions()
+    assert not game.suggestions_stale()
+
+
+def test_points_only_matter_once_they_cross_a_bridge_cost(game):
+    hasher = game.ai_cache.hasher
+    # a cell no key names as one of the two weakest enemies
+    cell = next(cell for cell in game.cells if cell.cell_type.name != "ENEMY")
+    # the distinct bridge costs from this cell, lowest first
+    first, second = hasher.cost_thresholds[hasher.cell_index[cell]][:2]
+
+    cell.points = first
+    game.refresh_suggestions()
+    cell.points = second - 0.5
+    assert not game.suggestions_stale()
+    cell.points = second
+    assert game.suggestions_stale()
+
+
+def test_unchanged_board_is_answered_from_the_cache(game):
+    hits = game.ai_cache.hits
+    suggestions = game.suggestions
+    game.suggestions_dirty = True
+    game.refresh_suggestions()
+    assert game.ai_cache.hits == hits + 1
+    assert game.suggestions == suggestions
@@ -0,0 +1,84 @@
+import pytest
+
+from xml_history import (write_xml_history, read_xml_history, read_xml_last_save, _write_xml_history_minidom,
+                         _benchmark_events)
+
+METADATA = {
+    "gameId": "my_pack_3_20260101_120000_in_progress",
+    "level": "my_pack_3",
+    "gameType": "Single player",
+    "turnBased": False,
+    "aiEnabled": True,
+    "aiDifficulty": 'Hard "<&>"',
+    "result": None,
+    "duration": 12.5,
+    "seed": 1234,
+    "tickRate": 60,
+}
+
+
+def save_event(timestamp, points):
+    return {"timestamp": timestamp, "eventType": "GAME_SAVE", "data": {
+        "level": "my_pack_3",
+        "time_taken": 12.5,
+        "points": points,
+        "cells": [{"id": 0, "x": 100, "y": 200.5, "type": "PLAYER", "shape": "CIRCLE", "evolution": 2,
+                   "points": 30, "points_to_capture": 10, "enemy_points_to_capture": 12,
+                   "last_growth_time": 750}],
+        "bridges": [],
+        "balls": [{"source_cell_id": 0, "target_cell_id": 0, "source_x": 100, "source_y": 200.5,
+                   "target_x": 100, "target_y": 200.5, "x": 100.25, "y": 200.5, "is_player": True,
+                   "is_support_ball": False, "attack_value": 1}],
+        "turn_based_mode": False,
+        "current_player_turn": True,
+        "control_enemy": False,
+        "tick": 750,
+        "spawn_times": [],
+        "turn_time_remaining": 10.0,
+        "move_made_this_turn": False,
+        "turn_timer_active": False,
+    }}
+
+
+EVENTS = [
+    {"timestamp": 0.0, "eventType": "GAME_START", "data": {"cells": []}},
+    {"timestamp": 1.5, "eventType": "BRIDGE_CREATED",
+     "data": {"sourceId": 0, "targetId": 1, "direction": "ONE_WAY", "cost": 4}},
+    {"timestamp": 2.0, "eventType": "CHECKSUM", "data": {"tick": 120, "checksum": 2 ** 63 + 5}},
+    save_event(3.0, 40),
+    {"timestamp": 4.0, "eventType": "CELL_CAPTURED",
+     "data": {"cellId": 1, "newType": "PLAYER", "points": 5, "isPlayer": True}},
+    save_event(5.0, 55),
+    {"timestamp": 6.0, "eventType": "GAME_PAUSED", "data": {}},
+]
+
+
+@pytest.mark.parametrize("metadata, events", [
+    (METADATA, lambda: _benchmark_events(200)),
+    ({}, lambda: iter([])),
+])
+def test_streamed_file_matches_the_minidom_one(tmp_path, metadata, events):
+    streamed = tmp_path / "streamed.xml"
+    baseline = tmp_path / "minidom.xml"
+    write_xml_history(str(streamed), metadata, events())
+    _write_xml_history_minidom(str(baseline), metadata, events())
+
+    assert streamed.read_text() == baseline.read_text()
+
+
+def test_history_reads_back_as_written(tmp_path):
+    path = str(tmp_path / "history.xml")
+    write_xml_history(path, METADATA, iter(EVENTS))
+
+    assert read_xml_history(path) == {"metadata": METADATA, "events": EVENTS}
+
+
+def test_last_save_is_read_from_the_footer(tmp_path):
+    path = str(tmp_path / "history.xml")
+    write_xml_history(path, METADATA, iter(EVENTS))
+    assert read_xml_last_save(path) == EVENTS[5]
+
+    # written before the footer existed
+    _write_xml_history_minidom(path, METADATA, EVENTS)
+    assert read_xml_last_save(path) is None
+    assert read_xml_history(path)["events"] == EVENTS
@@ -0,0 +1,387 @@
+import os
+import re
+import time
+import logging
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from persistence import atomic_open
+
+logger = logging.getLogger('WarOfCEllsGame')
+
+# minidom's toprettyxml escapes quotes in text too, keep the files byte-identical
+ENTITIES = {'"': "&quot;"}
+
+
+def _escape(value):
+    return escape(str(value), ENTITIES)
+
+
+def _write_element(f, indent, tag, value):
+    text = _escape(value)
+    if text:
+        f.write(f"{indent}<{tag}>{text}</{tag}>\n")
+    else:
+        f.write(f"{indent}<{tag}/>\n")
+
+
+def _write_event(f, event):
+    data = event["data"]
+    start = f'    <Event timestamp="{_escape(event["timestamp"])}" type="{_escape(event["eventType"])}"'
+    if not data:
+        f.write(start + "/>\n")
+        return
+
+    f.write(start + ">\n")
+    for key, value in data.items():
+        if not isinstance(value, list):
+            _write_element(f, "      ", key, value)
+            continue
+
+        if not value:
+            f.write(f"      <{key}/>\n")
+            continue
+
+        f.write(f"      <{key}>\n")
+        for item in value:
+            if not isinstance(item, dict):
+                _write_element(f, "        ", "Item", item)
+            elif not item:
+                f.write("        <Item/>\n")
+            else:
+                f.write("        <Item>\n")
+                for k, v in item.items():
+                    _write_element(f, "          ", k, v)
+                f.write("        </Item>\n")
+        f.write(f"      </{key}>\n")
+    f.write("    </Event>\n")
+
+
+def write_xml_history(path, metadata, events):
+    # streams the same document save_to_xml used to build with ElementTree and pretty-print
+    # with minidom, one event at a time
+    with atomic_open(path, "w") as f:
+        f.write('<?xml version="1.0" ?>\n<GameHistory>\n')
+
+        if metadata:
+            f.write("  <Metadata>\n")
+            for key, value in metadata.items():
+                _write_element(f, "    ", key, value)
+            f.write("  </Metadata>\n")
+        else:
+            f.write("  <Metadata/>\n")
+
+        first = True
+        last_save = None
+        for event in events:
+            if first:
+                f.write("  <Events>\n")
+                first = False
+            if event["eventType"] == "GAME_SAVE":
+                start = f.tell()
+                _write_event(f, event)
+                last_save = (start, f.tell() - start)
+            else:
+                _write_event(f, event)
+
+        f.write("  <Events/>\n" if first else "  </Events>\n")
+        if last_save is not None:
+            # where the last GAME_SAVE event is, so continuing a game reads only that
+            f.write(f'  <LastSave offset="{last_save[0]}" length="{last_save[1]}"/>\n')
+        f.write("</GameHistory>\n")
+
+    return path
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _bool(text):
+    return text.lower() == "true"
+
+
+def _optional(text):
+    return None if text == "None" else text
+
+
+# type of every tag the recorder writes, by where it appears; unknown tags stay strings
+METADATA_SCHEMA = {
+    "turnBased": _bool,
+    "aiEnabled": _bool,
+    "duration": float,
+    "result": _optional,
+    "seed": int,
+    "tickRate": int,
+}
+
+EVENT_SCHEMA = {
+    "cellId": int,
+    "sourceId": int,
+    "targetId": int,
+    "cost": int,
+    "oldLevel": int,
+    "newLevel": int,
+    "points": _number,
+    "score": _number,
+    "time": float,
+    "time_taken": float,
+    "isPlayer": _bool,
+    "isPlayerTurn": _bool,
+    "turn_based_mode": _bool,
+    "current_player_turn": _bool,
+    "control_enemy": _bool,
+    "tick": int,
+    "checksum": int,
+    "refundId": int,
+    "turn_time_remaining": float,
+    "move_made_this_turn": _bool,
+    "turn_timer_active": _bool,
+    "cells": list,
+    "bridges": list,
+    "balls": list,
+    "spawn_times": list,
+}
+
+ITEM_SCHEMA = {
+    "id": int,
+    "x": _number,
+    "y": _number,
+    "evolution": int,
+    "points": _number,
+    "points_to_capture": _number,
+    "enemy_points_to_capture": _number,
+    "source_cell_id": int,
+    "target_cell_id": int,
+    "has_reverse": _bool,
+    "creation_cost": int,
+    "source_x": _number,
+    "source_y": _number,
+    "target_x": _number,
+    "target_y": _number,
+    "is_player": _bool,
+    "is_support_ball": _bool,
+    "attack_value": _number,
+    "last_growth_time": _number,
+    "time": _number,
+}
+
+
+def _coerce(schema, tag, text):
+    convert = schema.get(tag)
+    if text is None:
+        return [] if convert is list else ""
+    if convert is None or convert is list:
+        return text
+
+    try:
+        return convert(text)
+    except ValueError:
+        logger.warning(f"Unexpected value for {tag}: {text!r}")
+        return text
+
+
+def _parse_event(event_elem):
+    event = {
+        "timestamp": float(event_elem.get("timestamp")),
+        "eventType": event_elem.get("type"),
+        "data": {}
+    }
+
+    for child in event_elem:
+        if len(child) == 0 and EVENT_SCHEMA.get(child.tag) is not list:
+            event["data"][child.tag] = _coerce(EVENT_SCHEMA, child.tag, child.text)
+            continue
+
+        items = []
+        for item_elem in child:
+            if len(item_elem) > 0:
+                items.append({attr.tag: _coerce(ITEM_SCHEMA, attr.tag, attr.text) for attr in item_elem})
+            else:
+                items.append(item_elem.text if item_elem.text is not None else "")
+        event["data"][child.tag] = items
+
+    return event
+
+
+def iter_xml_history(source):
+    # yields ("metadata", dict) and ("event", dict) while parsing; every finished element is
+    # dropped from the tree, so memory does not grow with the length of the game
+    depth = 0
+    parents = []
+    for kind, elem in ET.iterparse(source, events=("start", "end")):
+        if kind == "start":
+            depth += 1
+            parents.append(elem)
+            continue
+
+        depth -= 1
+        parents.pop()
+
+        if depth == 1 and elem.tag == "Metadata":
+            yield "metadata", {child.tag: _coerce(METADATA_SCHEMA, child.tag, child.text) for child in elem}
+            parents[-1].clear()
+        elif depth == 2 and elem.tag == "Event":
+            yield "event", _parse_event(elem)
+            parents[-1].clear()
+
+
+FOOTER_SIZE = 128  # bytes at the end of the file that hold <LastSave>
+LAST_SAVE_FOOTER = re.compile(rb'<LastSave offset="(\d+)" length="(\d+)"/>\s*</GameHistory>\s*$')
+
+
+def read_xml_last_save(path):
+    # the last GAME_SAVE event without parsing the rest of the file; None for files
+    # written before the footer existed
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - FOOTER_SIZE))
+        match = LAST_SAVE_FOOTER.search(f.read())
+        if match is None:
+            return None
+
+        offset, length = int(match.group(1)), int(match.group(2))
+        f.seek(offset)
+        return _parse_event(ET.fromstring(f.read(length)))
+
+
+def read_xml_history(source):
+    metadata = {}
+    events = []
+    for kind, record in iter_xml_history(source):
+        if kind == "metadata":
+            metadata = record
+        else:
+            events.append(record)
+
+    return {
+        "metadata": metadata,
+        "events": events
+    }
+
+
+def _write_xml_history_minidom(path, metadata, events):
+    # the previous save_to_xml, kept as the benchmark baseline
+    import xml.etree.ElementTree as ET
+    import xml.dom.minidom as minidom
+
+    root = ET.Element("GameHistory")
+
+    metadata_elem = ET.SubElement(root, "Metadata")
+    for key, value in metadata.items():
+        meta_item = ET.SubElement(metadata_elem, key)
+        meta_item.text = str(value)
+
+    events_elem = ET.SubElement(root, "Events")
+    for event in events:
+        event_elem = ET.SubElement(events_elem, "Event")
+        event_elem.set("timestamp", str(event["timestamp"]))
+        event_elem.set("type", event["eventType"])
+
+        for key, value in event["data"].items():
+            if isinstance(value, list):
+                list_elem = ET.SubElement(event_elem, key)
+                for item in value:
+                    if isinstance(item, dict):
+                        item_elem = ET.SubElement(list_elem, "Item")
+                        for k, v in item.items():
+                            item_attr = ET.SubElement(item_elem, k)
+                            item_attr.text = str(v)
+                    else:
+                        item_elem = ET.SubElement(list_elem, "Item")
+                        item_elem.text = str(item)
+            else:
+                data_elem = ET.SubElement(event_elem, key)
+                data_elem.text = str(value)
+
+    xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+
+    with open(path, "w") as f:
+        f.write(xml_str)
+
+    return path
+
+
+def _benchmark_events(num_events):
+    cells = [{"id": i, "x": 50 + i * 37 % 700, "y": 60 + i * 53 % 500, "type": "EMPTY", "shape": "CIRCLE",
+              "evolution": 1, "points": 10} for i in range(20)]
+
+    yield {"timestamp": 0.0, "eventType": "GAME_START", "data": {"cells": cells}}
+    for i in range(1, num_events - 1):
+        if i % 3 == 0:
+            yield {"timestamp": i * 0.05, "eventType": "CELL_CAPTURED",
+                   "data": {"cellId": i % 20, "newType": "PLAYER", "points": 20, "isPlayer": True}}
+        else:
+            yield {"timestamp": i * 0.05, "eventType": "BRIDGE_CREATED",
+                   "data": {"sourceId": i % 20, "targetId": (i + 3) % 20, "direction": "ONE_WAY", "cost": 4}}
+    yield {"timestamp": num_events * 0.05, "eventType": "GAME_END",
+           "data": {"result": "Player Wins", "score": 1200, "time": 300.5, "cells": cells}}
+
+
+def _traced(run):
+    import tracemalloc
+
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def _measure(write, path, metadata, make_events):
+    start = time.perf_counter()
+    write(path, metadata, make_events())
+    elapsed = time.perf_counter() - start
+
+    # separate pass, tracemalloc slows everything down
+    _, peak = _traced(lambda: write(path, metadata, make_events()))
+    return elapsed, peak
+
+
+def run_benchmark(num_events=100000):
+    import tempfile
+
+    metadata = {"gameId": "benchmark", "level": "level1", "turnBased": False, "result": "Player Wins",
+                "duration": 300.5}
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = os.path.join(directory, "minidom.xml")
+        new_path = os.path.join(directory, "streaming.xml")
+
+        # the streaming writer gets a generator, as the recorder hands it events straight from the stream
+        old_time, old_peak = _measure(_write_xml_history_minidom, old_path, metadata,
+                                      lambda: list(_benchmark_events(num_events)))
+        new_time, new_peak = _measure(write_xml_history, new_path, metadata,
+                                      lambda: _benchmark_events(num_events))
+
+        with open(old_path, "rb") as f1, open(new_path, "rb") as f2:
+            same = f1.read() == f2.read()
+
+        print(f"{num_events} events, {os.path.getsize(new_path) / 1024 / 1024:.1f} MB of XML")
+        print(f"minidom:   {old_time:.2f} s, peak {old_peak / 1024 / 1024:.1f} MB")
+        print(f"streaming: {new_time:.2f} s, peak {new_peak / 1024 / 1024:.2f} MB "
+              f"({old_time / new_time:.1f}x faster)")
+        print(f"identical output: {same}")
+
+        # loading: the whole tree with ET.parse vs walking the stream with iterparse
+        start = time.perf_counter()
+        ET.parse(new_path)
+        parse_time = time.perf_counter() - start
+        _, parse_peak = _traced(lambda: ET.parse(new_path))
+
+        start = time.perf_counter()
+        count = sum(1 for _ in iter_xml_history(new_path))
+        stream_time = time.perf_counter() - start
+        _, stream_peak = _traced(lambda: sum(1 for _ in iter_xml_history(new_path)))
+
+        print(f"ET.parse:    {parse_time:.2f} s, peak {parse_peak / 1024 / 1024:.1f} MB (tree only, untyped)")
+        print(f"iterparse:   {stream_time:.2f} s, peak {stream_peak / 1024 / 1024:.2f} MB "
+              f"({count - 1} typed events)")
+
+
+if __name__ == "__main__":
+    run_benchmark()